@@ -0,0 +1,91 @@
+"""Benchmark reading Arrow IPC BATCH files with and without memory-mapping.
+
+Each mode runs in a fresh subprocess, so peak memory isn't shared between them.
+
+Run with:
+
+```bash
+uv run python benchmarks/batch_memory_map.py
+```
+"""
+
+from __future__ import annotations
+
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pyarrow as pa
+from pyarrow import ipc
+from singer_sdk.helpers._flattening import FlatteningOptions
+
+from mapper_fivetran.batch import transform_file
+from mapper_fivetran.mapper import FivetranStreamMap
+
+COLUMNS = 50
+ROWS = 200_000
+BATCH_ROWS = 50_000
+
+
+def _make_stream_map() -> FivetranStreamMap:
+    properties = {f"someColumn{i}": {"type": "string"} for i in range(COLUMNS)}
+    return FivetranStreamMap(
+        stream_alias="bench",
+        raw_schema={"properties": properties},
+        key_properties=["someColumn0"],
+        flattening_options=FlatteningOptions(max_level=1),
+    )
+
+
+def _write_source(path: Path) -> None:
+    batch = pa.record_batch(
+        {
+            f"someColumn{i}": pa.array([f"value {i} {j:08}" for j in range(BATCH_ROWS)])
+            for i in range(COLUMNS)
+        }
+    )
+    with ipc.new_file(str(path), batch.schema) as writer:
+        for _ in range(ROWS // BATCH_ROWS):
+            writer.write_batch(batch)
+
+
+def _run(src_path: Path, *, memory_map: bool) -> None:
+    out_path = src_path.with_suffix(".out.arrow")
+    start = time.perf_counter()
+    transform_file(src_path, [_make_stream_map()], [out_path], memory_map=memory_map)
+    seconds = time.perf_counter() - start
+
+    # `ru_maxrss` is in KiB on Linux, and counts touched pages of memory-mapped
+    # files too, so also report peak Arrow heap allocations
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    peak_heap = pa.default_memory_pool().max_memory() / 1024 / 1024
+    label = "mmap" if memory_map else "read"
+    print(  # noqa: T201
+        f"{label:8} {seconds:8.3f} s {peak_rss:10.1f} MiB peak RSS "
+        f"{peak_heap:10.1f} MiB peak Arrow heap"
+    )
+
+
+def main() -> None:
+    """Print wall time and peak memory for each mode, over the same source file."""
+    with tempfile.TemporaryDirectory() as directory:
+        src_path = Path(directory) / "src.arrow"
+        _write_source(src_path)
+        size = src_path.stat().st_size / 1024 / 1024
+        print(f"source   {size:8.1f} MiB, {ROWS:,} rows x {COLUMNS} columns")  # noqa: T201
+
+        for mode in ("read", "mmap"):
+            subprocess.run(  # noqa: S603
+                [sys.executable, __file__, mode, str(src_path)],
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        _run(Path(sys.argv[2]), memory_map=sys.argv[1] == "mmap")
+    else:
+        main()
@@ -0,0 +1,89 @@
+"""Benchmark Arrow IPC BATCH output compression codecs on a wide table.
+
+Run with:
+
+```bash
+uv run python benchmarks/ipc_compression.py
+```
+"""
+
+from __future__ import annotations
+
+import tempfile
+import time
+from pathlib import Path
+
+import pyarrow as pa
+from pyarrow import ipc
+
+from mapper_fivetran.batch import ipc_write_options
+
+COLUMNS = 300
+ROWS = 100_000
+BATCH_ROWS = 10_000
+REPEAT = 3
+
+# (codec, level); `None` for the codec's default level
+CODECS = [
+    (None, None),
+    ("lz4", None),
+    ("zstd", 1),
+    ("zstd", None),
+    ("zstd", 9),
+]
+
+
+def _make_table() -> pa.Table:
+    # a mix of low-cardinality strings, ids and measures, as typical of the
+    # wide tables the mapper sees
+    columns: dict[str, pa.Array] = {}
+    for i in range(COLUMNS):
+        if i % 3 == 0:
+            columns[f"someColumn{i}"] = pa.array(
+                [f"status {j % 7}" for j in range(ROWS)]
+            )
+        elif i % 3 == 1:
+            columns[f"someColumn{i}"] = pa.array(range(i, ROWS + i), pa.int64())
+        else:
+            columns[f"someColumn{i}"] = pa.array(
+                [j * 1.5 + i for j in range(ROWS)], pa.float64()
+            )
+    return pa.table(columns).combine_chunks()
+
+
+def _write(path: Path, table: pa.Table, options: ipc.IpcWriteOptions) -> float:
+    start = time.perf_counter()
+    with ipc.new_file(str(path), table.schema, options=options) as writer:
+        for batch in table.to_batches(max_chunksize=BATCH_ROWS):
+            writer.write_batch(batch)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """Print write throughput and output size for each codec, threaded or not."""
+    table = _make_table()
+    size = table.nbytes / 1024 / 1024
+    print(f"table {size:.1f} MiB, {ROWS:,} rows x {COLUMNS} columns")  # noqa: T201
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "out.arrow"
+        for codec, level in CODECS:
+            for use_threads in (False, True):
+                options = ipc_write_options(
+                    codec,
+                    compression_level=level,
+                    use_threads=use_threads,
+                )
+                seconds = min(_write(path, table, options) for _ in range(REPEAT))
+                out_size = path.stat().st_size / 1024 / 1024
+
+                label = f"{codec or 'none'}" + (f":{level}" if level else "")
+                threads = "threaded" if use_threads else "serial"
+                print(  # noqa: T201
+                    f"{label:8} {threads:8} {size / seconds:8.1f} MiB/s "
+                    f"{out_size:8.1f} MiB ({out_size / size:.0%})"
+                )
+
+
+if __name__ == "__main__":
+    main()
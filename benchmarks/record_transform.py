@@ -0,0 +1,88 @@
+"""Benchmark `FivetranStreamMap.transform` against the pre-plan rename loop.
+
+Run with:
+
+```bash
+uv run python benchmarks/record_transform.py
+```
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import timeit
+
+from singer_sdk.helpers._flattening import FlatteningOptions
+from singer_sdk.helpers._util import utc_now
+
+from mapper_fivetran import SystemColumns
+from mapper_fivetran.mapper import FivetranStreamMap
+
+COLUMNS = 300
+NUMBER = 2_000
+REPEAT = 5
+
+
+def legacy_transform(stream_map: FivetranStreamMap, record: dict) -> dict:
+    """The record transform as it was before `RecordTransformPlan`."""
+    record = stream_map.flatten_record(record).copy()
+
+    for name in record.copy():
+        record[stream_map._transform_name(name)] = record.pop(name)  # noqa: SLF001
+
+    if SystemColumns.FIVETRAN_ID in (stream_map.transformed_key_properties or []):
+        record[SystemColumns.FIVETRAN_ID] = hashlib.md5(
+            json.dumps(record, default=str).encode(),
+            usedforsecurity=False,
+        ).hexdigest()
+
+    record[SystemColumns.FIVETRAN_SYNCED] = record.get(
+        "_sdc_extracted_at", utc_now().isoformat()
+    )
+    record[SystemColumns.FIVETRAN_DELETED] = bool(record.get("_sdc_deleted_at"))
+    return record
+
+
+def _make_stream_map(key_properties: list[str]) -> FivetranStreamMap:
+    properties: dict[str, dict] = {
+        f"someColumn{i}": {"type": "string"} for i in range(COLUMNS)
+    }
+    properties["_sdc_extracted_at"] = {"type": "string"}
+    properties["_sdc_deleted_at"] = {"type": ["string", "null"]}
+    return FivetranStreamMap(
+        stream_alias="bench",
+        raw_schema={"properties": properties},
+        key_properties=key_properties,
+        flattening_options=FlatteningOptions(max_level=1),
+    )
+
+
+def _make_record() -> dict:
+    record: dict = {f"someColumn{i}": f"value {i}" for i in range(COLUMNS)}
+    record["_sdc_extracted_at"] = "2024-01-01T00:00:00+00:00"
+    record["_sdc_deleted_at"] = None
+    return record
+
+
+def main() -> None:
+    """Print per-record timings for keyed and keyless streams."""
+    record = _make_record()
+
+    for label, key_properties in (("keyed", ["someColumn0"]), ("keyless", [])):
+        stream_map = _make_stream_map(key_properties)
+        assert legacy_transform(stream_map, record) == stream_map.transform(record)  # noqa: S101
+
+        for name, func in (
+            ("legacy", lambda: legacy_transform(stream_map, record)),  # noqa: B023
+            ("plan", lambda: stream_map.transform(record)),  # noqa: B023
+        ):
+            seconds = min(timeit.repeat(func, number=NUMBER, repeat=REPEAT))
+            print(  # noqa: T201
+                f"{label:8} {name:8} {seconds / NUMBER * 1e6:8.2f} us/record "
+                f"({NUMBER / seconds:,.0f} records/s)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""Benchmark mapper throughput end to end, over a synthetic Singer stream.
+
+Each case runs in a fresh subprocess, so peak memory isn't shared between them:
+
+- `transform`: `FivetranStreamMap.transform`, record by record
+- `transform_table`: `transform_table`, over the stream as one Arrow table
+- `map_batch_message`: `FivetranMapper.map_batch_message`, over an Arrow IPC
+  BATCH file of the stream
+- `cli`: the `mapper-fivetran` executable, from Singer messages on stdin to
+  stdout
+
+Rows/s and MB/s are of the best of `--repeat` runs. MB/s is of the input: the
+Singer message JSON for `transform` and `cli`, the Arrow table for
+`transform_table` and the BATCH file for `map_batch_message`. Peak RSS is of the
+process running the case, including the generated input (except for `cli`,
+which runs the mapper in a process of its own).
+
+Results are written to `benchmarks/results/<revision>.json` (or `--output`), to
+compare two revisions with e.g.:
+
+```bash
+uv run python -m benchmarks.suite --output base.json
+git checkout my-branch
+uv run python -m benchmarks.suite --output head.json
+uv run python -m benchmarks.suite --compare base.json head.json
+```
+
+Run with:
+
+```bash
+uv run python -m benchmarks.suite
+uv run python -m benchmarks.suite --rows 100000 --width 300 --depth 3 --case cli
+uv run python -m benchmarks.suite --case cli --config '{"typed_decoding": true}'
+```
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import typing as t
+from pathlib import Path
+
+import msgspec
+import pyarrow as pa
+from pyarrow import ipc
+
+from benchmarks.workload import CASINGS, Workload
+from mapper_fivetran.arrow import json_schema_to_arrow, transform_table
+from mapper_fivetran.mapper import FivetranMapper
+
+STREAM = "bench"
+
+ROOT_DIR = Path(__file__).parent.parent
+RESULTS_DIR = ROOT_DIR / "benchmarks" / "results"
+
+_CLI = "from mapper_fivetran.mapper import FivetranMapper; FivetranMapper.cli()"
+
+
+def _make_mapper(workload: Workload, directory: Path, config: dict) -> FivetranMapper:
+    mapper = FivetranMapper(
+        config={
+            **config,
+            "batch_config": {
+                **config.get("batch_config", {}),
+                "storage": {"root": str(directory / "out")},
+            },
+        },
+        validate_config=False,
+    )
+    (schema_message, *_) = workload.messages(STREAM)
+    list(mapper.map_schema_message(schema_message))
+    return mapper
+
+
+def _bench_transform(workload: Workload, directory: Path, repeat: int, config: dict):
+    (stream_map,) = _make_mapper(workload, directory, config).mapper.stream_maps[STREAM]
+    records = list(workload.records())
+    size = sum(
+        len(msgspec.json.encode({"type": "RECORD", "stream": STREAM, "record": r}))
+        for r in records
+    )
+
+    def run() -> float:
+        start = time.perf_counter()
+        for record in records:
+            stream_map.transform(record)
+        return time.perf_counter() - start
+
+    return min(run() for _ in range(repeat)), size
+
+
+def _make_table(workload: Workload) -> pa.Table:
+    return pa.Table.from_pylist(
+        list(workload.records()),
+        schema=json_schema_to_arrow(workload.schema()),
+    )
+
+
+def _bench_transform_table(
+    workload: Workload, directory: Path, repeat: int, config: dict
+):
+    (stream_map,) = _make_mapper(workload, directory, config).mapper.stream_maps[STREAM]
+    table = _make_table(workload)
+
+    def run() -> float:
+        start = time.perf_counter()
+        transform_table(table, stream_map)
+        return time.perf_counter() - start
+
+    return min(run() for _ in range(repeat)), table.nbytes
+
+
+def _bench_map_batch_message(
+    workload: Workload, directory: Path, repeat: int, config: dict
+):
+    table = _make_table(workload)
+    src_path = directory / "src.arrow"
+
+    def run() -> float:
+        # sources are deleted once transformed, so write one for every run
+        with ipc.new_file(str(src_path), table.schema) as writer:
+            writer.write_table(table)
+        mapper = _make_mapper(workload, directory, config)
+        message = {
+            "type": "BATCH",
+            "stream": STREAM,
+            "encoding": {"format": "arrow"},
+            "manifest": [src_path.as_uri()],
+        }
+
+        start = time.perf_counter()
+        list(mapper.map_batch_message(message))
+        return time.perf_counter() - start
+
+    seconds = min(run() for _ in range(repeat))
+    with ipc.new_file(str(src_path), table.schema) as writer:
+        writer.write_table(table)
+    return seconds, src_path.stat().st_size
+
+
+def _bench_cli(workload: Workload, directory: Path, repeat: int, config: dict):
+    config_path = directory / "config.json"
+    config_path.write_text(json.dumps(config))
+    input_path = directory / "input.jsonl"
+    with input_path.open("wb") as file:
+        for message in workload.messages(STREAM):
+            file.write(msgspec.json.encode(message) + b"\n")
+
+    def run() -> float:
+        with input_path.open("rb") as stdin:
+            start = time.perf_counter()
+            subprocess.run(  # noqa: S603
+                [sys.executable, "-c", _CLI, "--config", str(config_path)],
+                stdin=stdin,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                check=True,
+            )
+            return time.perf_counter() - start
+
+    return min(run() for _ in range(repeat)), input_path.stat().st_size
+
+
+CASES: dict[str, t.Callable[[Workload, Path, int, dict], tuple[float, int]]] = {
+    "transform": _bench_transform,
+    "transform_table": _bench_transform_table,
+    "map_batch_message": _bench_map_batch_message,
+    "cli": _bench_cli,
+}
+
+
+def _peak_rss_mib(who: int) -> float:
+    # `ru_maxrss` is in KiB on Linux, but bytes on macOS
+    peak_rss = resource.getrusage(who).ru_maxrss
+    return peak_rss / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def _run_case(case: str, workload: Workload, repeat: int, config: dict) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        seconds, size = CASES[case](workload, Path(directory), repeat, config)
+
+    peak_rss = _peak_rss_mib(
+        resource.RUSAGE_CHILDREN if case == "cli" else resource.RUSAGE_SELF
+    )
+    return {
+        "seconds": seconds,
+        "rows_per_second": workload.rows / seconds,
+        "mb_per_second": size / 1e6 / seconds,
+        "peak_rss_mib": peak_rss,
+    }
+
+
+def _revision() -> str:
+    result = subprocess.run(
+        ["git", "describe", "--always", "--dirty"],  # noqa: S607
+        capture_output=True,
+        text=True,
+        check=False,
+        cwd=Path(__file__).parent,
+    )
+    return result.stdout.strip() or "unknown"
+
+
+def _print_results(results: dict) -> None:
+    for case, result in results["cases"].items():
+        print(  # noqa: T201
+            f"{case:18} {result['rows_per_second']:12,.0f} rows/s "
+            f"{result['mb_per_second']:8.1f} MB/s "
+            f"{result['peak_rss_mib']:8.1f} MiB peak RSS"
+        )
+
+
+def _compare(base_path: Path, head_path: Path) -> None:
+    base = json.loads(base_path.read_text())
+    head = json.loads(head_path.read_text())
+    print(f"{base['revision']} -> {head['revision']}")  # noqa: T201
+    if base["workload"] != head["workload"]:
+        print("warning: results are of different workloads")  # noqa: T201
+    if base.get("config") != head.get("config"):
+        print("warning: results are of different mapper configs")  # noqa: T201
+
+    for case, head_result in head["cases"].items():
+        base_result = base["cases"].get(case)
+        if base_result is None:
+            continue
+        speedup = head_result["rows_per_second"] / base_result["rows_per_second"]
+        rss = head_result["peak_rss_mib"] - base_result["peak_rss_mib"]
+        print(  # noqa: T201
+            f"{case:18} {base_result['rows_per_second']:12,.0f} -> "
+            f"{head_result['rows_per_second']:12,.0f} rows/s ({speedup:5.2f}x) "
+            f"{rss:+8.1f} MiB peak RSS"
+        )
+
+
+def _parse_args() -> argparse.Namespace:
+    defaults = Workload()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=defaults.rows)
+    parser.add_argument("--width", type=int, default=defaults.width)
+    parser.add_argument("--depth", type=int, default=defaults.depth)
+    parser.add_argument("--array-size", type=int, default=defaults.array_size)
+    parser.add_argument("--key-presence", type=float, default=defaults.key_presence)
+    parser.add_argument(
+        "--casing",
+        action="append",
+        choices=CASINGS,
+        help="column name casing to include (repeatable, default: all)",
+    )
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument(
+        "--case",
+        action="append",
+        choices=CASES,
+        help="case to run (repeatable, default: all)",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--config",
+        type=json.loads,
+        default={},
+        help="mapper config, as JSON (default: {})",
+    )
+    parser.add_argument("--output", type=Path, help="file to write results to")
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        type=Path,
+        metavar=("BASE", "HEAD"),
+        help="compare two results files instead of running",
+    )
+    # run a single case in this process, printing its result as JSON
+    parser.add_argument("--child", choices=CASES, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Run the selected cases, then print and store their results."""
+    args = _parse_args()
+    if args.compare:
+        _compare(*args.compare)
+        return
+
+    workload = Workload(
+        rows=args.rows,
+        width=args.width,
+        depth=args.depth,
+        array_size=args.array_size,
+        key_presence=args.key_presence,
+        casings=tuple(args.casing or CASINGS),
+        seed=args.seed,
+    )
+    if args.child:
+        result = _run_case(args.child, workload, args.repeat, args.config)
+        print(json.dumps(result))  # noqa: T201
+        return
+
+    cases = {}
+    for case in args.case or CASES:
+        # forward the workload and repeat options to the child as given
+        child = subprocess.run(  # noqa: S603
+            [sys.executable, "-m", __spec__.name, *sys.argv[1:], "--child", case],
+            cwd=ROOT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        cases[case] = json.loads(child.stdout)
+
+    results = {
+        "revision": _revision(),
+        "python": platform.python_version(),
+        "pyarrow": pa.__version__,
+        "workload": dataclasses.asdict(workload),
+        "config": args.config,
+        "cases": cases,
+    }
+    _print_results(results)
+
+    output = args.output or RESULTS_DIR / f"{results['revision']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"results written to {output}")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
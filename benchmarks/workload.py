@@ -0,0 +1,164 @@
+"""Synthetic Singer streams for benchmarks.
+
+A `Workload` describes the shape of a stream (how many columns, how deeply
+nested, how long its arrays, how sparse its records and how its column names
+are cased) and generates a matching schema, records and Singer messages
+deterministically from a seed, so runs against different revisions see the
+same data.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import random
+import typing as t
+
+CASINGS = ("camel", "pascal", "snake", "upper")
+"""Column name casings, e.g. `someColumn1`, `SomeColumn1`, `some_column_1` and
+`SOME_COLUMN_1`."""
+
+# column kinds, in the order they're assigned to columns
+_KINDS = ("string", "integer", "number", "boolean", "array", "object")
+
+_EXTRACTED_AT = "2024-01-01T00:00:00+00:00"
+
+
+def column_name(index: int, casing: str) -> str:
+    """Get the name of a generated column.
+
+    Args:
+        index: The column's position in the stream.
+        casing: The column name's casing, from `CASINGS`.
+
+    Returns:
+        The column name.
+    """
+    words = ["some", "column", str(index)]
+    if casing == "camel":
+        return words[0] + "".join(word.capitalize() for word in words[1:])
+    if casing == "pascal":
+        return "".join(word.capitalize() for word in words)
+    if casing == "snake":
+        return "_".join(words)
+    if casing == "upper":
+        return "_".join(words).upper()
+    msg = f"Unknown casing '{casing}', expected one of {CASINGS}"
+    raise ValueError(msg)
+
+
+@dataclasses.dataclass(frozen=True)
+class Workload:
+    """The shape of a synthetic Singer stream.
+
+    Attributes:
+        rows: The number of records.
+        width: The number of top-level columns, besides the `id` key and
+            `_sdc_*` metadata columns.
+        depth: How deeply object columns nest; `0` for no object columns.
+        array_size: The number of items in each array value.
+        key_presence: The probability each optional column is present in a
+            record, between `0` and `1`.
+        casings: The casings to cycle through for column names, from `CASINGS`.
+        seed: The seed for generated values.
+    """
+
+    rows: int = 10_000
+    width: int = 50
+    depth: int = 1
+    array_size: int = 3
+    key_presence: float = 1.0
+    casings: tuple[str, ...] = CASINGS
+    seed: int = 0
+
+    def _columns(self) -> list[tuple[str, str]]:
+        kinds = [kind for kind in _KINDS if self.depth or kind != "object"]
+        return [
+            (column_name(i, self.casings[i % len(self.casings)]), kinds[i % len(kinds)])
+            for i in range(self.width)
+        ]
+
+    def _object_schema(self, depth: int) -> dict:
+        properties: dict[str, dict] = {
+            "leafValue": {"type": ["string", "null"]},
+            "leafCount": {"type": ["integer", "null"]},
+        }
+        if depth > 1:
+            properties["childObject"] = self._object_schema(depth - 1)
+        return {"type": ["object", "null"], "properties": properties}
+
+    def _column_schema(self, kind: str) -> dict:
+        if kind == "array":
+            return {"type": ["array", "null"], "items": {"type": "string"}}
+        if kind == "object":
+            return self._object_schema(self.depth)
+        return {"type": [kind, "null"]}
+
+    def schema(self) -> dict:
+        """Get the stream's JSON schema.
+
+        Returns:
+            The schema.
+        """
+        properties: dict[str, dict] = {"id": {"type": "integer"}}
+        for name, kind in self._columns():
+            properties[name] = self._column_schema(kind)
+        properties["_sdc_extracted_at"] = {"type": ["string", "null"]}
+        properties["_sdc_deleted_at"] = {"type": ["string", "null"]}
+        return {"type": "object", "properties": properties}
+
+    def _object_value(self, rng: random.Random, depth: int) -> dict:
+        value: dict[str, t.Any] = {
+            "leafValue": f"value {rng.randrange(1_000_000)}",
+            "leafCount": rng.randrange(1_000),
+        }
+        if depth > 1:
+            value["childObject"] = self._object_value(rng, depth - 1)
+        return value
+
+    def _value(self, rng: random.Random, kind: str) -> t.Any:  # noqa: ANN401
+        if kind == "string":
+            return f"value {rng.randrange(1_000_000)}"
+        if kind == "integer":
+            return rng.randrange(-(2**31), 2**31)
+        if kind == "number":
+            return rng.uniform(-1e6, 1e6)
+        if kind == "boolean":
+            return rng.random() < 0.5  # noqa: PLR2004
+        if kind == "array":
+            return [f"item {rng.randrange(1_000)}" for _ in range(self.array_size)]
+        return self._object_value(rng, self.depth)
+
+    def records(self) -> t.Iterator[dict]:
+        """Generate the stream's records.
+
+        Yields:
+            Each record, in order.
+        """
+        rng = random.Random(self.seed)  # noqa: S311
+        columns = self._columns()
+        for i in range(self.rows):
+            record: dict[str, t.Any] = {"id": i}
+            for name, kind in columns:
+                if self.key_presence >= 1 or rng.random() < self.key_presence:
+                    record[name] = self._value(rng, kind)
+            record["_sdc_extracted_at"] = _EXTRACTED_AT
+            record["_sdc_deleted_at"] = None
+            yield record
+
+    def messages(self, stream: str) -> t.Iterator[dict]:
+        """Generate the Singer messages of the stream.
+
+        Args:
+            stream: The stream name.
+
+        Yields:
+            A `SCHEMA` message, followed by a `RECORD` message per record.
+        """
+        yield {
+            "type": "SCHEMA",
+            "stream": stream,
+            "schema": self.schema(),
+            "key_properties": ["id"],
+        }
+        for record in self.records():
+            yield {"type": "RECORD", "stream": stream, "record": record}
@@ -0,0 +1,219 @@
+"""JSON-encode Arrow arrays with Arrow compute kernels.
+
+Produces exactly what `msgspec.json.encode` would for each value of
+`array.to_pylist()`, without creating a Python object per value: nested values
+are encoded bottom-up, one child array at a time, and assembled into JSON text
+with string kernels (`binary_join_element_wise` for struct fields,
+`binary_join` for list items).
+
+Only types whose msgspec encoding can be reproduced this way are supported; see
+`is_supported`. Everything else (e.g. binary, which msgspec base64-encodes, or
+temporal types) is left to the caller to encode row-wise.
+"""
+
+from __future__ import annotations
+
+import msgspec
+import pyarrow as pa
+import pyarrow.compute as pc
+
+_JSON_ENCODER = msgspec.json.Encoder()
+
+_NULL = pa.scalar("null", pa.string())
+
+# msgspec escapes `"`, `\` and control characters, using short escapes where
+# JSON has them; everything else (including non-ASCII) is written as-is
+_SHORT_ESCAPES = {
+    "\b": "\\b",
+    "\t": "\\t",
+    "\n": "\\n",
+    "\f": "\\f",
+    "\r": "\\r",
+}
+_CONTROL_ESCAPES = [
+    (chr(i), _SHORT_ESCAPES.get(chr(i), f"\\u{i:04x}")) for i in range(0x20)
+]
+
+# floats msgspec and Arrow's float -> string cast format differently (msgspec
+# writes these in decimal, Arrow in scientific notation, or vice versa)
+_FLOAT_MISMATCH_RANGES = ((1e-6, 1e-5), (1e10, 1e16))
+
+
+def _is_scalar_supported(data_type: pa.DataType) -> bool:
+    return (
+        pa.types.is_null(data_type)
+        or pa.types.is_boolean(data_type)
+        or pa.types.is_integer(data_type)
+        or pa.types.is_floating(data_type)
+        or pa.types.is_string(data_type)
+        or pa.types.is_large_string(data_type)
+    )
+
+
+def is_supported(data_type: pa.DataType) -> bool:
+    """Whether arrays of a type can be encoded with `encode`.
+
+    Args:
+        data_type: The array type, which may be nested.
+
+    Returns:
+        True if the type, and every type nested within it, is supported.
+    """
+    if pa.types.is_struct(data_type):
+        names = [field.name for field in data_type]
+        # duplicate field names collapse to one key in `to_pylist()` dicts
+        return len(set(names)) == len(names) and all(
+            is_supported(field.type) for field in data_type
+        )
+    if pa.types.is_map(data_type):
+        return is_supported(data_type.key_type) and is_supported(data_type.item_type)
+    if (
+        pa.types.is_list(data_type)
+        or pa.types.is_large_list(data_type)
+        or pa.types.is_fixed_size_list(data_type)
+    ):
+        return is_supported(data_type.value_type)
+    return _is_scalar_supported(data_type)
+
+
+def _null_where_invalid(array: pa.Array, encoded: pa.Array) -> pa.Array:
+    if not array.null_count:
+        return encoded
+    return pc.if_else(pc.is_valid(array), encoded, _NULL)
+
+
+def _encode_string(array: pa.Array) -> pa.Array:
+    array = pc.cast(array, pa.string())
+    escaped = pc.replace_substring(array, "\\", "\\\\")
+    escaped = pc.replace_substring(escaped, '"', '\\"')
+    if pc.any(pc.match_substring_regex(escaped, "[\\x00-\\x1f]")).as_py():
+        for char, escape in _CONTROL_ESCAPES:
+            escaped = pc.replace_substring(escaped, char, escape)
+    return pc.binary_join_element_wise('"', escaped, '"', "")
+
+
+def _encode_float(array: pa.Array) -> pa.Array:
+    # Arrow and msgspec both write the shortest round-tripping digits, so only
+    # the notation needs adjusting, other than in `_FLOAT_MISMATCH_RANGES`
+    array = pc.cast(array, pa.float64())
+    encoded = pc.cast(array, pa.string())
+    encoded = pc.replace_substring(encoded, "e+", "e")
+    encoded = pc.if_else(
+        pc.match_substring_regex(encoded, "^-?[0-9]+$"),
+        pc.binary_join_element_wise(encoded, ".0", ""),
+        encoded,
+    )
+
+    # NaN and infinity aren't valid JSON, so msgspec writes `null`
+    encoded = pc.if_else(pc.is_finite(array), encoded, _NULL)
+
+    magnitude = pc.abs(array)
+    mismatched = pc.fill_null(
+        pc.or_(
+            *(
+                pc.and_(pc.greater_equal(magnitude, low), pc.less(magnitude, high))
+                for low, high in _FLOAT_MISMATCH_RANGES
+            )
+        ),
+        False,  # noqa: FBT003
+    )
+    if pc.any(mismatched).as_py():
+        values = pc.filter(array, mismatched).to_pylist()
+        encoded = pc.replace_with_mask(
+            encoded,
+            mismatched,
+            pa.array(
+                [_JSON_ENCODER.encode(value).decode() for value in values],
+                pa.string(),
+            ),
+        )
+
+    return encoded
+
+
+def _encode_scalar(array: pa.Array) -> pa.Array:
+    data_type = array.type
+    if pa.types.is_null(data_type):
+        return pa.array(["null"] * len(array), pa.string())
+    if pa.types.is_boolean(data_type):
+        return pc.if_else(array, "true", "false")
+    if pa.types.is_integer(data_type):
+        return pc.cast(array, pa.string())
+    if pa.types.is_floating(data_type):
+        return _encode_float(array)
+    return _encode_string(array)
+
+
+def _join_lists(
+    offsets: pa.Array,
+    items: pa.Array,
+    *,
+    large: bool = False,
+) -> pa.Array:
+    list_class = pa.LargeListArray if large else pa.ListArray
+    joined = pc.binary_join(list_class.from_arrays(offsets, items), ",")
+    return pc.binary_join_element_wise("[", joined, "]", "")
+
+
+def _encode_struct(array: pa.StructArray) -> pa.Array:
+    if not array.type.num_fields:
+        return pa.array(["{}"] * len(array), pa.string())
+
+    parts: list[pa.Array | str] = []
+    for i, field in enumerate(array.type):
+        key = _JSON_ENCODER.encode(field.name).decode()
+        parts.extend(("{" if i == 0 else ",", f"{key}:", _encode(array.field(i))))
+    parts.append("}")
+    return pc.binary_join_element_wise(*parts, "")
+
+
+def _encode(array: pa.Array) -> pa.Array:
+    # encode every slot, nulls included, as non-null JSON text, so parents can
+    # join children without null propagation
+    data_type = array.type
+
+    if pa.types.is_struct(data_type):
+        encoded = _encode_struct(array)
+    elif pa.types.is_map(data_type):
+        # `to_pylist()` gives `(key, item)` tuples for map entries, which msgspec
+        # encodes as two-element arrays, not as object members
+        entries = array.values
+        pairs = pc.binary_join_element_wise(
+            "[",
+            _encode(entries.field(0)),
+            ",",
+            _encode(entries.field(1)),
+            "]",
+            "",
+        )
+        encoded = _join_lists(array.offsets, pairs)
+    elif pa.types.is_list(data_type) or pa.types.is_large_list(data_type):
+        encoded = _join_lists(
+            array.offsets,
+            _encode(array.values),
+            large=pa.types.is_large_list(data_type),
+        )
+    elif pa.types.is_fixed_size_list(data_type):
+        size = data_type.list_size
+        values = array.values.slice(array.offset * size, len(array) * size)
+        offsets = pa.array(range(0, (len(array) + 1) * size, size), pa.int32())
+        encoded = _join_lists(offsets, _encode(values))
+    else:
+        encoded = _encode_scalar(array)
+
+    return _null_where_invalid(array, encoded)
+
+
+def encode(array: pa.Array) -> pa.Array:
+    """JSON-encode each value of an array.
+
+    Args:
+        array: The array to encode, of a type for which `is_supported` is true.
+
+    Returns:
+        A `pa.string()` array of the same length, null wherever `array` is.
+    """
+    encoded = _encode(array)
+    if not array.null_count:
+        return encoded
+    return pc.if_else(pc.is_valid(array), encoded, pa.scalar(None, pa.string()))
@@ -2,11 +2,18 @@
 
 from __future__ import annotations
 
+import decimal
 import functools
+import hashlib
+import json
 import sys
+import time
+import typing as t
 import uuid
+from datetime import datetime, timezone
 
 import humps
+import msgspec
 
 if sys.version_info >= (3, 14):
     # UUIDv7 is monotonic (time-ordered), which keeps BATCH output filenames
@@ -22,6 +29,57 @@ else:
         return uuid.uuid4()
 
 
+class CoarseClock:
+    """The current UTC time, read at most once per `resolution` seconds.
+
+    Shared by the record and Arrow BATCH paths for `time_extracted` and
+    `_fivetran_synced`, so those are read from one cached `datetime` (and ISO
+    8601 string, formatted on first use) rather than a new one for every
+    record. Safe to share between threads.
+    """
+
+    def __init__(self, resolution: float = 0.001) -> None:
+        """Create a clock.
+
+        Args:
+            resolution: How long, in seconds, a reading is reused for; `0` to
+                read the time afresh every time, or `math.inf` to only read it
+                once.
+        """
+        self.resolution = resolution
+        # (monotonic expiry, reading) and (reading, ISO 8601 string), each
+        # replaced whole so concurrent readers never see a torn pair
+        self._reading: tuple[float, datetime | None] = (float("-inf"), None)
+        self._formatted: tuple[datetime | None, str] = (None, "")
+
+    def now(self) -> datetime:
+        """Get the current time.
+
+        Returns:
+            The current (timezone-aware) UTC time, as of at most `resolution`
+            seconds ago.
+        """
+        expires, now = self._reading
+        tick = time.monotonic()
+        if now is None or tick >= expires:
+            now = datetime.now(timezone.utc)
+            self._reading = (tick + self.resolution, now)
+        return now
+
+    def isoformat(self) -> str:
+        """Get the current time, as an ISO 8601 string.
+
+        Returns:
+            `now().isoformat()`.
+        """
+        now = self.now()
+        reading, formatted = self._formatted
+        if reading is not now:
+            formatted = now.isoformat()
+            self._formatted = (now, formatted)
+        return formatted
+
+
 @functools.cache
 def transform_name(name: str) -> str:
     """Convert a property name of any casing convention to snake_case.
@@ -47,3 +105,96 @@ def transform_name(name: str) -> str:
 
     transformed = "_".join(transformed_parts)
     return transformed.replace(".", "_")
+
+
+_JSON_ENCODER = msgspec.json.Encoder()
+
+# types msgspec encodes byte-for-byte the same as `json.dumps(..., default=str)`
+# (`Decimal` goes through `default=str` there, and is a JSON string in both)
+_CANONICAL_SCALAR_TYPES = frozenset({str, int, bool, type(None), decimal.Decimal})
+_STR_TYPE = frozenset({str})
+
+# outside this range `repr(float)` switches to exponent notation, which msgspec
+# formats differently (`1e16` vs `1e+16`)
+_CANONICAL_FLOAT_MIN = 1e-4
+_CANONICAL_FLOAT_MAX = 1e16
+
+
+def _is_canonical(value: object) -> bool:
+    if type(value) in _CANONICAL_SCALAR_TYPES:
+        return True
+
+    if type(value) is float:
+        # also rejects NaN and +/-inf, for which every comparison is False
+        return value == 0 or _CANONICAL_FLOAT_MIN <= abs(value) < _CANONICAL_FLOAT_MAX
+
+    if type(value) is dict:
+        return set(map(type, value)) <= _STR_TYPE and _all_canonical(value.values())
+
+    if type(value) is list:
+        return _all_canonical(value)
+
+    return False
+
+
+def _all_canonical(values: t.Collection[object]) -> bool:
+    # the overwhelmingly common case is a flat record of scalars, which can be
+    # checked without a Python-level call per value
+    if set(map(type, values)) <= _CANONICAL_SCALAR_TYPES:
+        return True
+    return all(map(_is_canonical, values))
+
+
+def canonical_json(obj: object) -> bytes:
+    """Encode `obj` exactly as `json.dumps(obj, default=str).encode()` would.
+
+    `_fivetran_id` is a hash of this encoding, so it must stay byte-identical
+    to what the record-based transform has always hashed. msgspec (plus
+    `msgspec.json.format` for the `", "`/`": "` separators) is used for
+    anything it's known to encode identically, which covers the vast majority
+    of records; anything else, or any output that would need
+    `ensure_ascii` escaping, falls back to the stdlib.
+
+    Args:
+        obj: The object to encode, usually a record.
+
+    Returns:
+        The encoded object.
+    """
+    if _is_canonical(obj):
+        try:
+            encoded = msgspec.json.format(_JSON_ENCODER.encode(obj), indent=0)
+        except UnicodeEncodeError:
+            # lone surrogates can't be UTF-8 encoded, but `ensure_ascii` escapes
+            pass
+        else:
+            if encoded.isascii() and b"\x7f" not in encoded:
+                return encoded
+
+    return json.dumps(obj, default=str).encode()
+
+
+FIVETRAN_ID_ALGORITHMS: dict[str, t.Callable[[bytes], t.Any]] = {
+    "md5": functools.partial(hashlib.md5, usedforsecurity=False),
+    "sha1": functools.partial(hashlib.sha1, usedforsecurity=False),
+    "blake2b": functools.partial(hashlib.blake2b, digest_size=16),
+}
+"""Supported `_fivetran_id` digests, by name.
+
+`md5` is what Fivetran itself uses, so is the default. The others are faster,
+but produce different ids, so should only be used for new connectors.
+"""
+
+
+def fivetran_id(record: dict, algorithm: str = "md5") -> str:
+    """Compute the `_fivetran_id` of a (transformed) record.
+
+    Args:
+        record: The record to compute the id of, with names already normalized
+            and before any system columns are added.
+        algorithm: The digest to use, from `FIVETRAN_ID_ALGORITHMS`.
+
+    Returns:
+        The hex digest of the record's canonical JSON encoding.
+    """
+    return FIVETRAN_ID_ALGORITHMS[algorithm](canonical_json(record)).hexdigest()
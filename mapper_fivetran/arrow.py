@@ -1,70 +1,145 @@
 """Vectorized Arrow-table transforms for Singer BATCH messages.
 
 Mirrors the per-record transforms in `mapper_fivetran.mapper.FivetranStreamMap`
-(name normalization, `_fivetran_synced`, `_fivetran_deleted`, and stringifying
-whatever flattening couldn't fully unpack), but operates on whole
-`pyarrow.Table` columns instead of looping over rows, so it stays fast on
+(name normalization, `_fivetran_id`, `_fivetran_synced`, `_fivetran_deleted`,
+and stringifying whatever flattening couldn't fully unpack), but operates on
+whole `pyarrow.Table` columns instead of looping over rows, so it stays fast on
 large batches.
 
-`_fivetran_id` is intentionally not computed here: doing so faithfully would
-require hashing each row's full JSON representation, which cannot be
-vectorized. Streams without `key_properties` are rejected instead of silently
-producing a slow or incorrect id column; see `assert_batch_supported`.
+`_fivetran_id` is the one exception: it's a hash of each row's full JSON
+representation, which has no Arrow compute kernel, so it's computed row-wise,
+chunk by chunk; see `with_fivetran_id`.
 """
 
 from __future__ import annotations
 
+import threading
+import time
 import typing as t
-from datetime import datetime, timezone
 
 import msgspec
 import pyarrow as pa
 import pyarrow.compute as pc
+from singer_sdk.helpers._typing import to_json_compatible
 
-from mapper_fivetran import SystemColumns
-from mapper_fivetran._util import transform_name
+from mapper_fivetran import SystemColumns, _arrow_json
+from mapper_fivetran._util import CoarseClock, fivetran_id, transform_name
 
 if t.TYPE_CHECKING:
     from singer_sdk.mapper import StreamMap
 
+    from mapper_fivetran.metrics import StageMetrics
+
 _SDC_EXTRACTED_AT = "_sdc_extracted_at"
 _SDC_DELETED_AT = "_sdc_deleted_at"
 
 
-class BatchFivetranIdError(ValueError):
-    """Raised when a keyless stream is processed as an Arrow BATCH.
+_JSON_SCHEMA_ARROW_TYPES = {
+    "string": pa.string(),
+    "integer": pa.int64(),
+    "number": pa.float64(),
+    "boolean": pa.bool_(),
+}
+
+
+def json_schema_to_arrow_type(schema: dict) -> pa.DataType:
+    """Derive the Arrow type for a JSON Schema property.
+
+    Objects with `properties` and arrays with `items` map to struct and list
+    types respectively. Anything else without exactly one non-null scalar type
+    (opaque objects and arrays, `anyOf`, multi-typed properties) maps to a
+    JSON-encoded `pa.string()`, the same as flattening would serialize it to.
+    Date-time strings stay strings, so values are written exactly as received.
 
-    `_fivetran_id` (an MD5 hash of the full record) cannot be computed for
-    Arrow batches without a row-wise, unvectorized pass over every column, so
-    BATCH mode requires `key_properties` instead of silently falling back to
-    it.
+    Args:
+        schema: The JSON Schema property definition.
+
+    Returns:
+        The equivalent Arrow type.
     """
+    types = schema.get("type", ())
+    if isinstance(types, str):
+        types = (types,)
+    non_null_types = [type_ for type_ in types if type_ != "null"]
+    if len(non_null_types) != 1:
+        return pa.string()
 
-    def __init__(self, stream: str) -> None:
-        """Initialize the error for the given stream name.
+    (type_,) = non_null_types
+    if type_ == "object" and schema.get("properties"):
+        return pa.struct(json_schema_to_arrow(schema))
+    if type_ == "array" and "items" in schema:
+        return pa.list_(json_schema_to_arrow_type(schema["items"]))
+    return _JSON_SCHEMA_ARROW_TYPES.get(type_, pa.string())
 
-        Args:
-            stream: The originating stream name.
-        """
-        super().__init__(
-            f"stream {stream!r} has no key_properties: `_fivetran_id` is not "
-            "computed for Arrow BATCH messages, so key_properties are required",
+
+def json_schema_to_arrow(schema: dict) -> pa.Schema:
+    """Derive an Arrow schema from a JSON Schema, e.g. a transformed SCHEMA.
+
+    Args:
+        schema: The JSON Schema, with top-level `properties`.
+
+    Returns:
+        An Arrow schema with one (nullable) field per property, in order.
+    """
+    return pa.schema(
+        pa.field(name, json_schema_to_arrow_type(prop))
+        for name, prop in schema.get("properties", {}).items()
+    )
+
+
+# `decimal_format="number"` to match how flattening serializes `Decimal`s
+_RECORD_JSON_ENCODER = msgspec.json.Encoder(decimal_format="number")
+
+
+def _to_array(values: list, data_type: pa.DataType) -> pa.Array:
+    try:
+        return pa.array(values, type=data_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+
+    if pa.types.is_string(data_type):
+        return pa.array(
+            [
+                value
+                if value is None or isinstance(value, str)
+                else _RECORD_JSON_ENCODER.encode(value).decode()
+                for value in values
+            ],
+            type=data_type,
         )
 
+    # e.g. `Decimal`s (as decoded from JSON numbers) for a float64 column
+    return pc.cast(pa.array(values), data_type)
+
+
+def _to_column(records: list[dict], field: pa.Field) -> pa.Array:
+    try:
+        return _to_array([record.get(field.name) for record in records], field.type)
+    except pa.ArrowException as e:
+        msg = f"Property '{field.name}' can't be converted to {field.type}: {e}"
+        raise ValueError(msg) from e
+
 
-def assert_batch_supported(stream: str, stream_map: StreamMap) -> None:
-    """Raise `BatchFivetranIdError` if `stream_map` would need `_fivetran_id`.
+def records_to_batch(records: list[dict], schema: pa.Schema) -> pa.RecordBatch:
+    """Convert (transformed) records to an Arrow record batch.
+
+    Properties not in `schema` are dropped, and missing properties are null.
 
     Args:
-        stream: The originating stream name (for the error message).
-        stream_map: The registered stream map for this stream.
+        records: The records to convert.
+        schema: The Arrow schema to convert to, e.g. from `json_schema_to_arrow`.
+
+    Returns:
+        A new record batch.
 
     Raises:
-        BatchFivetranIdError: If the stream was registered with no
-            `key_properties`.
+        ValueError: If a value can't be converted to its column's type, e.g. a
+            string for an `integer` property.
     """
-    if SystemColumns.FIVETRAN_ID in (stream_map.transformed_key_properties or []):
-        raise BatchFivetranIdError(stream)
+    return pa.RecordBatch.from_arrays(
+        [_to_column(records, field) for field in schema],
+        schema=schema,
+    )
 
 
 def flatten_table(table: pa.Table, max_level: int) -> pa.Table:
@@ -102,6 +177,27 @@ def _is_json_extension(data_type: pa.DataType) -> bool:
     )
 
 
+def _is_complex(data_type: pa.DataType) -> bool:
+    return _is_json_extension(data_type) or any(
+        check(data_type) for check in _COMPLEX_TYPE_CHECKS
+    )
+
+
+def _stringify_column(column: pa.ChunkedArray) -> pa.ChunkedArray:
+    if _is_json_extension(column.type):
+        return pc.cast(column, pa.string())
+    if _arrow_json.is_supported(column.type):
+        return pa.chunked_array(
+            [_arrow_json.encode(chunk) for chunk in column.chunks],
+            type=pa.string(),
+        )
+    encoded = [
+        _JSON_ENCODER.encode(value).decode() if value is not None else None
+        for value in column.to_pylist()
+    ]
+    return pa.chunked_array([pa.array(encoded, type=pa.string())])
+
+
 def stringify_complex_columns(table: pa.Table) -> pa.Table:
     """JSON-encode any column still struct-, list-, or map-typed.
 
@@ -111,9 +207,14 @@ def stringify_complex_columns(table: pa.Table) -> pa.Table:
     JSON string here, matching
     `singer_sdk.helpers._flattening.flatten_record`'s behavior for the
     record-based transform. No pyarrow compute kernel exists for
-    struct/list -> JSON, so this is a `to_pylist()` + `msgspec.json.encode()`
-    pass -- msgspec rather than the stdlib `json` module since it's ~12-15x
-    faster for this shape of data and already a transitive dependency via
+    struct/list -> JSON, so columns are encoded chunk by chunk with
+    `mapper_fivetran._arrow_json`, which assembles JSON text from Arrow string
+    kernels without a Python object per row, and produces exactly what
+    `msgspec.json.encode()` would for each `to_pylist()` value. Columns with a
+    type it can't reproduce msgspec's encoding of (e.g. nested binary or
+    timestamps) fall back to a `to_pylist()` + `msgspec.json.encode()` pass --
+    msgspec rather than the stdlib `json` module since it's ~12-15x faster for
+    this shape of data and already a transitive dependency via
     `singer-sdk[msgspec]`. Scoped only to the columns that actually need it;
     nulls are preserved as nulls, not the string `"null"`.
 
@@ -129,23 +230,12 @@ def stringify_complex_columns(table: pa.Table) -> pa.Table:
         string columns.
     """
     for i, field in enumerate(table.schema):
-        column: pa.Array | pa.ChunkedArray
-        if _is_json_extension(field.type):
-            column = pc.cast(table.column(i), pa.string())
-            table = table.set_column(i, pa.field(field.name, pa.string()), column)
-            continue
-
-        if not any(check(field.type) for check in _COMPLEX_TYPE_CHECKS):
-            continue
-
-        encoded = [
-            _JSON_ENCODER.encode(value).decode() if value is not None else None
-            for value in table.column(i).to_pylist()
-        ]
-        column = pa.array(encoded, type=pa.string())
-
-        table = table.set_column(i, pa.field(field.name, pa.string()), column)
-
+        if _is_complex(field.type):
+            table = table.set_column(
+                i,
+                pa.field(field.name, pa.string()),
+                _stringify_column(table.column(i)),
+            )
     return table
 
 
@@ -166,7 +256,118 @@ def _column_index(table: pa.Table, name: str) -> int | None:
     return names.index(name) if name in names else None
 
 
-def with_fivetran_synced(table: pa.Table) -> pa.Table:
+_FIVETRAN_ID_CHUNK_SIZE = 8192
+
+
+def _fivetran_id_chunk(batch: pa.RecordBatch, algorithm: str) -> pa.Array:
+    rows = batch.to_pylist()
+    # hashed as the ISO 8601 strings the SDK writes timestamps to RECORD
+    # messages as, rather than as `str(datetime)`
+    timestamps = [
+        field.name for field in batch.schema if pa.types.is_timestamp(field.type)
+    ]
+    if timestamps:
+        for row in rows:
+            for name in timestamps:
+                row[name] = to_json_compatible(row[name])
+
+    return pa.array(
+        [fivetran_id(row, algorithm) for row in rows],
+        type=pa.string(),
+    )
+
+
+def with_fivetran_id(
+    table: pa.Table,
+    *,
+    algorithm: str = "md5",
+) -> pa.Table:
+    """Append the `_fivetran_id` column.
+
+    Each row is hashed as `FivetranStreamMap.transform` would hash it as a
+    record, with timestamps as the ISO 8601 strings the SDK writes to RECORD
+    messages. Digests still differ from those of the same data sent as RECORD
+    messages wherever a table can't represent a record exactly:
+
+    - Every column is hashed, so a property missing from a record hashes as
+      `null`, as does each flattened property of a `null` object.
+    - Values nested past flattening are hashed as the JSON strings
+      `stringify_complex_columns` encodes them to, which are msgspec's
+      encoding, e.g. `1e-7` where RECORD messages get `1e-07`.
+    - Values are hashed as their column's type, e.g. `3.0` for an integer in a
+      `number` column.
+
+    The table is split into record batches of at most
+    `_FIVETRAN_ID_CHUNK_SIZE` rows, each of which is converted to Python,
+    encoded and hashed, then assembled straight into a chunked `pa.string()`
+    column, so only one chunk's rows are held as Python objects at a time.
+    The row conversion and encoding both hold the GIL, so this isn't spread
+    over threads; files of a BATCH message are already transformed
+    concurrently (see `batch_config.max_workers`).
+
+    Args:
+        table: The table to append the column to. Column names are assumed to
+            already be normalized, e.g. via `rename_columns`, and no other
+            system columns to have been appended yet.
+        algorithm: The digest to use, from
+            `mapper_fivetran._util.FIVETRAN_ID_ALGORITHMS`.
+
+    Returns:
+        A new table with the `_fivetran_id` column appended.
+    """
+    chunks = [
+        _fivetran_id_chunk(batch, algorithm)
+        for batch in table.to_batches(max_chunksize=_FIVETRAN_ID_CHUNK_SIZE)
+    ]
+
+    return table.append_column(
+        pa.field(SystemColumns.FIVETRAN_ID.value, pa.string()),
+        pa.chunked_array(chunks, type=pa.string()),
+    )
+
+
+_TIMESTAMP_TYPE = pa.timestamp("us", tz="UTC")
+
+
+def constant_column(
+    value: pa.Scalar,
+    length: int,
+    *,
+    encoding: str = "plain",
+) -> pa.Array:
+    """Build a column repeating one value, without a Python object per row.
+
+    Args:
+        value: The value to repeat.
+        length: The number of rows.
+        encoding: From `options.CONSTANT_COLUMN_ENCODINGS`. `"plain"`
+            materializes the value once per row, `"run_end"` stores it once as
+            a single run (Arrow IPC only; Parquet has no run-end encoding), and
+            `"dictionary"` stores it once with an 8-bit index per row.
+
+    Returns:
+        A new array of `length` rows.
+    """
+    if encoding == "run_end":
+        return pa.RunEndEncodedArray.from_arrays(
+            pa.array([length] if length else [], pa.int32()),
+            pa.array([value] if length else [], value.type),
+        )
+    if encoding == "dictionary":
+        return pa.DictionaryArray.from_arrays(
+            pa.repeat(pa.scalar(0, pa.int8()), length),
+            pa.array([value], value.type),
+        )
+    return pa.repeat(value, length)
+
+
+def with_fivetran_synced(
+    table: pa.Table,
+    *,
+    data_type: str = "string",
+    encoding: str = "plain",
+    clock: CoarseClock | None = None,
+) -> pa.Table:
     """Append the `_fivetran_synced` column, vectorized.
 
     Copies `_sdc_extracted_at` when present (nulls stay null), otherwise fills
@@ -175,24 +376,41 @@ def with_fivetran_synced(table: pa.Table) -> pa.Table:
     Args:
         table: The table to append the column to. Column names are assumed to
             already be normalized, e.g. via `rename_columns`.
+        data_type: From `options.FIVETRAN_SYNCED_TYPES`. `"string"` writes ISO
+            8601 strings, as the record-based transform does; `"timestamp"`
+            writes a native `timestamp[us, tz=UTC]`, parsing a string
+            `_sdc_extracted_at` (which must then have a zone offset).
+        encoding: How to encode the column when it's the current timestamp,
+            from `options.CONSTANT_COLUMN_ENCODINGS`; see `constant_column`.
+        clock: The clock to read the current timestamp from, e.g. a stream
+            map's, so it's shared with the record-based transform; the system
+            clock if `None`.
 
     Returns:
         A new table with the `_fivetran_synced` column appended.
     """
+    arrow_type = _TIMESTAMP_TYPE if data_type == "timestamp" else pa.string()
     idx = _column_index(table, _SDC_EXTRACTED_AT)
     synced: pa.Array | pa.ChunkedArray
     if idx is not None:
-        synced = pc.cast(table.column(idx), pa.string())
+        synced = pc.cast(table.column(idx), arrow_type)
     else:
-        now = datetime.now(timezone.utc).isoformat()
-        synced = pa.array([now] * table.num_rows, type=pa.string())
+        clock = clock or CoarseClock(0)
+        synced = constant_column(
+            pa.scalar(
+                clock.now() if data_type == "timestamp" else clock.isoformat(),
+                arrow_type,
+            ),
+            table.num_rows,
+            encoding=encoding,
+        )
     return table.append_column(
-        pa.field(SystemColumns.FIVETRAN_SYNCED.value, pa.string()),
+        pa.field(SystemColumns.FIVETRAN_SYNCED.value, synced.type),
         synced,
     )
 
 
-def with_fivetran_deleted(table: pa.Table) -> pa.Table:
+def with_fivetran_deleted(table: pa.Table, *, encoding: str = "plain") -> pa.Table:
     """Append the `_fivetran_deleted` column, vectorized.
 
     True wherever `_sdc_deleted_at` is present and non-empty; False when
@@ -202,6 +420,9 @@ def with_fivetran_deleted(table: pa.Table) -> pa.Table:
     Args:
         table: The table to append the column to. Column names are assumed to
             already be normalized, e.g. via `rename_columns`.
+        encoding: How to encode the column when it's constant (no
+            `_sdc_deleted_at`), from `options.CONSTANT_COLUMN_ENCODINGS`; see
+            `constant_column`.
 
     Returns:
         A new table with the `_fivetran_deleted` column appended.
@@ -209,7 +430,11 @@ def with_fivetran_deleted(table: pa.Table) -> pa.Table:
     idx = _column_index(table, _SDC_DELETED_AT)
     deleted: pa.Array | pa.ChunkedArray
     if idx is None:
-        deleted = pa.array([False] * table.num_rows, type=pa.bool_())
+        deleted = constant_column(
+            pa.scalar(False, pa.bool_()),  # noqa: FBT003
+            table.num_rows,
+            encoding=encoding,
+        )
     else:
         column = table.column(idx)
         deleted = pc.is_valid(column)
@@ -220,25 +445,280 @@ def with_fivetran_deleted(table: pa.Table) -> pa.Table:
             empty = pa.scalar("", type=column.type)
             deleted = pc.and_kleene(deleted, pc.not_equal(column, empty))  # ty:ignore[no-matching-overload]
     return table.append_column(
-        pa.field(SystemColumns.FIVETRAN_DELETED.value, pa.bool_()),
+        pa.field(SystemColumns.FIVETRAN_DELETED.value, deleted.type),
         deleted,
     )
 
 
-def transform_table(table: pa.Table, stream_map: StreamMap) -> pa.Table:
+def _preparation_key(stream_map: StreamMap) -> int | None:
+    if stream_map.flattening_enabled and stream_map.flattening_options is not None:
+        return stream_map.flattening_options.max_level
+    return None
+
+
+def _plan_columns(
+    fields: t.Iterable[pa.Field],
+    max_level: int | None,
+    path: tuple[int, ...] = (),
+) -> t.Iterator[tuple[tuple[int, ...], bool]]:
+    # mirrors `flatten_table`: a struct `len(path)` levels deep is expanded
+    # while that's below `max_level`
+    for i, field in enumerate(fields):
+        field_path = (*path, i)
+        if (
+            max_level is not None
+            and len(path) < max_level
+            and pa.types.is_struct(field.type)
+        ):
+            yield from _plan_columns(field.type, max_level, field_path)
+        else:
+            yield field_path, max_level is not None and _is_complex(field.type)
+
+
+class TablePlan:
+    """`prepare_table`, compiled for one input schema and flattening config.
+
+    Which struct fields flattening expands to, which of the resulting columns
+    need stringifying, and the renamed output schema are all worked out once,
+    so preparing each table is a single pass selecting (nested) columns,
+    encoding the complex ones and assembling them under the output schema.
+
+    Attributes:
+        input_schema: The schema of the tables to prepare.
+        max_level: The flattening max level, or `None` for no flattening.
+        schema: The schema of prepared tables.
+    """
+
+    def __init__(self, schema: pa.Schema, max_level: int | None) -> None:
+        """Compile a plan.
+
+        Args:
+            schema: The schema of the tables to prepare.
+            max_level: The flattening max level, or `None` for no flattening.
+        """
+        self.input_schema = schema
+        self.max_level = max_level
+
+        # derived from the unplanned transforms, so both agree on names,
+        # types and nullability by construction
+        empty = schema.empty_table()
+        if max_level is not None:
+            empty = stringify_complex_columns(flatten_table(empty, max_level))
+        self.schema = rename_columns(empty).schema
+        self._columns = tuple(_plan_columns(schema, max_level))
+
+    def prepare(
+        self,
+        table: pa.Table,
+        *,
+        metrics: StageMetrics | None = None,
+    ) -> pa.Table:
+        """Prepare a table, as `prepare_table` would.
+
+        Args:
+            table: The table to prepare, of the schema the plan was compiled for.
+            metrics: Metrics to add the time spent flattening, stringifying and
+                renaming to, if any.
+
+        Returns:
+            A new, flattened and renamed table, without system columns.
+        """
+        start = time.perf_counter()
+        # struct columns are flattened at most once each, however many of
+        # their fields are selected
+        children: dict[tuple[int, ...], list[pa.ChunkedArray]] = {}
+
+        def select(path: tuple[int, ...]) -> pa.ChunkedArray:
+            if len(path) == 1:
+                return table.column(path[0])
+            parent = path[:-1]
+            if parent not in children:
+                # combines parent and child validity, the same as `flatten()`
+                children[parent] = select(parent).flatten()
+            return children[parent][path[-1]]
+
+        columns = [select(path) for path, _ in self._columns]
+        flattened = time.perf_counter()
+
+        for i, (_, stringify) in enumerate(self._columns):
+            if stringify:
+                columns[i] = _stringify_column(columns[i])
+        stringified = time.perf_counter()
+
+        table = pa.Table.from_arrays(columns, schema=self.schema)
+        if metrics is not None:
+            metrics.flatten += flattened - start
+            metrics.stringify += stringified - flattened
+            metrics.rename += time.perf_counter() - stringified
+        return table
+
+
+_TABLE_PLAN_CACHE_SIZE = 64
+
+_table_plans: list[TablePlan] = []
+_table_plans_lock = threading.Lock()
+
+
+def table_plan(schema: pa.Schema, max_level: int | None) -> TablePlan:
+    """Get the (cached) `TablePlan` for an input schema and flattening config.
+
+    Every record batch of a BATCH file shares one schema, so this compiles a
+    plan once per file (or less) rather than once per batch. Plans are looked
+    up by schema equality rather than hash, since hashing a wide schema costs
+    more than comparing it.
+
+    Args:
+        schema: The schema of the tables to prepare.
+        max_level: The flattening max level, or `None` for no flattening.
+
+    Returns:
+        The compiled plan.
+    """
+    with _table_plans_lock:
+        for plan in _table_plans:
+            if plan.max_level == max_level and plan.input_schema.equals(schema):
+                return plan
+
+    plan = TablePlan(schema, max_level)
+    with _table_plans_lock:
+        _table_plans.insert(0, plan)
+        del _table_plans[_TABLE_PLAN_CACHE_SIZE:]
+    return plan
+
+
+def prepare_table(
+    table: pa.Table,
+    stream_map: StreamMap,
+    *,
+    metrics: StageMetrics | None = None,
+) -> pa.Table:
+    """Apply the stream map-independent BATCH transforms to an Arrow table.
+
+    Flattening, stringifying and renaming only depend on the stream map's
+    flattening options, so the result can be shared between stream maps of the
+    same stream with the same options; see `transform_tables`. The work is
+    planned once per distinct table schema; see `table_plan`.
+
+    Args:
+        table: The table to prepare.
+        stream_map: The registered stream map to source flattening options.
+        metrics: Metrics to add the time spent flattening, stringifying and
+            renaming to, if any.
+
+    Returns:
+        A new, flattened and renamed table, without system columns.
+    """
+    plan = table_plan(table.schema, _preparation_key(stream_map))
+    return plan.prepare(table, metrics=metrics)
+
+
+def transform_prepared_table(
+    table: pa.Table,
+    stream_map: StreamMap,
+    *,
+    constant_encoding: str = "plain",
+    clock: CoarseClock | None = None,
+) -> pa.Table:
+    """Append a stream map's system columns to a table from `prepare_table`.
+
+    Args:
+        table: The prepared table.
+        stream_map: The registered stream map to source key properties, the
+            `_fivetran_id` algorithm, the `_fivetran_synced` type and clock.
+        constant_encoding: How to encode system columns with the same value
+            for every row, from `options.CONSTANT_COLUMN_ENCODINGS`.
+        clock: The clock to read `_fivetran_synced` from, instead of the
+            stream map's.
+
+    Returns:
+        A new table with the system columns appended.
+    """
+    if SystemColumns.FIVETRAN_ID in (stream_map.transformed_key_properties or []):
+        table = with_fivetran_id(
+            table,
+            algorithm=getattr(stream_map, "fivetran_id_algorithm", "md5"),
+        )
+    table = with_fivetran_synced(
+        table,
+        data_type=getattr(stream_map, "fivetran_synced_type", "string"),
+        encoding=constant_encoding,
+        clock=clock or getattr(stream_map, "clock", None),
+    )
+    return with_fivetran_deleted(table, encoding=constant_encoding)
+
+
+def transform_table(
+    table: pa.Table,
+    stream_map: StreamMap,
+    *,
+    constant_encoding: str = "plain",
+    clock: CoarseClock | None = None,
+) -> pa.Table:
     """Apply the full set of Fivetran BATCH transforms to an Arrow table.
 
     Args:
         table: The table to transform.
         stream_map: The registered stream map to source flattening options,
             e.g. from `PluginMapper.stream_maps[stream_id]`.
+        constant_encoding: How to encode system columns with the same value
+            for every row, from `options.CONSTANT_COLUMN_ENCODINGS`.
+        clock: The clock to read `_fivetran_synced` from, instead of the
+            stream map's.
 
     Returns:
         A new, transformed table.
     """
-    if stream_map.flattening_enabled and stream_map.flattening_options is not None:
-        table = flatten_table(table, stream_map.flattening_options.max_level)
-        table = stringify_complex_columns(table)
-    table = rename_columns(table)
-    table = with_fivetran_synced(table)
-    return with_fivetran_deleted(table)
+    return transform_prepared_table(
+        prepare_table(table, stream_map),
+        stream_map,
+        constant_encoding=constant_encoding,
+        clock=clock,
+    )
+
+
+def transform_tables(
+    table: pa.Table,
+    stream_maps: t.Sequence[StreamMap],
+    *,
+    constant_encoding: str = "plain",
+    clock: CoarseClock | None = None,
+    metrics: StageMetrics | None = None,
+) -> list[pa.Table]:
+    """Apply `transform_table` for each of a stream's stream maps.
+
+    `prepare_table` is run once per distinct set of flattening options rather
+    than once per stream map, so aliases of the same stream don't repeat the
+    flattening and (row-wise) JSON encoding of complex columns.
+
+    Args:
+        table: The table to transform.
+        stream_maps: The registered stream maps of the table's stream.
+        constant_encoding: How to encode system columns with the same value
+            for every row, from `options.CONSTANT_COLUMN_ENCODINGS`.
+        clock: The clock to read `_fivetran_synced` from, instead of each
+            stream map's.
+        metrics: Metrics to add the time spent in each transform stage to, if
+            any.
+
+    Returns:
+        A new, transformed table for each stream map, in order.
+    """
+    prepared: dict[int | None, pa.Table] = {}
+    tables = []
+    for stream_map in stream_maps:
+        key = _preparation_key(stream_map)
+        if key not in prepared:
+            prepared[key] = prepare_table(table, stream_map, metrics=metrics)
+
+        start = time.perf_counter()
+        tables.append(
+            transform_prepared_table(
+                prepared[key],
+                stream_map,
+                constant_encoding=constant_encoding,
+                clock=clock,
+            )
+        )
+        if metrics is not None:
+            metrics.system_columns += time.perf_counter() - start
+    return tables
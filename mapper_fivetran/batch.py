@@ -0,0 +1,993 @@
+"""Arrow IPC, Parquet and JSONL BATCH file input and output.
+
+Everything here works a record batch at a time, so memory use is bounded by
+the size of a record batch rather than of a whole file: streaming BATCH files
+through the transforms in `mapper_fivetran.arrow`, splitting output across
+files by row count and size, and converting buffered RECORD messages into
+Arrow record batches to begin with.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import io
+import itertools
+import logging
+import math
+import queue
+import threading
+import time
+import typing as t
+from dataclasses import dataclass
+
+import msgspec
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pyarrow import ipc
+
+from mapper_fivetran import storage
+from mapper_fivetran._util import CoarseClock, new_uuid
+from mapper_fivetran.arrow import records_to_batch, transform_tables
+from mapper_fivetran.metrics import StageMetrics
+from mapper_fivetran.options import (
+    BATCH_FORMATS,
+    CONSTANT_COLUMN_ENCODINGS,
+    IPC_COMPRESSION_CODECS,
+    JSONL_COMPRESSION_CODECS,
+    PARQUET_COMPRESSION_CODECS,
+)
+
+if t.TYPE_CHECKING:
+    from singer_sdk.mapper import StreamMap
+
+    from mapper_fivetran.storage import Location
+
+
+_COMPRESSION_CODECS = {
+    "arrow": IPC_COMPRESSION_CODECS,
+    "parquet": PARQUET_COMPRESSION_CODECS,
+    "jsonl": JSONL_COMPRESSION_CODECS,
+}
+_DEFAULT_COMPRESSION = {"parquet": "snappy"}
+
+_FILE_EXTENSIONS = {"arrow": "arrow", "parquet": "parquet", "jsonl": "jsonl"}
+
+# the number of lines decoded and converted to Arrow at a time
+_JSONL_BLOCK_SIZE = 8192
+
+# matches `pyarrow.parquet.ParquetWriter.write_table`'s own default
+_PARQUET_ROW_GROUP_SIZE = 1024 * 1024
+
+
+def ipc_write_options(
+    compression: str | None = None,
+    *,
+    compression_level: int | None = None,
+    use_threads: bool = True,
+) -> ipc.IpcWriteOptions:
+    """Build the options to write Arrow IPC BATCH files with.
+
+    Args:
+        compression: The buffer compression codec, from `IPC_COMPRESSION_CODECS`,
+            or `None` to write uncompressed.
+        compression_level: The codec's compression level, or `None` for the
+            codec's default.
+        use_threads: Whether to compress a record batch's buffers in parallel.
+
+    Returns:
+        New IPC write options.
+    """
+    codec = compression and pa.Codec(compression, compression_level)
+    return ipc.IpcWriteOptions(compression=codec or None, use_threads=use_threads)
+
+
+class BatchFileWriter(t.Protocol):
+    """A writer of transformed tables to a single BATCH file."""
+
+    def write_table(self, table: pa.Table) -> None:
+        """Write a table."""
+
+    def close(self) -> None:
+        """Finish writing the file."""
+
+
+class _ParquetFileWriter:
+    # buffers tables until a full row group's worth of rows is available, so
+    # row groups are sized by `row_group_size` rather than by however many rows
+    # each transformed record batch happens to have
+    def __init__(
+        self,
+        writer: pq.ParquetWriter,
+        row_group_size: int | None,
+    ) -> None:
+        self._writer = writer
+        self._row_group_size = row_group_size or _PARQUET_ROW_GROUP_SIZE
+        self._tables: list[pa.Table] = []
+        self._rows = 0
+
+    def write_table(self, table: pa.Table) -> None:
+        self._tables.append(table)
+        self._rows += table.num_rows
+        if self._rows >= self._row_group_size:
+            self._write_row_groups(final=False)
+
+    def _write_row_groups(self, *, final: bool) -> None:
+        table = pa.concat_tables(self._tables)
+        full_rows = table.num_rows
+        if not final:
+            full_rows -= full_rows % self._row_group_size
+
+        if full_rows:
+            self._writer.write_table(
+                table.slice(0, full_rows),
+                row_group_size=self._row_group_size,
+            )
+
+        remainder = table.slice(full_rows)
+        self._tables = [remainder] if remainder.num_rows else []
+        self._rows = remainder.num_rows
+
+    def close(self) -> None:
+        if self._tables:
+            self._write_row_groups(final=True)
+        self._writer.close()
+
+
+_JSONL_ENCODER = msgspec.json.Encoder(decimal_format="number")
+
+
+class _JsonlFileWriter:
+    def __init__(self, sink: pa.NativeFile) -> None:
+        self._sink = sink
+
+    def write_table(self, table: pa.Table) -> None:
+        self._sink.write(_JSONL_ENCODER.encode_lines(table.to_pylist()))
+
+    def close(self) -> None:
+        self._sink.close()
+
+
+class _SinkFileWriter:
+    # closes the output stream a format writer was opened on, which the format
+    # writer leaves open
+    def __init__(self, writer: BatchFileWriter, sink: pa.NativeFile) -> None:
+        self._writer = writer
+        self._sink = sink
+
+    def write_table(self, table: pa.Table) -> None:
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        try:
+            self._writer.close()
+        finally:
+            self._sink.close()
+
+
+def _open_jsonl(location: Location, *, compressed: bool) -> t.BinaryIO:
+    # decompressed by Arrow, and buffered for line iteration
+    stream = storage.open_input_stream(
+        location,
+        compression="gzip" if compressed else None,
+    )
+    return io.BufferedReader(stream)  # ty:ignore[invalid-argument-type]
+
+
+def _read_jsonl_tables(file: t.BinaryIO, schema: pa.Schema) -> t.Iterator[pa.Table]:
+    decoder = msgspec.json.Decoder(dict)
+    while lines := list(itertools.islice(file, _JSONL_BLOCK_SIZE)):
+        records = decoder.decode_lines(b"".join(lines))
+        yield pa.Table.from_batches([records_to_batch(records, schema)])
+
+
+@dataclass(frozen=True)
+class BatchEncoding:
+    """How BATCH files are written: format, compression and format options."""
+
+    format: str = "arrow"
+    """The file format, from `BATCH_FORMATS`."""
+
+    compression: str | None = None
+    """The compression codec, or `None` for the format's default."""
+
+    compression_level: int | None = None
+    """The codec's compression level, or `None` for the codec's default."""
+
+    use_threads: bool = True
+    """Whether to compress Arrow IPC buffers in parallel."""
+
+    row_group_size: int | None = None
+    """The maximum number of rows per Parquet row group."""
+
+    use_dictionary: bool | list[str] = True
+    """Whether to dictionary-encode Parquet columns, or which columns to."""
+
+    constant_columns: str = "plain"
+    """How to encode constant system columns, from `CONSTANT_COLUMN_ENCODINGS`.
+
+    Only applies to BATCH files transformed as Arrow tables.
+    """
+
+    def __post_init__(self) -> None:
+        """Validate the format, codec and constant column encoding.
+
+        Raises:
+            ValueError: If the format is unsupported, or the codec or constant
+                column encoding isn't supported for it.
+        """
+        if self.format not in BATCH_FORMATS:
+            msg = f"Unsupported BATCH encoding format: {self.format!r}"
+            raise ValueError(msg)
+
+        codecs = _COMPRESSION_CODECS[self.format]
+        if self.compression is not None and self.compression not in codecs:
+            msg = (
+                f"Unsupported compression for {self.format!r} BATCH encoding: "
+                f"{self.compression!r}"
+            )
+            raise ValueError(msg)
+
+        # Parquet has no run-end encoding to write run-end encoded arrays as
+        if self.constant_columns not in CONSTANT_COLUMN_ENCODINGS or (
+            self.constant_columns == "run_end" and self.format == "parquet"
+        ):
+            msg = (
+                f"Unsupported constant column encoding for {self.format!r} BATCH "
+                f"encoding: {self.constant_columns!r}"
+            )
+            raise ValueError(msg)
+
+    @classmethod
+    def from_config(cls, encoding: dict) -> BatchEncoding:
+        """Build from a `batch_config.encoding` setting.
+
+        Args:
+            encoding: The `batch_config.encoding` setting value.
+
+        Returns:
+            A new encoding.
+        """
+        return cls(**{k: v for k, v in encoding.items() if v is not None})
+
+    @property
+    def codec(self) -> str | None:
+        """The codec files are written with, including the format's default."""
+        return self.compression or _DEFAULT_COMPRESSION.get(self.format)
+
+    @property
+    def extension(self) -> str:
+        """The file extension for the format (and compression, for JSONL)."""
+        if self.format == "jsonl" and self.compression == "gzip":
+            return "jsonl.gz"
+        return _FILE_EXTENSIONS[self.format]
+
+    def to_dict(self) -> dict:
+        """Describe the encoding for a BATCH message.
+
+        Returns:
+            The BATCH message `encoding`.
+        """
+        encoding: dict = {"format": self.format}
+        if self.codec is not None:
+            encoding["compression"] = self.codec
+            if self.compression_level is not None:
+                encoding["compression_level"] = self.compression_level
+        return encoding
+
+    @functools.cached_property
+    def _ipc_write_options(self) -> ipc.IpcWriteOptions:
+        return ipc_write_options(
+            self.compression,
+            compression_level=self.compression_level,
+            use_threads=self.use_threads,
+        )
+
+    def open_writer(self, location: Location, schema: pa.Schema) -> BatchFileWriter:
+        """Open a new file to write tables to.
+
+        Args:
+            location: The file to write, local or remote.
+            schema: The schema of every table that will be written.
+
+        Returns:
+            A new writer, to be closed once every table has been written.
+        """
+        if self.format == "jsonl":
+            return _JsonlFileWriter(
+                storage.open_output_stream(
+                    location,
+                    compression="gzip" if self.compression == "gzip" else None,
+                )
+            )
+
+        sink = storage.open_output_stream(location)
+        try:
+            if self.format == "parquet":
+                writer: BatchFileWriter = _ParquetFileWriter(
+                    pq.ParquetWriter(
+                        sink,
+                        schema,
+                        compression=self.codec,
+                        compression_level=self.compression_level,
+                        use_dictionary=self.use_dictionary,
+                    ),
+                    self.row_group_size,
+                )
+            else:
+                writer = ipc.new_file(sink, schema, options=self._ipc_write_options)
+        except BaseException:
+            sink.close()
+            raise
+        return _SinkFileWriter(writer, sink)
+
+
+@contextlib.contextmanager
+def read_batch_file(
+    location: Location,
+    src_encoding: dict,
+    *,
+    schema: pa.Schema | None = None,
+    memory_map: bool = False,
+) -> t.Iterator[tuple[pa.Schema, t.Iterator[pa.Table]]]:
+    """Open a BATCH file to be read a chunk at a time.
+
+    Arrow IPC files are read a record batch at a time, and Parquet files a row
+    group at a time. JSONL files (gzipped or not) are decoded a fixed number of
+    lines at a time, and converted to `schema` as they are.
+
+    Remote files are read in place, with ranged requests for the parts needed:
+    a record batch of an Arrow IPC file at a time, and the column chunks of a
+    Parquet row group, fetched concurrently and coalesced into fewer requests.
+
+    Args:
+        location: The file to read, local or remote.
+        src_encoding: The file's BATCH message `encoding`.
+        schema: The Arrow schema to convert JSONL records to, e.g. from
+            `mapper_fivetran.arrow.json_schema_to_arrow`. Required for JSONL.
+        memory_map: Whether to memory-map the file instead of reading it. Only
+            applies to local Arrow IPC and Parquet files.
+
+    Yields:
+        The file's schema, and an iterator over its chunks as tables.
+
+    Raises:
+        ValueError: If the format is unsupported, or no schema was given for a
+            JSONL file.
+    """
+    file_format = src_encoding.get("format")
+
+    if file_format == "jsonl":
+        if schema is None:
+            msg = "A schema is required to read JSONL BATCH files"
+            raise ValueError(msg)
+
+        compressed = src_encoding.get("compression") == "gzip"
+        with _open_jsonl(location, compressed=compressed) as file:
+            yield schema, _read_jsonl_tables(file, schema)
+        return
+
+    if file_format not in {"arrow", "parquet"}:
+        msg = f"Unsupported BATCH encoding format: {file_format!r}"
+        raise ValueError(msg)
+
+    with contextlib.ExitStack() as stack:
+        source = stack.enter_context(
+            storage.open_input_file(location, memory_map=memory_map)
+        )
+
+        if file_format == "parquet":
+            parquet_file = stack.enter_context(
+                contextlib.closing(
+                    pq.ParquetFile(source, pre_buffer=not storage.is_local(location))
+                )
+            )
+            yield (
+                parquet_file.schema_arrow,
+                (
+                    parquet_file.read_row_group(i)
+                    for i in range(parquet_file.num_row_groups)
+                ),
+            )
+            return
+
+        reader = stack.enter_context(ipc.open_file(source))
+        yield (
+            reader.schema,
+            (
+                pa.Table.from_batches([reader.get_batch(i)])
+                for i in range(reader.num_record_batches)
+            ),
+        )
+
+
+_T = t.TypeVar("_T")
+
+_DONE = object()
+
+# how often a blocked stage checks whether the pipeline has been stopped
+_STAGE_POLL_INTERVAL = 0.1
+
+
+class _StageError(t.NamedTuple):
+    error: BaseException
+
+
+def _put(buffer: queue.Queue, item: object, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            buffer.put(item, timeout=_STAGE_POLL_INTERVAL)
+        except queue.Full:
+            continue
+        return True
+    return False
+
+
+def _read_ahead(
+    items: t.Iterable[_T],
+    queue_size: int,
+    metrics: StageMetrics,
+) -> t.Iterator[_T]:
+    # iterate `items` on a separate thread, up to `queue_size` items ahead of
+    # the consumer; inline when `queue_size` is 0
+    iterator = iter(items)
+
+    def read() -> object:
+        start = time.perf_counter()
+        item = next(iterator, _DONE)
+        metrics.read += time.perf_counter() - start
+        return item
+
+    if queue_size <= 0:
+        while (item := read()) is not _DONE:
+            yield t.cast("_T", item)
+        return
+
+    buffer: queue.Queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def produce() -> None:
+        try:
+            while _put(buffer, item := read(), stop) and item is not _DONE:
+                pass
+        except BaseException as e:  # noqa: BLE001
+            _put(buffer, _StageError(e), stop)
+
+    thread = threading.Thread(target=produce, name="batch-reader", daemon=True)
+    thread.start()
+    try:
+        while (item := buffer.get()) is not _DONE:
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
+    finally:
+        # the reader may be blocked on a full queue if the consumer stopped
+        # early; it must be done with `items` before they're closed
+        stop.set()
+        thread.join()
+
+
+class _WriteBehind:
+    # writes submitted items on a separate thread, up to `queue_size` behind
+
+    def __init__(self, write: t.Callable[[_T], None], queue_size: int) -> None:
+        self._write = write
+        self._buffer: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._errors: list[BaseException] = []
+        self._aborted = threading.Event()
+        self._thread = threading.Thread(
+            target=self._consume,
+            name="batch-writer",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _consume(self) -> None:
+        # keeps draining after an error, so submitting never blocks forever
+        while (item := self._buffer.get()) is not _DONE:
+            if self._errors or self._aborted.is_set():
+                continue
+            try:
+                self._write(item)
+            except BaseException as e:  # noqa: BLE001
+                self._errors.append(e)
+
+    def submit(self, item: _T) -> None:
+        if self._errors:
+            raise self._errors[0]
+        self._buffer.put(item)
+
+    def close(self, *, abort: bool = False) -> None:
+        if abort:
+            self._aborted.set()
+        self._buffer.put(_DONE)
+        self._thread.join()
+        if self._errors and not abort:
+            raise self._errors[0]
+
+
+@contextlib.contextmanager
+def _write_behind(
+    write: t.Callable[[_T], None],
+    queue_size: int,
+    metrics: StageMetrics,
+) -> t.Iterator[t.Callable[[_T], None]]:
+    # yield a function queueing items for `write` on a separate thread, up to
+    # `queue_size` items behind; inline when `queue_size` is 0. Every queued
+    # item has been written on exit, and the first write error raised.
+    def timed_write(item: _T) -> None:
+        start = time.perf_counter()
+        write(item)
+        metrics.write += time.perf_counter() - start
+
+    if queue_size <= 0:
+        yield timed_write
+        return
+
+    writer = _WriteBehind(timed_write, queue_size)
+    try:
+        yield writer.submit
+    except BaseException:
+        writer.close(abort=True)
+        raise
+    writer.close()
+
+
+def _file_clock() -> CoarseClock:
+    # read only once, so every chunk written to an output file has the same
+    # `_fivetran_synced`: an Arrow IPC file can't replace the dictionary of a
+    # dictionary-encoded column between record batches
+    return CoarseClock(math.inf)
+
+
+def _measured_transform(
+    table: pa.Table,
+    stream_maps: t.Sequence[StreamMap],
+    *,
+    constant_encoding: str,
+    clock: CoarseClock,
+    metrics: StageMetrics,
+) -> list[pa.Table]:
+    start = time.perf_counter()
+    transformed_tables = transform_tables(
+        table,
+        stream_maps,
+        constant_encoding=constant_encoding,
+        clock=clock,
+        metrics=metrics,
+    )
+    metrics.transform += time.perf_counter() - start
+    metrics.rows_in += table.num_rows
+    metrics.rows_out += sum(transformed.num_rows for transformed in transformed_tables)
+    return transformed_tables
+
+
+def transform_file(  # noqa: PLR0913
+    src_path: Location,
+    stream_maps: t.Sequence[StreamMap],
+    out_paths: t.Sequence[Location],
+    *,
+    src_encoding: dict | None = None,
+    src_schema: pa.Schema | None = None,
+    memory_map: bool = False,
+    encoding: BatchEncoding | None = None,
+    read_queue_size: int = 0,
+    write_queue_size: int = 0,
+    metrics: StageMetrics | None = None,
+) -> None:
+    """Transform a BATCH file for each stream map, a chunk at a time.
+
+    Each output file's schema is derived once up front, from an empty table of
+    the source schema, so every transformed chunk can be written out as soon as
+    it's produced. Arrow IPC and Parquet chunks stay Arrow throughout; nothing
+    is converted to Python objects beyond what `mapper_fivetran.arrow` itself
+    requires.
+
+    Reading, transforming and writing can be pipelined: with a
+    `read_queue_size`, source chunks (see `read_batch_file`) are read on a
+    separate thread, up to that many chunks ahead of the transform, and with a
+    `write_queue_size`, transformed chunks are written on a separate thread,
+    up to that many chunks behind it. Reading and writing mostly release the
+    GIL, so all three stages can make progress at once. At most
+    `read_queue_size + write_queue_size + 1` source chunks, and their
+    transformed counterparts, are held in memory at once, however large the
+    file.
+
+    With `memory_map`, the file is memory-mapped rather than read into memory,
+    so columns passed through untouched are written straight from the page
+    cache, never copied onto the heap. This only helps uncompressed files:
+    compressed buffers are decompressed into memory regardless. Every buffer
+    referencing the mapping is released by the time this returns, so the file
+    can safely be deleted afterwards.
+
+    The current time is read once, so records without `_sdc_extracted_at` have
+    the same `_fivetran_synced` throughout each output file (as a dictionary
+    encoded column must, in an Arrow IPC file).
+
+    Args:
+        src_path: The BATCH file to read, local or remote.
+        stream_maps: The stream maps to transform the file for.
+        out_paths: The file to write for each stream map, in order, local or
+            remote.
+        src_encoding: The source file's BATCH message `encoding`. Defaults to
+            uncompressed Arrow IPC.
+        src_schema: The Arrow schema to read JSONL source files as.
+        memory_map: Whether to memory-map the file instead of reading it.
+        encoding: How to write output files. Defaults to uncompressed Arrow IPC.
+        read_queue_size: The number of source chunks to read ahead, on a
+            separate thread. 0 to read chunks as they're transformed.
+        write_queue_size: The number of transformed chunks to queue for
+            writing, on a separate thread. 0 to write chunks as they're
+            transformed.
+        metrics: Metrics to add rows processed and the time spent in each
+            stage to, if any.
+    """
+    encoding = encoding or BatchEncoding()
+    metrics = metrics if metrics is not None else StageMetrics()
+    clock = _file_clock()
+
+    with contextlib.ExitStack() as stack:
+        schema, tables = stack.enter_context(
+            read_batch_file(
+                src_path,
+                src_encoding or {"format": "arrow"},
+                schema=src_schema,
+                memory_map=memory_map,
+            )
+        )
+        writers = [
+            stack.enter_context(
+                contextlib.closing(encoding.open_writer(out_path, transformed.schema))
+            )
+            for transformed, out_path in zip(
+                transform_tables(
+                    schema.empty_table(),
+                    stream_maps,
+                    constant_encoding=encoding.constant_columns,
+                    clock=clock,
+                ),
+                out_paths,
+            )
+        ]
+
+        def write(transformed_tables: list[pa.Table]) -> None:
+            for transformed, writer in zip(transformed_tables, writers):
+                writer.write_table(transformed)
+
+        submit = stack.enter_context(_write_behind(write, write_queue_size, metrics))
+        for table in _read_ahead(tables, read_queue_size, metrics):
+            submit(
+                _measured_transform(
+                    table,
+                    stream_maps,
+                    constant_encoding=encoding.constant_columns,
+                    clock=clock,
+                    metrics=metrics,
+                )
+            )
+
+
+class RollingBatchWriter:
+    """Write record batches to Arrow IPC files, rolling over at a size limit.
+
+    A new file is started whenever the current one reaches `max_rows` rows or
+    `max_bytes` bytes (estimated from the in-memory size of what's been written
+    to it), splitting record batches across files where necessary. A new file
+    is also started for a record batch with a different schema to the current
+    file's, since each file has a single schema.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        directory: Location,
+        prefix: str,
+        schema: pa.Schema,
+        *,
+        max_rows: int | None = None,
+        max_bytes: int | None = None,
+        encoding: BatchEncoding | None = None,
+    ) -> None:
+        """Initialize the writer. No file is created until the first write.
+
+        Args:
+            directory: The directory to write files to, local or remote.
+            prefix: The filename prefix, e.g. the stream alias.
+            schema: The schema of the batches that will be written, until one
+                with a different schema is.
+            max_rows: The maximum number of rows per file, if any.
+            max_bytes: The maximum (estimated) size per file, in bytes, if any.
+                Estimated before compression.
+            encoding: How to write files. Defaults to uncompressed Arrow IPC.
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.schema = schema
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.encoding = encoding or BatchEncoding()
+
+        self._id = new_uuid().hex
+        self._index = 0
+        self._writer: BatchFileWriter | None = None
+        self._path: Location | None = None
+        self._rows = 0
+        self._bytes = 0
+
+    def _rows_available(self, batch: pa.RecordBatch, offset: int) -> int:
+        rows = batch.num_rows - offset
+
+        if self.max_rows is not None:
+            rows = min(rows, self.max_rows - self._rows)
+
+        if self.max_bytes is not None and batch.nbytes:
+            row_bytes = batch.nbytes / batch.num_rows
+            rows = min(rows, math.ceil((self.max_bytes - self._bytes) / row_bytes))
+
+        return max(rows, 1)
+
+    def _is_full(self) -> bool:
+        return (self.max_rows is not None and self._rows >= self.max_rows) or (
+            self.max_bytes is not None and self._bytes >= self.max_bytes
+        )
+
+    def write(self, batch: pa.RecordBatch) -> list[str]:
+        """Write a record batch, rolling over to new files as needed.
+
+        Args:
+            batch: The record batch to write.
+
+        Returns:
+            URIs of any files completed by this write.
+        """
+        completed = []
+        if not batch.schema.equals(self.schema):
+            completed.extend(self.close())
+            self.schema = batch.schema
+
+        offset = 0
+        while offset < batch.num_rows:
+            if self._writer is None:
+                name = f"{self.prefix}_{self._id}_{self._index}"
+                self._path = storage.join(
+                    self.directory, f"{name}.{self.encoding.extension}"
+                )
+                self._writer = self.encoding.open_writer(self._path, self.schema)
+                self._index += 1
+
+            chunk = batch.slice(offset, self._rows_available(batch, offset))
+            self._writer.write_table(pa.Table.from_batches([chunk]))
+            self._rows += chunk.num_rows
+            self._bytes += chunk.nbytes
+            offset += chunk.num_rows
+
+            if self._is_full():
+                completed.extend(self.close())
+
+        return completed
+
+    def close(self) -> list[str]:
+        """Close the current file, if any.
+
+        Returns:
+            The URI of the closed file, if there was one.
+        """
+        if self._writer is None:
+            return []
+
+        self._writer.close()
+        self._writer = None
+        self._rows = 0
+        self._bytes = 0
+        return [storage.to_uri(t.cast("Location", self._path))]
+
+
+def transform_files(  # noqa: PLR0913
+    src_paths: t.Sequence[Location],
+    stream_maps: t.Sequence[StreamMap],
+    writers: t.Sequence[RollingBatchWriter],
+    *,
+    src_encoding: dict | None = None,
+    src_schema: pa.Schema | None = None,
+    memory_map: bool = False,
+    constant_encoding: str = "plain",
+    read_queue_size: int = 0,
+    write_queue_size: int = 0,
+    metrics: StageMetrics | None = None,
+) -> list[list[str]]:
+    """Transform BATCH files for each stream map into size-limited files.
+
+    Unlike `transform_file`, output files don't correspond to source files:
+    every source file's transformed chunks are written, in order, to one
+    `RollingBatchWriter` per stream map, so small source files are merged into
+    the same output file and large ones are split across several. Files are
+    read one at a time, a chunk at a time, and pipelined as by
+    `transform_file`. As there, the current time is read once for
+    `_fivetran_synced`, so is the same throughout every output file.
+
+    Args:
+        src_paths: The BATCH files to read, in order, local or remote.
+        stream_maps: The stream maps to transform the files for.
+        writers: The writer for each stream map, in order. Every writer is
+            closed once all files have been transformed.
+        src_encoding: The source files' BATCH message `encoding`. Defaults to
+            uncompressed Arrow IPC.
+        src_schema: The Arrow schema to read JSONL source files as.
+        memory_map: Whether to memory-map the files instead of reading them.
+        constant_encoding: How to encode constant system columns, from
+            `mapper_fivetran.options.CONSTANT_COLUMN_ENCODINGS`.
+        read_queue_size: The number of source chunks to read ahead, on a
+            separate thread. 0 to read chunks as they're transformed.
+        write_queue_size: The number of transformed chunks to queue for
+            writing, on a separate thread. 0 to write chunks as they're
+            transformed.
+        metrics: Metrics to add rows processed and the time spent in each
+            stage to, if any.
+
+    Returns:
+        URIs of the files written for each stream map, in order.
+    """
+    metrics = metrics if metrics is not None else StageMetrics()
+    clock = _file_clock()
+    manifests: list[list[str]] = [[] for _ in writers]
+
+    def write(transformed_tables: list[pa.Table]) -> None:
+        for transformed, writer, manifest in zip(
+            transformed_tables, writers, manifests
+        ):
+            for batch in transformed.to_batches():
+                manifest.extend(writer.write(batch))
+
+    try:
+        with _write_behind(write, write_queue_size, metrics) as submit:
+            for src_path in src_paths:
+                with read_batch_file(
+                    src_path,
+                    src_encoding or {"format": "arrow"},
+                    schema=src_schema,
+                    memory_map=memory_map,
+                ) as (_, tables):
+                    for table in _read_ahead(tables, read_queue_size, metrics):
+                        submit(
+                            _measured_transform(
+                                table,
+                                stream_maps,
+                                constant_encoding=constant_encoding,
+                                clock=clock,
+                                metrics=metrics,
+                            )
+                        )
+    except BaseException:
+        # no partial output: files completed so far may hold rows of the
+        # failed file, so everything written is removed
+        for writer, manifest in zip(writers, manifests):
+            for uri in (*manifest, *writer.close()):
+                storage.delete(storage.from_uri(uri), missing_ok=True)
+        raise
+
+    for writer, manifest in zip(writers, manifests):
+        manifest.extend(writer.close())
+    return manifests
+
+
+class RecordBatchSink:
+    """Convert one stream's transformed records to Arrow IPC BATCH files.
+
+    Records are buffered and converted to Arrow `chunk_size` rows at a time, and
+    each converted record batch is written straight to a `RollingBatchWriter`.
+
+    Properties not in the writer's schema have no column to be written to, so
+    are dropped, with a warning the first time each is seen. Records with a
+    value that can't be converted to its column's type (e.g. a string for an
+    `integer` property) are instead passed back, in order, to be written as
+    RECORD messages, with a warning the first time.
+    """
+
+    def __init__(
+        self,
+        writer: RollingBatchWriter,
+        *,
+        chunk_size: int,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        """Initialize the sink.
+
+        Args:
+            writer: The writer to write converted record batches to.
+            chunk_size: The number of records to convert to Arrow at a time.
+            logger: The logger to warn of dropped properties with. Defaults to
+                this module's.
+        """
+        self.writer = writer
+        self.chunk_size = chunk_size
+        self.logger = logger or logging.getLogger(__name__)
+        self._records: list[dict] = []
+        self._dropped: set[str] = set()
+        self._rejected = False
+
+    def append(self, record: dict) -> list[str | dict]:
+        """Buffer a transformed record.
+
+        Args:
+            record: The record to buffer.
+
+        Returns:
+            URIs of any files completed as a result, interleaved with any
+            records that don't fit the schema, in the order they must be
+            written.
+        """
+        self._records.append(record)
+        if len(self._records) < self.chunk_size:
+            return []
+        return self._write_records()
+
+    def _write_records(self) -> list[str | dict]:
+        if not self._records:
+            return []
+
+        records, self._records = self._records, []
+        self._warn_dropped(records)
+        try:
+            batch = records_to_batch(records, self.writer.schema)
+        except ValueError:
+            return self._write_records_individually(records)
+        return list(self.writer.write(batch))
+
+    def _write_records_individually(self, records: list[dict]) -> list[str | dict]:
+        # the file written so far is closed before each record that doesn't
+        # fit, so nothing overtakes that record
+        outputs: list[str | dict] = []
+        fitting: list[dict] = []
+        for record in records:
+            error = self._conversion_error(record)
+            if error is None:
+                fitting.append(record)
+                continue
+
+            if fitting:
+                outputs += self.writer.write(
+                    records_to_batch(fitting, self.writer.schema)
+                )
+                fitting = []
+            outputs += self.writer.close()
+            outputs.append(record)
+            self._warn_rejected(error)
+
+        if fitting:
+            outputs += self.writer.write(records_to_batch(fitting, self.writer.schema))
+        return outputs
+
+    def _conversion_error(self, record: dict) -> ValueError | None:
+        try:
+            records_to_batch([record], self.writer.schema)
+        except ValueError as e:
+            return e
+        return None
+
+    def _warn_rejected(self, error: ValueError) -> None:
+        if not self._rejected:
+            self._rejected = True
+            self.logger.warning(
+                "Writing records of stream '%s' that don't fit its schema as "
+                "RECORD messages: %s",
+                self.writer.prefix,
+                error,
+            )
+
+    def _warn_dropped(self, records: list[dict]) -> None:
+        dropped = set().union(*records) - set(self.writer.schema.names) - self._dropped
+        if dropped:
+            self._dropped |= dropped
+            self.logger.warning(
+                "Dropping properties of stream '%s' not in its schema: %s",
+                self.writer.prefix,
+                ", ".join(sorted(dropped)),
+            )
+
+    def flush(self) -> list[str | dict]:
+        """Write any buffered records and close the current file.
+
+        Returns:
+            URIs of every file completed as a result, interleaved with any
+            records that don't fit the schema, as for `append`.
+        """
+        return [*self._write_records(), *self.writer.close()]
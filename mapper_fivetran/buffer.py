@@ -0,0 +1,94 @@
+"""Bounded, per-stream buffering of mapped RECORD messages.
+
+Used to micro-batch the record path: rather than writing (and flushing) one
+message at a time, mapped messages are buffered per stream and drained in bulk
+once any of the configured row, byte or latency bounds is reached. Callers are
+responsible for draining every buffer before forwarding a message that must
+not overtake buffered records, e.g. STATE, and for checking every buffer's
+`expired` as lines are read, so that a buffer on an idle stream isn't held
+back waiting for that stream's next record.
+"""
+
+from __future__ import annotations
+
+import time
+import typing as t
+
+T = t.TypeVar("T")
+
+
+class RecordBuffer(t.Generic[T]):
+    """Buffered items for a single stream, bounded by rows, bytes and latency."""
+
+    def __init__(
+        self,
+        *,
+        max_rows: int,
+        max_bytes: int,
+        max_latency: float,
+    ) -> None:
+        """Initialize an empty buffer.
+
+        Args:
+            max_rows: The number of buffered items at which the buffer is full.
+            max_bytes: The total size, in bytes, at which the buffer is full.
+            max_latency: The age, in seconds, of the oldest buffered item at
+                which the buffer is full.
+        """
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_latency = max_latency
+
+        self.items: list[T] = []
+        self.nbytes = 0
+        self._oldest: float | None = None
+
+    def __len__(self) -> int:
+        """Return the number of buffered items."""
+        return len(self.items)
+
+    def append(self, item: T, nbytes: int) -> bool:
+        """Buffer an item.
+
+        Args:
+            item: The item to buffer.
+            nbytes: The (estimated) size of the item, in bytes.
+
+        Returns:
+            True if the buffer is now full and should be drained.
+        """
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+
+        self.items.append(item)
+        self.nbytes += nbytes
+
+        return (
+            len(self.items) >= self.max_rows
+            or self.nbytes >= self.max_bytes
+            or self.expired()
+        )
+
+    def expired(self) -> bool:
+        """Check the age of the oldest buffered item.
+
+        Returns:
+            True if the oldest buffered item has been buffered for at least
+            `max_latency`, so the buffer should be drained.
+        """
+        return (
+            self._oldest is not None
+            and time.monotonic() - self._oldest >= self.max_latency
+        )
+
+    def drain(self) -> list[T]:
+        """Empty the buffer.
+
+        Returns:
+            The buffered items, in the order they were appended.
+        """
+        items = self.items
+        self.items = []
+        self.nbytes = 0
+        self._oldest = None
+        return items
@@ -0,0 +1,192 @@
+"""Typed decoding of RECORD messages, against each stream's registered schema.
+
+msgspec decodes JSON into a `Struct` with far fewer allocations than into a
+`dict`: keys are matched against the struct's field names rather than each
+allocated as a new `str`, and values of declared scalar types are checked and
+stored in place. `TypedMsgSpecReader` generates a struct type per stream from
+its registered schema, and decodes RECORD messages of registered streams into
+them. Records are left as structs, for `RecordTransformPlan.prepare_struct` to
+flatten and rename without an intermediate `dict`.
+
+Only the top level of records is typed, and only properties with an exact
+msgspec equivalent (strings, integers and booleans): numbers are still decoded
+as `int` or `Decimal`, and objects, arrays and untyped properties generically,
+so values (including JSON-dumped nested values) are exactly as decoded by
+`MsgSpecReader`. Keys of typed-decoded records are in schema rather than line
+order, so streams whose mapping depends on key order (e.g. the `_fivetran_id`
+of streams without key properties) must not be registered.
+"""
+
+from __future__ import annotations
+
+import decimal
+import typing as t
+
+import msgspec
+from msgspec.structs import astuple
+from singer_sdk.contrib.msgspec import MsgSpecReader
+
+_SCALAR_TYPES: dict[str, type] = {"string": str, "integer": int, "boolean": bool}
+
+
+def _field_type(prop: dict) -> t.Any:  # noqa: ANN401
+    types = prop.get("type", ())
+    if isinstance(types, str):
+        types = [types]
+
+    kinds = [kind for kind in types if kind != "null"]
+    if len(kinds) != 1 or kinds[0] not in _SCALAR_TYPES:
+        return t.Any
+
+    type_ = _SCALAR_TYPES[kinds[0]]
+    if "null" in types:
+        return t.Union[type_, None, msgspec.UnsetType]
+    return t.Union[type_, msgspec.UnsetType]
+
+
+def record_type(schema: dict) -> type[msgspec.Struct]:
+    """Generate the struct type to decode a stream's records into.
+
+    Every declared property is a field (named `field_<i>`, but encoded and
+    decoded by its property name) defaulting to `msgspec.UNSET`, so records may
+    omit any property, but may not have a key the schema doesn't declare.
+
+    Args:
+        schema: The stream's JSON schema.
+
+    Returns:
+        The struct type.
+    """
+    properties: dict[str, dict] = schema.get("properties") or {}
+    fields = [
+        (f"field_{i}", _field_type(prop), msgspec.UNSET)
+        for i, prop in enumerate(properties.values())
+    ]
+    return msgspec.defstruct(
+        "Record",
+        fields,
+        rename={field: key for (field, *_), key in zip(fields, properties)},
+        forbid_unknown_fields=True,
+        gc=False,
+    )
+
+
+def record_to_dict(record: msgspec.Struct) -> dict:
+    """Convert a record decoded by `TypedMsgSpecReader` to a `dict`.
+
+    Args:
+        record: The record.
+
+    Returns:
+        The record as decoded by `MsgSpecReader`, but with keys in schema
+        order.
+    """
+    return {
+        key: value
+        for key, value in zip(record.__struct_encode_fields__, astuple(record))
+        if value is not msgspec.UNSET
+    }
+
+
+def _record_message_type(stream: str, schema: dict) -> type[msgspec.Struct]:
+    return msgspec.defstruct(
+        "RecordMessage",
+        [
+            ("type", t.Literal["RECORD"]),
+            ("record", record_type(schema)),
+            ("version", t.Any, msgspec.UNSET),
+            ("time_extracted", t.Any, msgspec.UNSET),
+        ],
+        tag_field="stream",
+        tag=stream,
+        forbid_unknown_fields=True,
+        gc=False,
+    )
+
+
+def _unmatched_message_type(streams: t.Collection[str]) -> type[msgspec.Struct]:
+    # with no fields, only a message of nothing but this `stream` decodes as this
+    tag = next(tag for tag in ("", " ") if tag not in streams)
+    return msgspec.defstruct(
+        "UnmatchedMessage", [], tag_field="stream", tag=tag, forbid_unknown_fields=True
+    )
+
+
+class TypedMsgSpecReader(MsgSpecReader):
+    """Reads RECORD messages of registered streams into typed structs.
+
+    Every other line, and any RECORD message that doesn't conform to its
+    stream's schema (e.g. a value of the wrong type, or an undeclared key), is
+    decoded generically, as by `MsgSpecReader`. Until a stream is registered,
+    this is exactly `MsgSpecReader`.
+    """
+
+    def __init__(self) -> None:
+        """Create a reader, with no streams registered."""
+        super().__init__()
+        self._message_types: dict[str, type[msgspec.Struct]] = {}
+        self._streams: dict[type[msgspec.Struct], str] = {}
+        self._decoder: msgspec.json.Decoder | None = None
+
+    def register_schema(self, stream: str, schema: dict) -> None:
+        """Decode further RECORD messages of a stream against its schema.
+
+        Args:
+            stream: The stream name.
+            schema: The stream's JSON schema, replacing any registered before.
+        """
+        if schema.get("properties"):
+            self._message_types[stream] = _record_message_type(stream, schema)
+        else:
+            # every record would fail to decode, then be decoded again
+            self._message_types.pop(stream, None)
+
+        self._streams = {
+            message_type: stream for stream, message_type in self._message_types.items()
+        }
+        if not self._message_types:
+            self._decoder = None
+            return
+
+        # a union of structs is told apart by the tag (`stream`) alone, so only
+        # the one stream's type is ever tried. A lone struct type's tag is
+        # optional, so a single stream's type is paired with a placeholder,
+        # for a message with no `stream` not to be taken as of that stream
+        message_types = list(self._message_types.values())
+        if len(message_types) == 1:
+            message_types.append(_unmatched_message_type(self._message_types))
+        self._decoder = msgspec.json.Decoder(
+            t.Union[tuple(message_types)],
+            float_hook=decimal.Decimal,
+        )
+
+    def deserialize_json(self, line: str) -> dict:
+        """Deserialize a line of JSON.
+
+        Args:
+            line: A single line of JSON.
+
+        Returns:
+            The message. For a RECORD message of a registered stream, `record`
+            is a struct of the stream's `record_type`, rather than a `dict`.
+        """
+        if self._decoder is not None:
+            try:
+                message = self._decoder.decode(line)
+            except msgspec.DecodeError:
+                message = None
+
+            stream = self._streams.get(type(message))
+            if stream is not None:
+                message_dict = {
+                    "type": message.type,
+                    "stream": stream,
+                    "record": message.record,
+                }
+                if message.version is not msgspec.UNSET:
+                    message_dict["version"] = message.version
+                if message.time_extracted is not msgspec.UNSET:
+                    message_dict["time_extracted"] = message.time_extracted
+                return message_dict
+
+        return super().deserialize_json(line)
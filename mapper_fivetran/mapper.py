@@ -2,45 +2,378 @@
 
 from __future__ import annotations
 
+import collections.abc
 import copy
 import functools
-import hashlib
-import json
+import os
+import sys
 import tempfile
 import typing as t
-from dataclasses import dataclass
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from functools import cached_property
 from pathlib import Path
 
+import msgspec
 import singer_sdk.typing as th
-from pyarrow import ipc
+from msgspec.structs import astuple
 from singer_sdk import singerlib as singer
-from singer_sdk.contrib.msgspec import MsgSpecReader, MsgSpecWriter
+from singer_sdk.contrib.msgspec import MsgSpecWriter
 from singer_sdk.helpers._classproperty import classproperty
-from singer_sdk.helpers._flattening import FlatteningOptions, flatten_record
-from singer_sdk.helpers._util import utc_now
+from singer_sdk.helpers._flattening import (
+    FlatteningOptions,
+    _should_jsondump_value,
+    flatten_key,
+    flatten_record,
+)
 from singer_sdk.helpers.capabilities import PluginCapabilities
-from singer_sdk.mapper import DefaultStreamMap, PluginMapper
+from singer_sdk.mapper import DefaultStreamMap, PluginMapper, StreamMap
 from singer_sdk.mapper_base import InlineMapper
 from singer_sdk.singerlib.encoding.base import SingerMessageType
+from singer_sdk.singerlib.json import serialize_json
 from typing_extensions import override
 
 from mapper_fivetran import SystemColumns
-from mapper_fivetran._util import new_uuid, transform_name
-from mapper_fivetran.arrow import assert_batch_supported, transform_table
-
+from mapper_fivetran._util import (
+    FIVETRAN_ID_ALGORITHMS,
+    CoarseClock,
+    fivetran_id,
+    new_uuid,
+    transform_name,
+)
+from mapper_fivetran.buffer import RecordBuffer
+from mapper_fivetran.decoding import TypedMsgSpecReader, record_to_dict
+from mapper_fivetran.metrics import StageMetrics, StreamMetrics
+from mapper_fivetran.options import (
+    BATCH_FORMATS,
+    CONSTANT_COLUMN_ENCODINGS,
+    FIVETRAN_SYNCED_TYPES,
+    IPC_COMPRESSION_CODECS,
+    PARQUET_COMPRESSION_CODECS,
+)
+
+# pyarrow, and everything here built on it, is only imported once the first
+# BATCH message (or batched RECORD message) needs it, so RECORD-only runs don't
+# pay for it at startup
 if t.TYPE_CHECKING:
     from pathlib import PurePath
 
+    from mapper_fivetran import storage
+    from mapper_fivetran.batch import BatchEncoding, RecordBatchSink, RollingBatchWriter
+    from mapper_fivetran.parallel import RecordShards, ShardingReader
+
 
 _SDC_EXTRACTED_AT = "_sdc_extracted_at"
 _SDC_DELETED_AT = "_sdc_deleted_at"
-_SUPPORTED_BATCH_FORMAT = "arrow"
+
+_BATCH_SIZE = 1_000_000
+_BATCH_SIZE_BYTES = 128 * 1024 * 1024
+_PIPELINE_QUEUE_SIZE = 2
+_RECORD_CHUNK_SIZE = 8192
+
+_MICRO_BATCHING_MAX_ROWS = 10_000
+_MICRO_BATCHING_MAX_BYTES = 16 * 1024 * 1024
+_MICRO_BATCHING_MAX_LATENCY = 1.0
+
+_METRICS_LOG_INTERVAL = 60.0
+
+_CLOCK_RESOLUTION = 0.001
+
+_PARALLEL_CHUNK_SIZE = 1000
+
+_MISSING = object()
+
+
+class _FlattenNode(t.NamedTuple):
+    """One level of nesting of a stream's records, as flattening expands it."""
+
+    leaves: dict[str, tuple[str, bool]]
+    """Key -> (renamed flattened name, whether the schema says to always
+    JSON-dump the value), for keys flattening keeps as a column."""
+
+    branches: dict[str, _FlattenNode]
+    """Key -> the next level, for keys flattening expands object values of."""
+
+
+def _compile_flatten_node(
+    properties: dict,
+    flattened_schema: dict,
+    names: dict[str, str],
+    flattening_options: FlatteningOptions,
+    parent_keys: list[str],
+) -> _FlattenNode:
+    # mirrors `singer_sdk.helpers._flattening._flatten_record`: a key is kept
+    # as a column if its flattened name is declared, and otherwise expanded
+    # while above `max_level`
+    flattened_properties = flattened_schema.get("properties", {})
+    leaves = {}
+    branches = {}
+    for key, prop in properties.items():
+        flattened_key = flatten_key(key, parent_keys, flattening_options.separator)
+        if flattened_key in flattened_properties:
+            leaves[key] = (
+                names[flattened_key],
+                _should_jsondump_value(key, None, flattened_schema),
+            )
+        elif len(parent_keys) < flattening_options.max_level:
+            branches[key] = _compile_flatten_node(
+                prop.get("properties") or {},
+                flattened_schema,
+                names,
+                flattening_options,
+                [*parent_keys, key],
+            )
+    return _FlattenNode(leaves, branches)
+
+
+def _flatten_into(renamed: dict, node: _FlattenNode, record: t.Mapping) -> bool:
+    leaves, branches = node
+    for key, value in record.items():
+        leaf = leaves.get(key)
+        if leaf is not None:
+            name, jsondump = leaf
+            renamed[name] = (
+                serialize_json(value)
+                if jsondump or isinstance(value, (dict, list))
+                else value
+            )
+            continue
+
+        # anything the schema doesn't account for (an undeclared key, or a
+        # scalar where an object is expanded) has no precomputed name
+        branch = branches.get(key)
+        if (
+            branch is None
+            or not isinstance(value, collections.abc.MutableMapping)
+            or not _flatten_into(renamed, branch, value)
+        ):
+            return False
+    return True
+
+
+@dataclass(frozen=True)
+class RecordTransformPlan:
+    """Per-schema plan for `FivetranStreamMap.transform`.
+
+    Built once when a stream's schema is registered, so the per-record hot path
+    is a single walk of the record, flattening and renaming as it goes, rather
+    than the SDK's generic flatten (which derives every flattened name and
+    checks it against the schema, for every record) followed by a pop/insert
+    loop that re-derives every renamed name.
+    """
+
+    names: dict[str, str]
+    """Flattened property name -> snake_case name, for every declared property."""
+
+    extracted_at: bool
+    """Whether any declared property normalizes to `_sdc_extracted_at`."""
+
+    deleted_at: bool
+    """Whether any declared property normalizes to `_sdc_deleted_at`."""
+
+    flatten: _FlattenNode | None = None
+    """How to flatten records' top level, or `None` if records aren't
+    flattened."""
+
+    struct_fields: dict[type[msgspec.Struct], tuple | None] = field(
+        default_factory=dict,
+        compare=False,
+        repr=False,
+    )
+    """Record struct type -> what to do with each of its fields, compiled as
+    `prepare_struct` first sees each type."""
+
+    @classmethod
+    def from_schema(
+        cls,
+        flattened_schema: dict,
+        *,
+        raw_schema: dict | None = None,
+        flattening_options: FlatteningOptions | None = None,
+    ) -> RecordTransformPlan | None:
+        """Compile a plan from a flattened schema.
+
+        Args:
+            flattened_schema: The flattened (but otherwise untransformed) schema
+                that records are checked against, e.g.
+                `FivetranStreamMap.flattened_schema`.
+            raw_schema: The schema `flattened_schema` was flattened from, if
+                records are to be flattened.
+            flattening_options: The options `flattened_schema` was flattened
+                with, if records are to be flattened.
+
+        Returns:
+            A new plan, or `None` if two declared properties normalize to the
+            same name, in which case the generic rename must be used to preserve
+            its overwrite semantics.
+        """
+        names = {
+            name: transform_name(name)
+            for name in flattened_schema.get("properties", {})
+        }
+        targets = set(names.values())
+        if len(targets) != len(names):
+            return None
+
+        flatten = None
+        if raw_schema is not None and flattening_options is not None:
+            flatten = _compile_flatten_node(
+                raw_schema.get("properties", {}),
+                flattened_schema,
+                names,
+                flattening_options,
+                [],
+            )
+
+        return cls(
+            names=names,
+            extracted_at=_SDC_EXTRACTED_AT in targets,
+            deleted_at=_SDC_DELETED_AT in targets,
+            flatten=flatten,
+        )
+
+    def prepare(self, record: dict) -> dict | None:
+        """Flatten (if need be) and rename a record in a single pass.
+
+        The result is the same as `FivetranStreamMap.flatten_record` followed
+        by `rename`, including key order.
+
+        Args:
+            record: The record to prepare.
+
+        Returns:
+            A new, flattened and renamed record, or `None` if the record has a
+            key or nesting the schema doesn't declare.
+        """
+        if self.flatten is None:
+            return self.rename(record)
+
+        renamed: dict = {}
+        return renamed if _flatten_into(renamed, self.flatten, record) else None
+
+    def prepare_struct(self, record: msgspec.Struct) -> dict | None:
+        """Flatten (if need be) and rename a typed-decoded record in a single pass.
+
+        The same as `prepare(record_to_dict(record))`, without building the
+        intermediate `dict`.
+
+        Args:
+            record: The record to prepare, as decoded by
+                `mapper_fivetran.decoding.TypedMsgSpecReader`.
+
+        Returns:
+            A new, flattened and renamed record, or `None` if the record has a
+            key or nesting the schema doesn't declare.
+        """
+        record_type = type(record)
+        try:
+            fields = self.struct_fields[record_type]
+        except KeyError:
+            fields = self.struct_fields[record_type] = self._compile_struct_fields(
+                record_type
+            )
+        if fields is None:
+            return None
+
+        values = astuple(record)
+        if self.flatten is None:
+            return {
+                name: value
+                for name, value in zip(fields, values)
+                if value is not msgspec.UNSET
+            }
+
+        # as `_flatten_into`, but with the top level's leaves and branches
+        # looked up by position rather than key
+        renamed: dict = {}
+        for (name, jsondump, branch), value in zip(fields, values):
+            if value is msgspec.UNSET:
+                continue
+            if jsondump is None:
+                renamed[name] = value
+            elif name is not None:
+                renamed[name] = (
+                    serialize_json(value)
+                    if jsondump or isinstance(value, (dict, list))
+                    else value
+                )
+            elif (
+                branch is None
+                or not isinstance(value, dict)
+                or not _flatten_into(renamed, branch, value)
+            ):
+                return None
+        return renamed
+
+    def _compile_struct_fields(
+        self,
+        record_type: type[msgspec.Struct],
+    ) -> tuple | None:
+        keys = record_type.__struct_encode_fields__
+        if self.flatten is None:
+            # every key is renamed as is
+            if not all(key in self.names for key in keys):
+                return None
+            return tuple(self.names[key] for key in keys)
+
+        # (name, jsondump, branch) for each field, where a `jsondump` of `None`
+        # means the value is kept as is: the field is typed as a scalar, so the
+        # value can't be an object or array
+        leaves, branches = self.flatten
+        fields: list[tuple[str | None, bool | None, _FlattenNode | None]] = []
+        for key, info in zip(keys, msgspec.structs.fields(record_type)):
+            leaf = leaves.get(key)
+            name: str | None = None
+            jsondump: bool | None = False
+            if leaf is not None:
+                name, jsondump = leaf
+                if not jsondump and info.type is not t.Any:
+                    jsondump = None
+            fields.append((name, jsondump, branches.get(key)))
+        return tuple(fields)
+
+    def rename(self, record: dict) -> dict | None:
+        """Rename a (flattened) record's keys in a single pass.
+
+        Args:
+            record: The flattened record to rename.
+
+        Returns:
+            A new, renamed record, or `None` if the record has a key the schema
+            doesn't declare.
+        """
+        names = self.names
+        try:
+            return {names[name]: value for name, value in record.items()}
+        except KeyError:
+            return None
 
 
 class FivetranStreamMap(DefaultStreamMap):
     """Fivetran default stream map."""
 
+    fivetran_id_algorithm = "md5"
+    """Digest used for `_fivetran_id`, from `FIVETRAN_ID_ALGORITHMS`.
+
+    Set per stream map by `FivetranMapper` from the `fivetran_id_algorithm`
+    setting, since stream maps are constructed by the SDK's `PluginMapper`.
+    """
+
+    fivetran_synced_type = "string"
+    """Type of `_fivetran_synced` in BATCH file transforms, from
+    `FIVETRAN_SYNCED_TYPES`.
+
+    Set per stream map by `FivetranMapper` from the
+    `batch_config.fivetran_synced_type` setting.
+    """
+
+    clock = CoarseClock(_CLOCK_RESOLUTION)
+    """Clock for `_fivetran_synced` when there's no `_sdc_extracted_at`.
+
+    Set per stream map by `FivetranMapper` to its own, from the
+    `clock_resolution` setting.
+    """
+
     @override
     def __init__(
         self,
@@ -63,13 +396,17 @@ class FivetranStreamMap(DefaultStreamMap):
         self._apply_key_property_transformations()
         self._apply_schema_transformations()
 
+        self.transform_plan = RecordTransformPlan.from_schema(
+            self.flattened_schema,
+            raw_schema=self.raw_schema,
+            flattening_options=(
+                self.flattening_options if self._flattens_records else None
+            ),
+        )
+
     @override
     def flatten_record(self, record):
-        if (
-            not self.flattening_options
-            or not self.flattening_enabled
-            or not self.records_require_flattening
-        ):
+        if not self._flattens_records:
             return record
 
         # reference flattened schema specifically for record lookup, as other
@@ -84,25 +421,84 @@ class FivetranStreamMap(DefaultStreamMap):
 
     @override
     def transform(self, record):
-        record: dict[str] = super().transform(record)
+        return self.transform_prepared(*self.prepare_record(record))
 
-        for name in record.copy():
-            record[self._transform_name(name)] = record.pop(name)
+    @functools.cached_property
+    def preparation_key(self) -> t.Hashable:
+        """Identifies the output of `prepare_record` for the stream's records.
 
-        if SystemColumns.FIVETRAN_ID in self.transformed_key_properties:
-            record[SystemColumns.FIVETRAN_ID] = hashlib.md5(
-                json.dumps(record, default=str).encode(),
-                usedforsecurity=False,
-            ).hexdigest()
+        Stream maps of the same stream with equal keys produce equal prepared
+        records, so the work can be shared between them.
+        """
+        options = self.flattening_options
+        if not options or not self.flattening_enabled:
+            return None
+        return (options.max_level, options.separator)
+
+    def prepare_record(
+        self,
+        record: dict | msgspec.Struct,
+    ) -> tuple[dict, RecordTransformPlan | None]:
+        """Flatten and rename a record, ahead of `transform_prepared`.
+
+        Args:
+            record: The record to prepare, as a `dict` or as decoded by
+                `mapper_fivetran.decoding.TypedMsgSpecReader`.
+
+        Returns:
+            The prepared record, and the plan to finish transforming it with (or
+            `None` if the generic fallback was used).
+        """
+        plan = self.transform_plan
+        if isinstance(record, dict):
+            renamed = plan.prepare(record) if plan is not None else None
+        else:
+            renamed = plan.prepare_struct(record) if plan is not None else None
+            if renamed is None:
+                record = record_to_dict(record)
+
+        if renamed is None:
+            # no plan for this schema, or the record has a key the schema doesn't
+            # declare: fall back to checking everything per record
+            return self._rename_record(self.flatten_record(record)), None
+
+        return renamed, plan
+
+    def transform_prepared(
+        self,
+        renamed: dict,
+        plan: RecordTransformPlan | None,
+    ) -> dict:
+        """Append system columns to a record from `prepare_record`, in place.
+
+        Args:
+            renamed: The prepared record.
+            plan: The plan returned alongside it.
+
+        Returns:
+            The transformed record.
+        """
+        if self._requires_fivetran_id:
+            renamed[SystemColumns.FIVETRAN_ID] = fivetran_id(
+                renamed,
+                self.fivetran_id_algorithm,
+            )
 
         # `_transform_name` lowercases every key, so the SDC columns can be looked
-        # up directly without building a lowercased copy of the whole record.
-        record[SystemColumns.FIVETRAN_SYNCED] = record.get(
-            _SDC_EXTRACTED_AT, utc_now().isoformat()
-        )
-        record[SystemColumns.FIVETRAN_DELETED] = bool(record.get(_SDC_DELETED_AT))
+        # up directly without building a lowercased copy of the whole record
+        synced = _MISSING
+        if plan is None or plan.extracted_at:
+            synced = renamed.get(_SDC_EXTRACTED_AT, _MISSING)
+        if synced is _MISSING:
+            synced = self.clock.isoformat()
+        renamed[SystemColumns.FIVETRAN_SYNCED] = synced
+
+        deleted = False
+        if plan is None or plan.deleted_at:
+            deleted = bool(renamed.get(_SDC_DELETED_AT))
+        renamed[SystemColumns.FIVETRAN_DELETED] = deleted
 
-        return record
+        return renamed
 
     @override
     def get_filter_result(self, record):
@@ -143,6 +539,28 @@ class FivetranStreamMap(DefaultStreamMap):
 
         return False
 
+    @functools.cached_property
+    def _flattens_records(self) -> bool:
+        return bool(
+            self.flattening_options
+            and self.flattening_enabled
+            and self.records_require_flattening
+        )
+
+    @functools.cached_property
+    def _requires_fivetran_id(self) -> bool:
+        return SystemColumns.FIVETRAN_ID in (self.transformed_key_properties or [])
+
+    @classmethod
+    def _rename_record(cls, record: dict) -> dict:
+        # generic fallback for records a `RecordTransformPlan` can't handle;
+        # renames into a copy so the incoming record (which may be shared with
+        # other stream maps for the same stream) is left untouched
+        renamed = record.copy()
+        for name in record:
+            renamed[cls._transform_name(name)] = renamed.pop(name)
+        return renamed
+
     @staticmethod
     def _transform_name(name: str) -> str:
         # memoized in `transform_name` itself, since the Arrow BATCH path
@@ -180,8 +598,9 @@ class FivetranMapper(InlineMapper):
     name = "mapper-fivetran"
 
     # use msgspec for (de)serialization instead of the default json/simplejson,
-    # which is significantly faster on the per-record read/write hot path
-    message_reader_class = MsgSpecReader
+    # which is significantly faster on the per-record read/write hot path; the
+    # reader is only typed once `typed_decoding` registers stream schemas with it
+    message_reader_class = TypedMsgSpecReader
     message_writer_class = MsgSpecWriter
 
     config_jsonschema = th.PropertiesList(
@@ -196,13 +615,226 @@ class FivetranMapper(InlineMapper):
                             th.StringType,
                             title="Batch Storage Root",
                             description=(
-                                "Directory to write transformed Arrow IPC BATCH "
-                                "files to. Defaults to a fresh temporary directory."
+                                "Directory to write transformed BATCH files to: "
+                                "a local path, or a `file://`, `s3://` or other "
+                                "filesystem URI. Defaults to a fresh temporary "
+                                "directory."
                             ),
                         ),
                     ),
                     title="Batch Storage Configuration",
                 ),
+                th.Property(
+                    "encoding",
+                    th.ObjectType(
+                        th.Property(
+                            "format",
+                            th.StringType,
+                            default="arrow",
+                            allowed_values=list(BATCH_FORMATS),
+                            title="Format",
+                            description=(
+                                "File format to write BATCH files in: `arrow` "
+                                "(Arrow IPC), `parquet` or `jsonl`."
+                            ),
+                        ),
+                        th.Property(
+                            "compression",
+                            th.StringType,
+                            allowed_values=list(
+                                dict.fromkeys(
+                                    IPC_COMPRESSION_CODECS + PARQUET_COMPRESSION_CODECS
+                                )
+                            ),
+                            title="Compression",
+                            description=(
+                                "Codec to compress written files with. Arrow IPC "
+                                "supports `lz4` (LZ4 frame) or `zstd`, and files "
+                                "are written uncompressed if unset. Parquet "
+                                "supports `snappy` (the default), `gzip`, "
+                                "`brotli`, `lz4`, `zstd` or `none`. JSONL "
+                                "supports `gzip` or `none` (the default)."
+                            ),
+                        ),
+                        th.Property(
+                            "compression_level",
+                            th.IntegerType,
+                            title="Compression Level",
+                            description=(
+                                "Compression level for the codec. Defaults to "
+                                "the codec's own default."
+                            ),
+                        ),
+                        th.Property(
+                            "use_threads",
+                            th.BooleanType,
+                            default=True,
+                            title="Use Threads",
+                            description=(
+                                "Whether to compress the buffers of each Arrow "
+                                "IPC record batch in parallel."
+                            ),
+                        ),
+                        th.Property(
+                            "row_group_size",
+                            th.IntegerType,
+                            title="Row Group Size",
+                            description=(
+                                "Maximum number of rows per Parquet row group. "
+                                "Defaults to 1048576."
+                            ),
+                        ),
+                        th.Property(
+                            "use_dictionary",
+                            th.CustomType(
+                                {
+                                    "type": ["boolean", "array"],
+                                    "items": {"type": "string"},
+                                }
+                            ),
+                            default=True,
+                            title="Use Dictionary",
+                            description=(
+                                "Whether to dictionary-encode Parquet columns, or "
+                                "a list of the (transformed) column names to."
+                            ),
+                        ),
+                        th.Property(
+                            "constant_columns",
+                            th.StringType,
+                            default="plain",
+                            allowed_values=list(CONSTANT_COLUMN_ENCODINGS),
+                            title="Constant Column Encoding",
+                            description=(
+                                "How to encode `_fivetran_synced` and "
+                                "`_fivetran_deleted` in BATCH files transformed "
+                                "from BATCH files, when they have the same value "
+                                "for every row. `plain` writes the value for "
+                                "every row, `run_end` (Arrow IPC only) writes it "
+                                "once as a run-end encoded column, and "
+                                "`dictionary` writes it once as a dictionary-"
+                                "encoded column."
+                            ),
+                        ),
+                    ),
+                    title="Batch Encoding Configuration",
+                    description=(
+                        "How written BATCH files are encoded. The emitted BATCH "
+                        "message `encoding` records the format and compression "
+                        "used."
+                    ),
+                ),
+                th.Property(
+                    "fivetran_synced_type",
+                    th.StringType,
+                    default="string",
+                    allowed_values=list(FIVETRAN_SYNCED_TYPES),
+                    title="Fivetran Synced Type",
+                    description=(
+                        "Type of `_fivetran_synced` in BATCH files transformed "
+                        "from BATCH files: an ISO 8601 `string`, as for RECORD "
+                        "messages, or a native UTC `timestamp`."
+                    ),
+                ),
+                th.Property(
+                    "batch_records",
+                    th.BooleanType,
+                    default=False,
+                    title="Batch Records",
+                    description=(
+                        "Convert incoming RECORD messages to Arrow IPC files under "
+                        "`storage.root`, emitting BATCH messages in place of "
+                        "RECORD messages. Buffered records are always written "
+                        "out before any other message (e.g. STATE) is forwarded. "
+                        "Record properties not declared in the stream's schema "
+                        "have no column, so are dropped (with a warning), "
+                        "though `_fivetran_id` is still computed over them. "
+                        "Records with a value that doesn't fit its property's "
+                        "type are forwarded as RECORD messages instead (with a "
+                        "warning)."
+                    ),
+                ),
+                th.Property(
+                    "batch_size",
+                    th.IntegerType,
+                    default=_BATCH_SIZE,
+                    title="Batch Size",
+                    description=(
+                        "Maximum number of rows per BATCH file written from "
+                        "RECORD messages, or from BATCH messages with "
+                        "`roll_batch_files`."
+                    ),
+                ),
+                th.Property(
+                    "batch_size_bytes",
+                    th.IntegerType,
+                    default=_BATCH_SIZE_BYTES,
+                    title="Batch Size Bytes",
+                    description=(
+                        "Maximum (uncompressed, in-memory) size, in bytes, of each "
+                        "BATCH file written from RECORD messages, or from BATCH "
+                        "messages with `roll_batch_files`."
+                    ),
+                ),
+                th.Property(
+                    "roll_batch_files",
+                    th.BooleanType,
+                    default=False,
+                    title="Roll Batch Files",
+                    description=(
+                        "Write BATCH files transformed from BATCH messages up "
+                        "to `batch_size` rows and `batch_size_bytes` bytes each, "
+                        "merging small files and splitting large ones, instead "
+                        "of one output file per input file. Files of a BATCH "
+                        "message are then transformed one at a time."
+                    ),
+                ),
+                th.Property(
+                    "read_queue_size",
+                    th.IntegerType,
+                    default=_PIPELINE_QUEUE_SIZE,
+                    title="Read Queue Size",
+                    description=(
+                        "Number of record batches of each incoming BATCH file "
+                        "to read ahead on a separate thread, while earlier ones "
+                        "are transformed. Set to 0 to read on the transforming "
+                        "thread."
+                    ),
+                ),
+                th.Property(
+                    "write_queue_size",
+                    th.IntegerType,
+                    default=_PIPELINE_QUEUE_SIZE,
+                    title="Write Queue Size",
+                    description=(
+                        "Number of transformed record batches to queue for "
+                        "writing on a separate thread, while later ones are "
+                        "transformed. Set to 0 to write on the transforming "
+                        "thread."
+                    ),
+                ),
+                th.Property(
+                    "memory_map",
+                    th.BooleanType,
+                    default=False,
+                    title="Memory Map",
+                    description=(
+                        "Memory-map incoming Arrow IPC BATCH files instead of "
+                        "reading them into memory, so columns passed through "
+                        "as-is are never copied. Only benefits uncompressed "
+                        "files."
+                    ),
+                ),
+                th.Property(
+                    "max_workers",
+                    th.IntegerType,
+                    title="Max Workers",
+                    description=(
+                        "Maximum number of BATCH manifest files to transform "
+                        "concurrently. Defaults to the number of CPUs. Set to 1 "
+                        "to transform files one at a time."
+                    ),
+                ),
             ),
             title="Batch Configuration",
             description=(
@@ -212,6 +844,184 @@ class FivetranMapper(InlineMapper):
                 "`singer_sdk.helpers.capabilities.BATCH_CONFIG`."
             ),
         ),
+        th.Property(
+            "fivetran_id_algorithm",
+            th.StringType,
+            default="md5",
+            allowed_values=list(FIVETRAN_ID_ALGORITHMS),
+            title="Fivetran ID Algorithm",
+            description=(
+                "Digest used to compute `_fivetran_id` for streams without key "
+                "properties. `md5` matches Fivetran. `sha1` and `blake2b` are "
+                "faster, but produce different ids, so should only be used for "
+                "new connectors."
+            ),
+        ),
+        th.Property(
+            "clock_resolution",
+            th.NumberType,
+            default=_CLOCK_RESOLUTION,
+            title="Clock Resolution",
+            description=(
+                "How long, in seconds, a reading of the current time is reused "
+                "for, as the `time_extracted` of mapped RECORD messages and the "
+                "`_fivetran_synced` of records without `_sdc_extracted_at`. "
+                "Reading and formatting the time for every record is a "
+                "significant cost at high throughput. `0` reads it every time. "
+                "Transformed BATCH files read it once per output file."
+            ),
+        ),
+        th.Property(
+            "micro_batching",
+            th.ObjectType(
+                th.Property(
+                    "enabled",
+                    th.BooleanType,
+                    default=False,
+                    title="Enabled",
+                    description="Whether to micro-batch RECORD messages.",
+                ),
+                th.Property(
+                    "max_rows",
+                    th.IntegerType,
+                    default=_MICRO_BATCHING_MAX_ROWS,
+                    title="Max Rows",
+                    description="Maximum number of records buffered per stream.",
+                ),
+                th.Property(
+                    "max_bytes",
+                    th.IntegerType,
+                    default=_MICRO_BATCHING_MAX_BYTES,
+                    title="Max Bytes",
+                    description=(
+                        "Maximum size, in bytes, of the serialized records "
+                        "buffered per stream."
+                    ),
+                ),
+                th.Property(
+                    "max_latency",
+                    th.NumberType,
+                    default=_MICRO_BATCHING_MAX_LATENCY,
+                    title="Max Latency",
+                    description=(
+                        "Maximum time, in seconds, a record is buffered for, "
+                        "checked as each further message (of any stream) is "
+                        "read."
+                    ),
+                ),
+            ),
+            title="Micro-Batching",
+            description=(
+                "Buffer mapped RECORD messages per stream and write each buffer "
+                "out in one go, instead of writing and flushing every message "
+                "individually. Buffers are always fully written before any "
+                "other message (e.g. STATE) is forwarded, so checkpoints never "
+                "overtake the records they cover."
+            ),
+        ),
+        th.Property(
+            "metrics",
+            th.ObjectType(
+                th.Property(
+                    "enabled",
+                    th.BooleanType,
+                    default=False,
+                    title="Enabled",
+                    description="Whether to log per-stream metrics.",
+                ),
+                th.Property(
+                    "log_interval",
+                    th.NumberType,
+                    default=_METRICS_LOG_INTERVAL,
+                    title="Log Interval",
+                    description=(
+                        "How often, in seconds, to log each stream's metrics, "
+                        "checked as further messages for the stream arrive. "
+                        "Metrics are also logged once all input is processed."
+                    ),
+                ),
+            ),
+            title="Metrics",
+            description=(
+                "Log per-stream counts of records in and out, and the time spent "
+                "reading, flattening, stringifying, renaming, computing system "
+                "columns for and writing BATCH files, as Singer SDK METRIC log "
+                "lines (`record_count` and `batch_processing_time` points, tagged "
+                "with the `direction` or `stage`). Nothing is counted or timed "
+                "beyond what's always logged while disabled."
+            ),
+        ),
+        th.Property(
+            "typed_decoding",
+            th.BooleanType,
+            default=False,
+            title="Typed Decoding",
+            description=(
+                "Decode RECORD messages into structures generated from each "
+                "stream's schema, rather than generic dictionaries, for fewer "
+                "allocations per message. Records that don't conform to their "
+                "schema are decoded generically instead, so are decoded twice: "
+                "only enable this for taps whose records match their schemas. "
+                "Streams without key properties are always decoded generically, "
+                "as their `_fivetran_id` depends on the order of record keys. "
+                "Mapped records are otherwise the same either way, but their "
+                "keys are output in schema order."
+            ),
+        ),
+        th.Property(
+            "parallel",
+            th.ObjectType(
+                th.Property(
+                    "enabled",
+                    th.BooleanType,
+                    default=False,
+                    title="Enabled",
+                    description=(
+                        "Whether to transform RECORD messages in worker processes."
+                    ),
+                ),
+                th.Property(
+                    "workers",
+                    th.IntegerType,
+                    title="Workers",
+                    description=(
+                        "Number of worker processes. Defaults to the number of CPUs."
+                    ),
+                ),
+                th.Property(
+                    "shard_by_key",
+                    th.BooleanType,
+                    default=False,
+                    title="Shard By Key",
+                    description=(
+                        "Spread each stream's records over every worker by a "
+                        "hash of their key properties (or, for streams without "
+                        "any, of the whole record), rather than transforming "
+                        "all of a stream's records in the same worker."
+                    ),
+                ),
+                th.Property(
+                    "chunk_size",
+                    th.IntegerType,
+                    default=_PARALLEL_CHUNK_SIZE,
+                    title="Chunk Size",
+                    description=(
+                        "Number of RECORD messages sent to a worker at a time."
+                    ),
+                ),
+            ),
+            title="Parallel",
+            description=(
+                "Transform RECORD messages in a pool of worker processes, sharded "
+                "by stream, rather than on a single core. Output is in input "
+                "order (only per stream, if `micro_batching` is also enabled, "
+                "as mapped records are then micro-batched as without "
+                "`parallel`), and records are always written before any other "
+                "message (e.g. STATE) is forwarded. Only per-stream record "
+                "counts are logged as metrics. Ignored when "
+                "`batch_config.batch_records` is enabled."
+            ),
+        ),
     ).to_dict()
 
     def __init__(
@@ -247,6 +1057,17 @@ class FivetranMapper(InlineMapper):
         )
         self.mapper.default_mapper_type = FivetranStreamMap
 
+        self._record_buffers: dict[str, RecordBuffer[bytes]] = {}
+        self._record_batch_sinks: dict[str, RecordBatchSink] = {}
+        self._stream_metrics: dict[str, StreamMetrics] = {}
+        self._record_shards: RecordShards | None = None
+        self._sharding_reader: ShardingReader | None = None
+
+        if self._parallel:
+            from mapper_fivetran.parallel import ShardingReader
+
+            self.message_reader = self._sharding_reader = ShardingReader()
+
     @override
     @classproperty
     def capabilities(self):
@@ -256,19 +1077,434 @@ class FivetranMapper(InlineMapper):
         ]
 
     @cached_property
-    def _batch_output_dir(self) -> Path:
+    def _batch_output_dir(self) -> storage.Location:
+        from mapper_fivetran import storage
+
         # cached so repeated BATCH messages share one directory instead of each
         # getting its own fresh `tempfile.mkdtemp()` result
-        batch_config = self.config.get("batch_config") or {}
-        storage = batch_config.get("storage") or {}
-        root = storage.get("root")
+        root = (self._batch_config.get("storage") or {}).get("root")
 
-        directory = Path(root or tempfile.mkdtemp(prefix="mapper-fivetran-"))
-        directory.mkdir(parents=True, exist_ok=True)
+        directory = (
+            storage.from_uri(root)
+            if root
+            else Path(tempfile.mkdtemp(prefix="mapper-fivetran-"))
+        )
+        storage.make_dirs(directory)
 
         self.logger.info("Using batch_config: storage.root=%s", directory)
         return directory
 
+    @cached_property
+    def _batch_config(self) -> dict:
+        return self.config.get("batch_config") or {}
+
+    @cached_property
+    def _batch_encoding(self) -> BatchEncoding:
+        from mapper_fivetran.batch import BatchEncoding
+
+        return BatchEncoding.from_config(self._batch_config.get("encoding") or {})
+
+    @property
+    def _pipeline_queue_sizes(self) -> dict[str, int]:
+        return {
+            "read_queue_size": self._batch_config.get(
+                "read_queue_size", _PIPELINE_QUEUE_SIZE
+            ),
+            "write_queue_size": self._batch_config.get(
+                "write_queue_size", _PIPELINE_QUEUE_SIZE
+            ),
+        }
+
+    def _transform_manifest_file(
+        self,
+        file_uri: str,
+        src_encoding: dict,
+        stream_maps: list[StreamMap],
+        out_paths: list[storage.Location],
+    ) -> StageMetrics:
+        from mapper_fivetran import storage
+        from mapper_fivetran.arrow import json_schema_to_arrow
+        from mapper_fivetran.batch import transform_file
+
+        stage_metrics = StageMetrics()
+        transform_file(
+            storage.from_uri(file_uri),
+            stream_maps,
+            out_paths,
+            src_encoding=src_encoding,
+            src_schema=json_schema_to_arrow(stream_maps[0].raw_schema),
+            memory_map=self._batch_config.get("memory_map", False),
+            encoding=self._batch_encoding,
+            metrics=stage_metrics,
+            **self._pipeline_queue_sizes,
+        )
+        return stage_metrics
+
+    def _transform_manifest(
+        self,
+        manifest: list[str],
+        src_encoding: dict,
+        stream_maps: list[StreamMap],
+        out_paths: list[list[storage.Location]],
+    ) -> StageMetrics:
+        from mapper_fivetran import storage
+
+        try:
+            stage_metrics = self._transform_manifest_files(
+                manifest, src_encoding, stream_maps, out_paths
+            )
+        except BaseException:
+            # no partial output: a BATCH message is only emitted for the whole
+            # manifest, so outputs of files that did succeed would be orphaned
+            for file_out_paths in out_paths:
+                for out_path in file_out_paths:
+                    storage.delete(out_path, missing_ok=True)
+            raise
+
+        # the mapper is the sole consumer of source batch files, so it's safe to
+        # remove them once every one has been fully read (and, if
+        # memory-mapped, unmapped by `transform_file`); output files are left
+        # for the downstream consumer (e.g. a target) to clean up
+        for file_uri in manifest:
+            storage.delete(storage.from_uri(file_uri))
+        return stage_metrics
+
+    def _transform_manifest_files(
+        self,
+        manifest: list[str],
+        src_encoding: dict,
+        stream_maps: list[StreamMap],
+        out_paths: list[list[storage.Location]],
+    ) -> StageMetrics:
+        stage_metrics = StageMetrics()
+        max_workers = self._batch_config.get("max_workers") or os.cpu_count()
+        if len(manifest) < 2 or max_workers == 1:  # noqa: PLR2004
+            for file_uri, file_out_paths in zip(manifest, out_paths):
+                stage_metrics += self._transform_manifest_file(
+                    file_uri, src_encoding, stream_maps, file_out_paths
+                )
+            return stage_metrics
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(
+                    self._transform_manifest_file,
+                    file_uri,
+                    src_encoding,
+                    stream_maps,
+                    file_out_paths,
+                )
+                for file_uri, file_out_paths in zip(manifest, out_paths)
+            ]
+            _, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+
+            # files already being transformed can't be interrupted, but nothing
+            # new is started once any file has failed
+            for future in not_done:
+                future.cancel()
+
+        for future in futures:
+            if not future.cancelled():
+                stage_metrics += future.result()
+        return stage_metrics
+
+    def _roll_manifest(
+        self,
+        manifest: list[str],
+        src_encoding: dict,
+        stream_maps: list[StreamMap],
+        stage_metrics: StageMetrics,
+    ) -> list[list[str]]:
+        from mapper_fivetran import storage
+        from mapper_fivetran.arrow import json_schema_to_arrow
+        from mapper_fivetran.batch import transform_files
+
+        src_paths = [storage.from_uri(file_uri) for file_uri in manifest]
+        manifests = transform_files(
+            src_paths,
+            stream_maps,
+            [self._new_rolling_batch_writer(stream_map) for stream_map in stream_maps],
+            src_encoding=src_encoding,
+            src_schema=json_schema_to_arrow(stream_maps[0].raw_schema),
+            memory_map=self._batch_config.get("memory_map", False),
+            constant_encoding=self._batch_encoding.constant_columns,
+            metrics=stage_metrics,
+            **self._pipeline_queue_sizes,
+        )
+
+        # output files can hold rows of any source file, so sources are only
+        # removed once every one has been transformed
+        for src_path in src_paths:
+            storage.delete(src_path)
+        return manifests
+
+    def _new_rolling_batch_writer(self, stream_map: StreamMap) -> RollingBatchWriter:
+        from mapper_fivetran.arrow import json_schema_to_arrow
+        from mapper_fivetran.batch import RollingBatchWriter
+
+        return RollingBatchWriter(
+            self._batch_output_dir,
+            stream_map.stream_alias,
+            json_schema_to_arrow(stream_map.transformed_schema),
+            max_rows=self._batch_config.get("batch_size", _BATCH_SIZE),
+            max_bytes=self._batch_config.get("batch_size_bytes", _BATCH_SIZE_BYTES),
+            encoding=self._batch_encoding,
+        )
+
+    def _new_record_batch_sink(self, stream_map: StreamMap) -> RecordBatchSink:
+        from mapper_fivetran.batch import RecordBatchSink
+
+        return RecordBatchSink(
+            self._new_rolling_batch_writer(stream_map),
+            chunk_size=_RECORD_CHUNK_SIZE,
+            logger=self.logger,
+        )
+
+    def _write_batch_message(self, stream: str, manifest: list[str]) -> None:
+        if manifest:
+            self.write_message(
+                BatchMessage(
+                    stream=stream,
+                    manifest=manifest,
+                    encoding=self._batch_encoding.to_dict(),
+                )
+            )
+
+    def _write_record_batch_outputs(
+        self,
+        stream: str,
+        outputs: list[str | dict],
+    ) -> None:
+        # consecutive files share a BATCH message; records that didn't fit the
+        # schema are written in between, as they were
+        manifest: list[str] = []
+        for output in outputs:
+            if isinstance(output, str):
+                manifest.append(output)
+                continue
+            self._write_batch_message(stream, manifest)
+            manifest = []
+            self.write_message(singer.RecordMessage(stream=stream, record=output))
+        self._write_batch_message(stream, manifest)
+
+    def _transform_record(
+        self,
+        message_dict: dict,
+    ) -> t.Iterator[tuple[StreamMap, dict]]:
+        stream_maps = self.mapper.stream_maps[message_dict["stream"]]
+        shared = len(stream_maps) > 1
+        prepared: dict[t.Hashable, tuple[dict, RecordTransformPlan | None]] = {}
+        records_out = 0
+
+        for stream_map in stream_maps:
+            if not isinstance(stream_map, FivetranStreamMap):
+                # only `FivetranStreamMap` takes typed-decoded records
+                if not isinstance(message_dict["record"], dict):
+                    message_dict["record"] = record_to_dict(message_dict["record"])
+
+                record = stream_map.transform(message_dict["record"])
+                if record is not None:
+                    records_out += 1
+                    yield stream_map, record
+                continue
+
+            # flattening and renaming only depend on the flattening options, so
+            # are done once for every stream map that shares them; only the
+            # system columns are stream map-specific
+            key = stream_map.preparation_key
+            if key not in prepared:
+                prepared[key] = stream_map.prepare_record(message_dict["record"])
+            renamed, plan = prepared[key]
+
+            # `transform_prepared` appends to the record in place
+            records_out += 1
+            yield (
+                stream_map,
+                stream_map.transform_prepared(
+                    renamed.copy() if shared else renamed,
+                    plan,
+                ),
+            )
+
+        stream_metrics = self._stream_metrics.get(message_dict["stream"])
+        if stream_metrics is not None:
+            stream_metrics.add_records(1, records_out)
+
+    def _batch_record_message(self, message_dict: dict) -> None:
+        self._assert_line_requires(message_dict, requires={"stream", "record"})
+
+        for stream_map, record in self._transform_record(message_dict):
+            alias = stream_map.stream_alias
+            sink = self._record_batch_sinks.get(alias)
+            if sink is None:
+                sink = self._record_batch_sinks[alias] = self._new_record_batch_sink(
+                    stream_map
+                )
+
+            self._write_record_batch_outputs(alias, sink.append(record))
+
+    @cached_property
+    def _micro_batching(self) -> dict | None:
+        micro_batching = self.config.get("micro_batching") or {}
+        return micro_batching if micro_batching.get("enabled") else None
+
+    @cached_property
+    def _parallel(self) -> dict | None:
+        parallel = self.config.get("parallel") or {}
+        if not parallel.get("enabled") or self._batch_config.get("batch_records"):
+            return None
+        return parallel
+
+    @cached_property
+    def _clock(self) -> CoarseClock:
+        return CoarseClock(self.config.get("clock_resolution", _CLOCK_RESOLUTION))
+
+    @cached_property
+    def _metrics(self) -> dict | None:
+        metrics = self.config.get("metrics") or {}
+        return metrics if metrics.get("enabled") else None
+
+    def _new_record_buffer(self) -> RecordBuffer:
+        micro_batching = self._micro_batching or {}
+        return RecordBuffer(
+            max_rows=micro_batching.get("max_rows", _MICRO_BATCHING_MAX_ROWS),
+            max_bytes=micro_batching.get("max_bytes", _MICRO_BATCHING_MAX_BYTES),
+            max_latency=micro_batching.get("max_latency", _MICRO_BATCHING_MAX_LATENCY),
+        )
+
+    def _new_record_shards(self) -> RecordShards:
+        from mapper_fivetran.parallel import RecordShards
+
+        parallel = self._parallel or {}
+        # each worker maps records as this mapper would without `parallel`, but
+        # only this process counts and micro-batches them
+        config = {
+            **{key: value for key, value in self.config.items() if key != "parallel"},
+            "metrics": {"enabled": False},
+            "micro_batching": {"enabled": False},
+        }
+        return RecordShards(
+            config,
+            workers=parallel.get("workers") or os.cpu_count() or 1,
+            chunk_size=parallel.get("chunk_size", _PARALLEL_CHUNK_SIZE),
+            shard_by_key=parallel.get("shard_by_key", False),
+        )
+
+    def _write_sharded(self, outputs: list[tuple[str, bytes]]) -> None:
+        if not outputs:
+            return
+
+        if self._stream_metrics:
+            for stream, output in outputs:
+                stream_metrics = self._stream_metrics.get(stream)
+                if stream_metrics is not None:
+                    stream_metrics.add_records(1, output.count(b"\n"))
+
+        if not self._micro_batching:
+            self._write_lines([output for _, output in outputs])
+            return
+
+        for stream, output in outputs:
+            # records a stream map filters out have no output
+            if output:
+                self._buffer_lines(stream, output)
+
+    def _buffer_lines(self, stream: str, lines: bytes) -> None:
+        buffer = self._record_buffers.get(stream)
+        if buffer is None:
+            buffer = self._record_buffers[stream] = self._new_record_buffer()
+        if buffer.append(lines, len(lines)):
+            self._write_lines(buffer.drain())
+
+    def _write_expired_buffers(self) -> None:
+        # other streams' buffers may be past `max_latency` too, and can't wait
+        # for their own next record, which may never come
+        for buffer in self._record_buffers.values():
+            if buffer.expired():
+                self._write_lines(buffer.drain())
+
+    @staticmethod
+    def _write_lines(lines: list[bytes]) -> None:
+        # equivalent to `MsgSpecWriter.write_message` for each line, but with a
+        # single write and flush
+        sys.stdout.buffer.write(b"".join(lines))
+        sys.stdout.flush()
+
+    def _flush_record_buffers(self) -> None:
+        if self._record_shards is not None:
+            self._write_sharded(self._record_shards.drain())
+
+        for buffer in self._record_buffers.values():
+            if buffer:
+                self._write_lines(buffer.drain())
+
+        for alias, sink in self._record_batch_sinks.items():
+            self._write_record_batch_outputs(alias, sink.flush())
+        # recreated on the next record, in case the stream's schema has changed
+        self._record_batch_sinks.clear()
+
+    @override
+    def _process_record_message(self, message_dict: dict) -> None:
+        if self._batch_config.get("batch_records"):
+            self._batch_record_message(message_dict)
+            return
+
+        if self._record_shards is not None and self._sharding_reader is not None:
+            self._assert_line_requires(message_dict, requires={"stream", "record"})
+            self._write_sharded(
+                self._record_shards.submit(
+                    message_dict["stream"],
+                    message_dict["record"],
+                    self._sharding_reader.current_line,
+                )
+            )
+            if self._micro_batching:
+                self._write_expired_buffers()
+            return
+
+        if not self._micro_batching:
+            super()._process_record_message(message_dict)
+            return
+
+        for message in self.map_record_message(message_dict):
+            # copy, as msgspec serializes into a single reused buffer
+            self._buffer_lines(
+                message.stream, bytes(self.message_writer.format_message(message))
+            )
+        self._write_expired_buffers()
+
+    # any non-RECORD message is a barrier: buffered records are written first so
+    # that nothing (most importantly STATE) overtakes them
+
+    @override
+    def _process_schema_message(self, message_dict: dict) -> None:
+        self._flush_record_buffers()
+        super()._process_schema_message(message_dict)
+
+    @override
+    def _process_state_message(self, message_dict: dict) -> None:
+        self._flush_record_buffers()
+        super()._process_state_message(message_dict)
+
+    @override
+    def _process_activate_version_message(self, message_dict: dict) -> None:
+        self._flush_record_buffers()
+        super()._process_activate_version_message(message_dict)
+
+    @override
+    def _process_batch_message(self, message_dict: dict) -> None:
+        self._flush_record_buffers()
+        super()._process_batch_message(message_dict)
+
+    @override
+    def process_endofpipe(self) -> None:
+        self._flush_record_buffers()
+        if self._record_shards is not None:
+            self._record_shards.close()
+        for stream_metrics in self._stream_metrics.values():
+            stream_metrics.log()
+        super().process_endofpipe()
+
     def map_schema_message(self, message_dict: dict) -> t.Iterable[singer.Message]:
         """Map a schema message to zero or more new messages.
 
@@ -278,12 +1514,43 @@ class FivetranMapper(InlineMapper):
         self._assert_line_requires(message_dict, requires={"stream", "schema"})
 
         stream_id: str = message_dict["stream"]
+        # registered first, as unflattened stream maps rename the schema's
+        # properties in place
+        if self.config.get("typed_decoding") and isinstance(
+            self.message_reader, TypedMsgSpecReader
+        ):
+            # `_fivetran_id` hashes keyless streams' records in line order, which
+            # a struct can't keep, so they're always decoded generically
+            self.message_reader.register_schema(
+                stream_id,
+                message_dict["schema"] if message_dict.get("key_properties") else {},
+            )
+        if self._parallel:
+            if self._record_shards is None:
+                self._record_shards = self._new_record_shards()
+            self._record_shards.register_schema(message_dict)
         self.mapper.register_raw_stream_schema(
             stream_id,
             message_dict["schema"],
             message_dict.get("key_properties", []),
         )
+        if self._metrics and stream_id not in self._stream_metrics:
+            self._stream_metrics[stream_id] = StreamMetrics(
+                stream_id,
+                log_interval=self._metrics.get("log_interval", _METRICS_LOG_INTERVAL),
+            )
         for stream_map in self.mapper.stream_maps[stream_id]:
+            if isinstance(stream_map, FivetranStreamMap):
+                stream_map.fivetran_id_algorithm = self.config.get(
+                    "fivetran_id_algorithm",
+                    FivetranStreamMap.fivetran_id_algorithm,
+                )
+                stream_map.fivetran_synced_type = self._batch_config.get(
+                    "fivetran_synced_type",
+                    FivetranStreamMap.fivetran_synced_type,
+                )
+                stream_map.clock = self._clock
+
             yield singer.SchemaMessage(
                 stream_map.stream_alias,
                 stream_map.transformed_schema,
@@ -302,79 +1569,119 @@ class FivetranMapper(InlineMapper):
         """
         self._assert_line_requires(message_dict, requires={"stream", "record"})
 
-        stream_id: str = message_dict["stream"]
-        for stream_map in self.mapper.stream_maps[stream_id]:
-            mapped_record = stream_map.transform(message_dict["record"])
-            if mapped_record is not None:
-                yield singer.RecordMessage(
-                    stream=stream_map.stream_alias,
-                    record=mapped_record,
-                    version=message_dict.get("version"),
-                    time_extracted=utc_now(),
-                )
+        for stream_map, mapped_record in self._transform_record(message_dict):
+            yield singer.RecordMessage(
+                stream=stream_map.stream_alias,
+                record=mapped_record,
+                version=message_dict.get("version"),
+                time_extracted=self._clock.now(),
+            )
 
     def map_batch_message(self, message_dict: dict) -> t.Iterable[singer.Message]:
         """Map a batch message to zero or more new messages.
 
         Applies the same transforms as `map_record_message`, but vectorized
-        over whole Arrow IPC files instead of individual records. Unlike the
-        record path, `_fivetran_id` is not computed for BATCH messages: see
-        `mapper_fivetran.arrow.assert_batch_supported`.
-
-        Source files listed in the incoming manifest are deleted once fully
-        read. Output files are left for the downstream consumer to clean up.
+        over Arrow IPC, Parquet or (gzipped) JSONL files instead of individual
+        records. Files are streamed a chunk at a time, so memory use doesn't
+        grow with file size; see `mapper_fivetran.batch.transform_file`. JSONL
+        files are converted to Arrow as they're read, against the stream's
+        schema.
+
+        Manifest files are transformed concurrently, up to
+        `batch_config.max_workers` at a time, but output manifests always list
+        files in the same order as the incoming one. If any file fails, no
+        further files are started, and the first error (in manifest order) is
+        raised once those already in progress have finished. Within each file,
+        reading, transforming and writing are pipelined, with
+        `batch_config.read_queue_size` and `batch_config.write_queue_size`
+        record batches in flight between them, and the time spent in each
+        stage is logged.
+
+        With `batch_config.roll_batch_files`, output files are instead sized by
+        `batch_config.batch_size` and `batch_config.batch_size_bytes`: manifest
+        files are transformed one after another into the same output files,
+        merging small files and splitting large ones; see
+        `mapper_fivetran.batch.transform_files`.
+
+        Output files are written in the format and compression set by
+        `batch_config.encoding`, whatever the input format, and the emitted
+        `encoding` says so; compressed input files are read as-is.
+
+        Source files listed in the incoming manifest are deleted once every
+        one has been fully read. If any fails, sources are all left in place
+        and every output file written for the manifest is deleted. Output
+        files are otherwise left for the downstream consumer to clean up.
 
         Args:
             message_dict: A BATCH message JSON dictionary.
 
         Raises:
-            ValueError: If the batch encoding format is not 'arrow'.
+            ValueError: If the batch encoding format is not supported.
         """
+        from mapper_fivetran import storage
+
         self._assert_line_requires(
             message_dict, requires={"stream", "encoding", "manifest"}
         )
 
         stream_id: str = message_dict["stream"]
         encoding: dict = message_dict["encoding"]
-        if encoding.get("format") != _SUPPORTED_BATCH_FORMAT:
+        src_format = encoding.get("format")
+        if src_format not in BATCH_FORMATS:
             msg = (
-                f"mapper-fivetran only supports {_SUPPORTED_BATCH_FORMAT!r} BATCH "
-                f"encoding, got {encoding.get('format')!r}"
+                "mapper-fivetran only supports "
+                f"{' or '.join(map(repr, BATCH_FORMATS))} BATCH encoding, got "
+                f"{src_format!r}"
             )
             raise ValueError(msg)
 
-        tables = []
-        for file_uri in message_dict["manifest"]:
-            src_path = Path(file_uri.removeprefix("file://"))
-            with ipc.open_file(str(src_path)) as reader:
-                tables.append(reader.read_all())
-            # the mapper is the sole consumer of source batch files, so it's
-            # safe to remove them once fully read; output files are left for
-            # the downstream consumer (e.g. a target) to clean up
-            src_path.unlink()
+        stream_maps = self.mapper.stream_maps[stream_id]
+        manifest: list[str] = message_dict["manifest"]
 
-        output_dir = self._batch_output_dir
-
-        for stream_map in self.mapper.stream_maps[stream_id]:
-            assert_batch_supported(stream_id, stream_map)
-
-            new_manifest = []
-            for i, table in enumerate(tables):
-                transformed = transform_table(table, stream_map)
-
-                out_path = (
-                    output_dir / f"{stream_map.stream_alias}_{new_uuid().hex}_{i}.arrow"
-                )
-                with ipc.new_file(str(out_path), transformed.schema) as writer:
-                    for batch in transformed.to_batches():
-                        writer.write_batch(batch)
-
-                new_manifest.append(f"file://{out_path}")
+        stage_metrics = StageMetrics()
+        if self._batch_config.get("roll_batch_files", False):
+            out_manifests = self._roll_manifest(
+                manifest, encoding, stream_maps, stage_metrics
+            )
+        else:
+            output_dir = self._batch_output_dir
+            extension = self._batch_encoding.extension
+            out_paths = [
+                [
+                    storage.join(
+                        output_dir,
+                        f"{stream_map.stream_alias}_{new_uuid().hex}_{i}.{extension}",
+                    )
+                    for stream_map in stream_maps
+                ]
+                for i in range(len(manifest))
+            ]
+
+            stage_metrics = self._transform_manifest(
+                manifest, encoding, stream_maps, out_paths
+            )
+            out_manifests = [
+                [storage.to_uri(file_out_paths[j]) for file_out_paths in out_paths]
+                for j in range(len(stream_maps))
+            ]
+
+        self.logger.info(
+            "Transformed %d BATCH file(s) for stream '%s' "
+            "(read %.3fs, transform %.3fs, write %.3fs)",
+            len(manifest),
+            stream_id,
+            stage_metrics.read,
+            stage_metrics.transform,
+            stage_metrics.write,
+        )
+        if (stream_metrics := self._stream_metrics.get(stream_id)) is not None:
+            stream_metrics.add(stage_metrics)
 
+        for stream_map, out_manifest in zip(stream_maps, out_manifests):
             yield BatchMessage(
                 stream=stream_map.stream_alias,
-                manifest=new_manifest,
-                encoding=encoding,
+                manifest=out_manifest,
+                encoding=self._batch_encoding.to_dict(),
             )
 
     def map_state_message(self, message_dict: dict) -> t.Iterable[singer.Message]:
@@ -0,0 +1,173 @@
+"""Per-stream counters and stage timers, logged as Singer SDK METRIC lines.
+
+Points are logged through the SDK's metrics logger, in the same `METRIC: {...}`
+format as SDK counters and timers, so the `metrics_log_level` setting and any
+tooling parsing tap metrics apply as-is. Counters and timers are aggregated
+per stream and logged every `log_interval` seconds, rather than per record or
+record batch, so the cost of metrics is a few additions per record batch and
+per record.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import os
+import time
+import typing as t
+from dataclasses import dataclass
+
+from singer_sdk import metrics
+from singer_sdk.metrics import Metric, Point, Tag
+
+if t.TYPE_CHECKING:
+    from typing_extensions import Self
+
+STAGE_TAG = "stage"
+"""Tag naming the stage of a `batch_processing_time` point."""
+
+DIRECTION_TAG = "direction"
+"""Tag saying whether a `record_count` point counts records `in` or `out`."""
+
+
+@dataclass
+class StageMetrics:
+    """Rows processed, and time spent in each stage of transforming them.
+
+    Times are in seconds, and each stage's time is its own work, excluding time
+    spent waiting on the other stages. Pipelined stages run concurrently, so
+    the one with the most time is the bottleneck.
+    """
+
+    read: float = 0.0
+    """Time spent reading (and decompressing or decoding) source chunks."""
+
+    flatten: float = 0.0
+    """Time spent flattening struct columns, as part of `transform`."""
+
+    stringify: float = 0.0
+    """Time spent JSON-encoding complex columns, as part of `transform`."""
+
+    rename: float = 0.0
+    """Time spent assembling renamed tables, as part of `transform`."""
+
+    system_columns: float = 0.0
+    """Time spent computing system columns (including hashing `_fivetran_id`),
+    as part of `transform`."""
+
+    transform: float = 0.0
+    """Time spent transforming chunks for every stream map."""
+
+    write: float = 0.0
+    """Time spent writing (and encoding or compressing) transformed chunks."""
+
+    rows_in: int = 0
+    """Rows read."""
+
+    rows_out: int = 0
+    """Rows written, over every stream map."""
+
+    def __iadd__(self, other: StageMetrics) -> Self:
+        """Add another's metrics to these.
+
+        Args:
+            other: The metrics to add.
+
+        Returns:
+            These metrics.
+        """
+        for field in dataclasses.fields(self):
+            setattr(
+                self,
+                field.name,
+                getattr(self, field.name) + getattr(other, field.name),
+            )
+        return self
+
+
+_STAGES = tuple(
+    field.name for field in dataclasses.fields(StageMetrics) if field.type == "float"
+)
+
+
+class StreamMetrics:
+    """A stream's metrics, logged periodically as METRIC log lines.
+
+    Every `log_interval` seconds (checked as metrics are added), one
+    `record_count` counter point is logged for each direction, and one
+    `batch_processing_time` timer point for each stage any time was spent in,
+    each with the totals since the last were logged.
+    """
+
+    def __init__(
+        self,
+        stream: str,
+        *,
+        log_interval: float = metrics.DEFAULT_LOG_INTERVAL,
+    ) -> None:
+        """Create metrics for a stream.
+
+        Args:
+            stream: The stream name.
+            log_interval: How often to log metrics, in seconds.
+        """
+        self.stream = stream
+        self.log_interval = log_interval
+        self.totals = StageMetrics()
+        self._logger = metrics.get_metrics_logger()
+        self._last_log_time = time.monotonic()
+
+    def add(self, stage_metrics: StageMetrics) -> None:
+        """Add metrics, e.g. of transforming a BATCH message.
+
+        Args:
+            stage_metrics: The metrics to add.
+        """
+        self.totals += stage_metrics
+        self.log_if_due()
+
+    def add_records(self, rows_in: int, rows_out: int) -> None:
+        """Count records, e.g. of transforming a RECORD message.
+
+        Args:
+            rows_in: The number of records read.
+            rows_out: The number of records written.
+        """
+        self.totals.rows_in += rows_in
+        self.totals.rows_out += rows_out
+        self.log_if_due()
+
+    def log_if_due(self) -> None:
+        """Log metrics if `log_interval` has passed since they were last logged."""
+        if time.monotonic() - self._last_log_time > self.log_interval:
+            self.log()
+
+    def log(self) -> None:
+        """Log metrics, and reset them."""
+        tags: dict[str, t.Any] = {Tag.STREAM: self.stream, Tag.PID: os.getpid()}
+        for direction, value in (
+            ("in", self.totals.rows_in),
+            ("out", self.totals.rows_out),
+        ):
+            metrics.log(
+                self._logger,
+                Point(
+                    "counter",
+                    Metric.RECORD_COUNT,
+                    value,
+                    {**tags, DIRECTION_TAG: direction},
+                ),
+            )
+        for stage in _STAGES:
+            if seconds := getattr(self.totals, stage):
+                metrics.log(
+                    self._logger,
+                    Point(
+                        "timer",
+                        Metric.BATCH_PROCESSING_TIME,
+                        seconds,
+                        {**tags, STAGE_TAG: stage},
+                    ),
+                )
+
+        self.totals = StageMetrics()
+        self._last_log_time = time.monotonic()
@@ -0,0 +1,26 @@
+"""Allowed values of BATCH settings.
+
+Kept apart from `mapper_fivetran.batch` and `mapper_fivetran.arrow`, which
+define how each is handled, so the mapper's settings can be declared without
+importing pyarrow; see `mapper_fivetran.mapper`.
+"""
+
+from __future__ import annotations
+
+BATCH_FORMATS = ("arrow", "parquet", "jsonl")
+"""BATCH encoding formats that can be read and written."""
+
+IPC_COMPRESSION_CODECS = ("lz4", "zstd")
+"""Codecs Arrow IPC supports for buffer compression (`lz4` is LZ4 frame)."""
+
+PARQUET_COMPRESSION_CODECS = ("snappy", "gzip", "brotli", "lz4", "zstd", "none")
+"""Codecs Parquet supports for column chunk compression."""
+
+JSONL_COMPRESSION_CODECS = ("gzip", "none")
+"""Codecs supported for whole-file JSONL compression, as per the Singer SDK."""
+
+CONSTANT_COLUMN_ENCODINGS = ("plain", "run_end", "dictionary")
+"""Encodings for system columns with the same value for every row."""
+
+FIVETRAN_SYNCED_TYPES = ("string", "timestamp")
+"""Arrow types `_fivetran_synced` can be written as in BATCH files."""
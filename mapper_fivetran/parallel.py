@@ -0,0 +1,288 @@
+"""Sharded, multi-process transformation of RECORD messages.
+
+Transforming records is CPU-bound, so a single mapper process is limited to one
+core however many streams or records there are. `RecordShards` instead spreads
+RECORD messages over a pool of worker processes, each running its own
+`FivetranMapper`, while the main process only reads, routes and writes lines:
+
+- `ShardingReader` decodes just the envelope of each RECORD message (type and
+  stream, skipping over the record), so the main process doesn't parse records
+  only for workers to parse them again.
+- Records are sharded by stream and, optionally, by a hash of their key
+  properties (or, for streams without any, of the whole record), so a single
+  large stream is still spread over every worker. Each shard's lines are sent
+  to a worker in chunks of `chunk_size`, rather than one message at a time.
+- Workers return each record's mapped lines, which are re-sequenced so output
+  is in exactly the order records were read: per-stream order is preserved
+  whatever the sharding, and draining before every other message (e.g. STATE
+  or ACTIVATE_VERSION) releases it only once every record before it has been
+  written.
+"""
+
+from __future__ import annotations
+
+import copy
+import multiprocessing
+import typing as t
+import zlib
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+import msgspec
+from msgspec.structs import astuple
+from singer_sdk.contrib.msgspec import MsgSpecReader
+
+from mapper_fivetran.mapper import FivetranMapper
+
+# state of a worker process, set up once by `_init_worker`
+_worker: dict[str, t.Any] = {}
+
+
+def _init_worker(config: dict) -> None:
+    _worker["mapper"] = FivetranMapper(config=config, validate_config=False)
+    _worker["schemas"] = {}
+
+
+def _map_chunk(schema_id: int, schema_message: dict, lines: list[str]) -> list[bytes]:
+    mapper: FivetranMapper = _worker["mapper"]
+    schemas: dict[str, int] = _worker["schemas"]
+
+    # a worker only learns of a stream's (latest) schema with its first chunk
+    # of records after it
+    stream = schema_message["stream"]
+    if schemas.get(stream) != schema_id:
+        for _ in mapper.map_schema_message(schema_message):
+            pass
+        schemas[stream] = schema_id
+
+    reader = mapper.message_reader
+    writer = mapper.message_writer
+    return [
+        # copy, as msgspec serializes into a single reused buffer
+        b"".join(
+            bytes(writer.format_message(message))
+            for message in mapper.map_record_message(reader.deserialize_json(line))
+        )
+        for line in lines
+    ]
+
+
+class _Envelope(msgspec.Struct):
+    type: str
+    stream: t.Union[str, None] = None  # noqa: UP007
+    record: msgspec.Raw = msgspec.Raw()
+
+
+_ENVELOPE_DECODER = msgspec.json.Decoder(_Envelope)
+
+
+class ShardingReader(MsgSpecReader):
+    """Reads only the envelope of RECORD messages, for `RecordShards`.
+
+    Every other line is decoded as by `MsgSpecReader`.
+    """
+
+    def __init__(self) -> None:
+        """Create a reader."""
+        super().__init__()
+        self.current_line = ""
+
+    def deserialize_json(self, line: str) -> dict:
+        """Deserialize a line of JSON.
+
+        Args:
+            line: A single line of JSON.
+
+        Returns:
+            The message. For a RECORD message, `record` is the record's raw
+            JSON (a `msgspec.Raw`), and the line itself is `current_line`.
+        """
+        try:
+            envelope = _ENVELOPE_DECODER.decode(line)
+        except msgspec.DecodeError:
+            envelope = None
+
+        if envelope is None or envelope.type != "RECORD" or not envelope.record:
+            return super().deserialize_json(line)
+
+        self.current_line = line
+        message_dict: dict = {"type": envelope.type, "record": envelope.record}
+        if envelope.stream is not None:
+            message_dict["stream"] = envelope.stream
+        return message_dict
+
+
+class RecordShards:
+    """Maps RECORD messages in a pool of worker processes, in input order.
+
+    Worker processes are started as records are first sent to them, each with
+    its own `FivetranMapper` of the given config.
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        *,
+        workers: int,
+        chunk_size: int,
+        shard_by_key: bool = False,
+    ) -> None:
+        """Create a pool of worker processes.
+
+        Args:
+            config: The config of each worker's `FivetranMapper`.
+            workers: The number of worker processes.
+            chunk_size: The number of records sent to a worker at a time.
+            shard_by_key: Whether to also shard each stream by a hash of its
+                records' key properties, rather than only by stream.
+        """
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.shard_by_key = shard_by_key
+
+        # spawned rather than forked, so workers don't inherit e.g. unflushed
+        # stdout buffers or the threads of concurrent BATCH transforms
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(config,),
+        )
+        self._max_in_flight = 2 * workers
+        # beyond this many records awaiting output, partly filled chunks are
+        # sent anyway, so a shard that's slow to fill can't hold output back
+        self._max_pending = 4 * workers * chunk_size
+
+        # schema ids tell workers when a stream's schema has changed
+        self._schemas: dict[str, tuple[int, dict]] = {}
+        self._schema_id = 0
+        self._key_decoders: dict[str, msgspec.json.Decoder | None] = {}
+        self._chunks: dict[tuple[str, int], tuple[list[int], list[str]]] = {}
+        self._in_flight: dict[Future, tuple[str, list[int]]] = {}
+        self._outputs: dict[int, tuple[str, bytes]] = {}
+        self._next_seq = 0
+        self._emit_seq = 0
+
+    def register_schema(self, message_dict: dict) -> None:
+        """Map further records of a stream against a new schema.
+
+        Chunks of the stream's records already read are sent first, so are
+        mapped against the schema they were read under.
+
+        Args:
+            message_dict: The stream's SCHEMA message.
+        """
+        stream = message_dict["stream"]
+        for key in [key for key in self._chunks if key[0] == stream]:
+            self._send(key)
+
+        self._schema_id += 1
+        self._schemas[stream] = (self._schema_id, copy.deepcopy(message_dict))
+        key_properties = message_dict.get("key_properties") or []
+        if not key_properties:
+            self._key_decoders[stream] = None
+            return
+
+        # only the key properties are decoded, and only as raw JSON
+        fields = [
+            (f"key_{i}", msgspec.Raw, msgspec.Raw()) for i in range(len(key_properties))
+        ]
+        self._key_decoders[stream] = msgspec.json.Decoder(
+            msgspec.defstruct(
+                "Key",
+                fields,
+                rename={field: key for (field, *_), key in zip(fields, key_properties)},
+            )
+        )
+
+    def _shard(self, stream: str, record: msgspec.Raw) -> int:
+        if self.workers == 1:
+            return 0
+        if not self.shard_by_key:
+            return zlib.crc32(stream.encode()) % self.workers
+
+        key_decoder = self._key_decoders[stream]
+        key = (
+            record
+            if key_decoder is None
+            else b"\0".join(astuple(key_decoder.decode(record)))
+        )
+        return zlib.crc32(key) % self.workers
+
+    def submit(
+        self,
+        stream: str,
+        record: msgspec.Raw,
+        line: str,
+    ) -> list[tuple[str, bytes]]:
+        """Queue a RECORD message to be mapped.
+
+        Args:
+            stream: The stream name.
+            record: The record's raw JSON, to shard by.
+            line: The whole RECORD message line.
+
+        Returns:
+            The stream name and mapped lines of each record now ready to be
+            written, in input order.
+
+        Raises:
+            KeyError: If no schema has been registered for the stream.
+        """
+        if stream not in self._schemas:
+            msg = f"Record for stream '{stream}' before its schema"
+            raise KeyError(msg)
+
+        key = (stream, self._shard(stream, record))
+        seqs, lines = self._chunks.setdefault(key, ([], []))
+        seqs.append(self._next_seq)
+        lines.append(line)
+        self._next_seq += 1
+
+        if len(lines) >= self.chunk_size:
+            self._send(key)
+        elif self._next_seq - self._emit_seq > self._max_pending:
+            for pending_key in list(self._chunks):
+                self._send(pending_key)
+
+        self._receive(wait(self._in_flight, timeout=0).done)
+        return self._emit()
+
+    def drain(self) -> list[tuple[str, bytes]]:
+        """Map every queued record.
+
+        Returns:
+            The stream name and mapped lines of every record not yet returned,
+            in input order.
+        """
+        for key in list(self._chunks):
+            self._send(key)
+        self._receive(wait(self._in_flight).done)
+        return self._emit()
+
+    def close(self) -> None:
+        """Stop the worker processes, once every record sent has been mapped."""
+        self._executor.shutdown()
+
+    def _send(self, key: tuple[str, int]) -> None:
+        seqs, lines = self._chunks.pop(key)
+        while len(self._in_flight) >= self._max_in_flight:
+            self._receive(wait(self._in_flight, return_when=FIRST_COMPLETED).done)
+
+        stream, _ = key
+        schema_id, schema_message = self._schemas[stream]
+        future = self._executor.submit(_map_chunk, schema_id, schema_message, lines)
+        self._in_flight[future] = (stream, seqs)
+
+    def _receive(self, futures: t.Iterable[Future]) -> None:
+        for future in futures:
+            stream, seqs = self._in_flight.pop(future)
+            # raises any error mapping the chunk
+            for seq, output in zip(seqs, future.result()):
+                self._outputs[seq] = (stream, output)
+
+    def _emit(self) -> list[tuple[str, bytes]]:
+        emitted = []
+        while self._emit_seq in self._outputs:
+            emitted.append(self._outputs.pop(self._emit_seq))
+            self._emit_seq += 1
+        return emitted
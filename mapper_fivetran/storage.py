@@ -0,0 +1,207 @@
+"""Local and remote locations of BATCH files.
+
+Local files are `pathlib.Path`s. Anything else is kept as a URI string (e.g.
+`s3://bucket/key`) and read and written through a `pyarrow.fs` filesystem, so
+remote files are streamed straight to and from the object store, never staged
+on local disk: random-access reads are ranged requests, and S3 output streams
+upload multipart, with parts uploaded in the background as they're written.
+
+URI schemes pyarrow has no filesystem for (e.g. `memory://`) fall back to
+`fsspec`, a dependency of the Meltano Singer SDK, through
+`pyarrow.fs.FSSpecHandler`.
+"""
+
+from __future__ import annotations
+
+import functools
+import typing as t
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit
+
+import pyarrow as pa
+from pyarrow import fs
+
+Location = t.Union[Path, str]
+"""A local file or directory, or the URI of a remote one."""
+
+_FILE_SCHEME = "file://"
+
+_LOCAL_FILESYSTEM = fs.LocalFileSystem()
+
+
+def from_uri(uri: str) -> Location:
+    """Get the location of a URI, e.g. from a BATCH message manifest.
+
+    Args:
+        uri: A `file://` or other filesystem URI, or a bare local path.
+
+    Returns:
+        A `Path` for `file://` URIs and bare paths, otherwise the URI itself.
+    """
+    if uri.startswith(_FILE_SCHEME):
+        return Path(uri.removeprefix(_FILE_SCHEME))
+    if "://" not in uri:
+        return Path(uri)
+    return uri
+
+
+def to_uri(location: Location) -> str:
+    """Get the URI of a location, e.g. for a BATCH message manifest.
+
+    Args:
+        location: The location.
+
+    Returns:
+        A `file://` URI for local files, otherwise the location's URI.
+    """
+    if isinstance(location, Path):
+        return f"{_FILE_SCHEME}{location}"
+    return location
+
+
+def is_local(location: Location) -> bool:
+    """Whether a location is on the local filesystem.
+
+    Args:
+        location: The location.
+
+    Returns:
+        True for local files.
+    """
+    return isinstance(location, Path)
+
+
+def join(directory: Location, name: str) -> Location:
+    """Get the location of a file in a directory.
+
+    Args:
+        directory: The directory.
+        name: The file name.
+
+    Returns:
+        The file's location.
+    """
+    if isinstance(directory, Path):
+        return directory / name
+
+    parts = urlsplit(directory)
+    path = f"{parts.path.rstrip('/')}/{name}"
+    return urlunsplit((parts.scheme, parts.netloc, path, parts.query, ""))
+
+
+@functools.cache
+def _filesystem(uri: str) -> tuple[fs.FileSystem, str]:
+    # filesystems are cached by scheme, authority and options (the URI
+    # without its path), since creating one can mean network requests, e.g. to
+    # resolve an S3 bucket's region
+    try:
+        return fs.FileSystem.from_uri(uri)
+    except pa.ArrowInvalid:
+        import fsspec  # noqa: PLC0415
+
+        filesystem, path = fsspec.core.url_to_fs(uri)
+        return fs.PyFileSystem(fs.FSSpecHandler(filesystem)), path
+
+
+def resolve(location: Location) -> tuple[fs.FileSystem, str]:
+    """Get the filesystem of a location, and the path to it there.
+
+    Args:
+        location: The location.
+
+    Returns:
+        The filesystem, and the location's path on it.
+    """
+    if isinstance(location, Path):
+        return _LOCAL_FILESYSTEM, str(location)
+
+    parts = urlsplit(location)
+    filesystem, root = _filesystem(
+        urlunsplit((parts.scheme, parts.netloc, "", parts.query, ""))
+    )
+    root = root.rstrip("/")
+    return filesystem, f"{root}{parts.path}" if root else parts.path
+
+
+def open_input_file(location: Location, *, memory_map: bool = False) -> pa.NativeFile:
+    """Open a file for random access reads.
+
+    Args:
+        location: The file to open.
+        memory_map: Whether to memory-map the file, if local.
+
+    Returns:
+        The open file.
+    """
+    if memory_map and isinstance(location, Path):
+        return pa.memory_map(str(location))
+    filesystem, path = resolve(location)
+    return filesystem.open_input_file(path)
+
+
+def open_input_stream(
+    location: Location,
+    *,
+    compression: str | None = None,
+) -> pa.NativeFile:
+    """Open a file for sequential reads.
+
+    Args:
+        location: The file to open.
+        compression: The codec to decompress the file with, if any.
+
+    Returns:
+        The open stream.
+    """
+    filesystem, path = resolve(location)
+    return filesystem.open_input_stream(path, compression=compression)
+
+
+def open_output_stream(
+    location: Location,
+    *,
+    compression: str | None = None,
+) -> pa.NativeFile:
+    """Open a file for sequential writes, replacing it if it exists.
+
+    Args:
+        location: The file to open.
+        compression: The codec to compress the file with, if any.
+
+    Returns:
+        The open stream.
+    """
+    filesystem, path = resolve(location)
+    return filesystem.open_output_stream(path, compression=compression)
+
+
+def make_dirs(location: Location) -> None:
+    """Create a directory, and any missing parents, if it doesn't exist.
+
+    Args:
+        location: The directory.
+    """
+    if isinstance(location, Path):
+        location.mkdir(parents=True, exist_ok=True)
+        return
+    filesystem, path = resolve(location)
+    filesystem.create_dir(path, recursive=True)
+
+
+def delete(location: Location, *, missing_ok: bool = False) -> None:
+    """Delete a file.
+
+    Args:
+        location: The file to delete.
+        missing_ok: Whether to ignore the file not existing.
+    """
+    if isinstance(location, Path):
+        location.unlink(missing_ok=missing_ok)
+        return
+
+    filesystem, path = resolve(location)
+    try:
+        filesystem.delete_file(path)
+    except FileNotFoundError:
+        if not missing_ok:
+            raise
@@ -0,0 +1,118 @@
+"""Fixtures shared by `FivetranMapper` tests."""
+
+from __future__ import annotations
+
+import copy
+import io
+import json
+import typing as t
+
+import pytest
+from pyarrow import ipc
+
+from mapper_fivetran.mapper import FivetranMapper
+
+
+@pytest.fixture
+def properties() -> dict:
+    # the `animals` stream's properties; override in modules that need others
+    return {"name": {"type": "string"}}
+
+
+@pytest.fixture
+def schema(properties: dict) -> dict:
+    return {
+        "type": "SCHEMA",
+        "stream": "animals",
+        "schema": {"properties": properties},
+        "key_properties": ["name"],
+    }
+
+
+@pytest.fixture
+def state() -> dict:
+    return {"type": "STATE", "value": {"bookmarks": {"animals": {"name": "Otis"}}}}
+
+
+@pytest.fixture
+def make_record() -> t.Callable[..., dict]:
+    def _make_record(name: str, stream: str = "animals", **properties) -> dict:
+        return {
+            "type": "RECORD",
+            "stream": stream,
+            "record": {"name": name, **properties},
+        }
+
+    return _make_record
+
+
+@pytest.fixture
+def batch_root(tmp_path) -> str:
+    # where BATCH files are written; override for other filesystems
+    return str(tmp_path / "out")
+
+
+@pytest.fixture
+def make_batch_config(batch_root: str) -> t.Callable[..., dict]:
+    def _make_batch_config(**batch_config) -> dict:
+        return {"batch_config": {"storage": {"root": batch_root}, **batch_config}}
+
+    return _make_batch_config
+
+
+@pytest.fixture
+def make_mapper() -> t.Callable[..., FivetranMapper]:
+    def _make_mapper(config: dict | None = None, *schemas: dict) -> FivetranMapper:
+        mapper = FivetranMapper(config=config or {}, validate_config=False)
+        for schema in schemas:
+            # copied, as unflattened stream maps rename the schema's properties
+            # in place
+            list(mapper.map_schema_message(copy.deepcopy(schema)))
+        return mapper
+
+    return _make_mapper
+
+
+@pytest.fixture
+def process() -> t.Callable[..., None]:
+    def _process(mapper: FivetranMapper, *messages: dict) -> None:
+        mapper.process_lines(
+            io.StringIO("".join(f"{json.dumps(message)}\n" for message in messages))
+        )
+
+    return _process
+
+
+@pytest.fixture
+def read_messages(capsysbinary) -> t.Callable[[], list[dict]]:
+    def _read_messages() -> list[dict]:
+        return [json.loads(line) for line in capsysbinary.readouterr().out.splitlines()]
+
+    return _read_messages
+
+
+@pytest.fixture
+def map_batch() -> t.Callable[..., dict]:
+    def _map_batch(mapper: FivetranMapper, encoding: dict, *uris: str) -> dict:
+        (out_message,) = list(
+            mapper.map_batch_message(
+                {
+                    "type": "BATCH",
+                    "stream": "animals",
+                    "encoding": encoding,
+                    "manifest": list(uris),
+                }
+            )
+        )
+        return out_message.to_dict()
+
+    return _map_batch
+
+
+@pytest.fixture
+def read_rows() -> t.Callable[[str], list[dict]]:
+    def _read_rows(uri: str) -> list[dict]:
+        with ipc.open_file(uri.removeprefix("file://")) as reader:
+            return reader.read_all().to_pylist()
+
+    return _read_rows
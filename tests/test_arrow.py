@@ -2,21 +2,28 @@
 
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import datetime, timezone
+from decimal import Decimal
 
 import pyarrow as pa
 import pytest
 from singer_sdk.helpers._flattening import FlatteningOptions
 
-from mapper_fivetran import SystemColumns
+from mapper_fivetran import SystemColumns, _arrow_json
+from mapper_fivetran._util import CoarseClock
 from mapper_fivetran.arrow import (
-    BatchFivetranIdError,
-    assert_batch_supported,
+    constant_column,
     flatten_table,
+    json_schema_to_arrow,
+    json_schema_to_arrow_type,
+    records_to_batch,
     rename_columns,
     stringify_complex_columns,
+    table_plan,
     transform_table,
+    transform_tables,
     with_fivetran_deleted,
+    with_fivetran_id,
     with_fivetran_synced,
 )
 from mapper_fivetran.mapper import FivetranStreamMap
@@ -185,6 +192,46 @@ def test_with_fivetran_synced_defaults_to_now_when_absent():
     assert datetime.fromisoformat(synced).tzinfo is not None
 
 
+def test_with_fivetran_synced_reads_clock():
+    table = pa.table({"name": ["Otis", "Bob"]})
+    clock = CoarseClock(60.0)
+
+    result = with_fivetran_synced(table, clock=clock)
+    timestamps = with_fivetran_synced(table, data_type="timestamp", clock=clock)
+
+    assert result.column(SystemColumns.FIVETRAN_SYNCED.value).to_pylist() == (
+        [clock.isoformat()] * 2
+    )
+    assert timestamps.column(SystemColumns.FIVETRAN_SYNCED.value).to_pylist() == (
+        [clock.now()] * 2
+    )
+
+
+def test_with_fivetran_synced_as_timestamp():
+    table = pa.table(
+        {
+            "name": ["Otis", "Milo"],
+            "_sdc_extracted_at": ["2024-01-01T01:00:00+01:00", None],
+        }
+    )
+
+    result = with_fivetran_synced(table, data_type="timestamp")
+
+    synced = result.column(SystemColumns.FIVETRAN_SYNCED.value)
+    assert synced.type == pa.timestamp("us", tz="UTC")
+    assert synced.to_pylist() == [datetime(2024, 1, 1, tzinfo=timezone.utc), None]
+
+
+def test_with_fivetran_synced_as_timestamp_defaults_to_now_when_absent():
+    table = pa.table({"name": ["Otis"]})
+
+    result = with_fivetran_synced(table, data_type="timestamp", encoding="run_end")
+
+    synced = result.column(SystemColumns.FIVETRAN_SYNCED.value)
+    assert pa.types.is_run_end_encoded(synced.type)
+    assert synced.to_pylist()[0].tzinfo is not None
+
+
 def test_with_fivetran_deleted_true_when_sdc_deleted_at_present():
     table = pa.table(
         {
@@ -219,20 +266,70 @@ def test_with_fivetran_deleted_false_when_absent():
     assert result.column(SystemColumns.FIVETRAN_DELETED.value).to_pylist() == [False]
 
 
-def test_assert_batch_supported_raises_when_no_key_properties():
-    stream_map = FivetranStreamMap(
+@pytest.fixture
+def keyless_stream_map():
+    return FivetranStreamMap(
         stream_alias="animals",
         raw_schema={"properties": {}},
         key_properties=[],
         flattening_options=None,
     )
 
-    with pytest.raises(BatchFivetranIdError):
-        assert_batch_supported("animals", stream_map)
 
+def test_with_fivetran_id_matches_record_transform(keyless_stream_map):
+    table = pa.table(
+        {
+            "name": ["Otis", "Bob", None],
+            "age": [3, None, 7],
+            "weight": [1.5, 20.25, None],
+            "notes": ["caf\u00e9", "", "a, b: c"],
+        }
+    )
+
+    result = with_fivetran_id(table)
+
+    assert result.schema.field(SystemColumns.FIVETRAN_ID.value).type == pa.string()
+    assert result.column(SystemColumns.FIVETRAN_ID.value).to_pylist() == [
+        keyless_stream_map.transform(row)[SystemColumns.FIVETRAN_ID]
+        for row in table.to_pylist()
+    ]
 
-def test_assert_batch_supported_passes_with_key_properties(stream_map):
-    assert_batch_supported("animals", stream_map)
+
+def test_with_fivetran_id_across_chunks(keyless_stream_map):
+    table = pa.concat_tables([pa.table({"id": [i]}) for i in range(4)])
+
+    result = with_fivetran_id(table)
+
+    assert result.column(SystemColumns.FIVETRAN_ID.value).to_pylist() == [
+        keyless_stream_map.transform({"id": i})[SystemColumns.FIVETRAN_ID]
+        for i in range(4)
+    ]
+
+
+def test_with_fivetran_id_empty_table():
+    table = pa.table({"id": pa.array([], type=pa.int64())})
+
+    result = with_fivetran_id(table)
+
+    assert result.column(SystemColumns.FIVETRAN_ID.value).to_pylist() == []
+
+
+def test_transform_table_adds_fivetran_id_without_key_properties(
+    keyless_stream_map,
+):
+    table = pa.table({"firstName": ["Otis"]})
+
+    result = transform_table(table, keyless_stream_map)
+
+    assert result.schema.names == [
+        "first_name",
+        SystemColumns.FIVETRAN_ID.value,
+        SystemColumns.FIVETRAN_SYNCED.value,
+        SystemColumns.FIVETRAN_DELETED.value,
+    ]
+    assert result.column(SystemColumns.FIVETRAN_ID.value).to_pylist() == [
+        keyless_stream_map.transform({"firstName": "Otis"})[SystemColumns.FIVETRAN_ID]
+    ]
 
 
 def test_transform_table_end_to_end(stream_map):
@@ -300,3 +397,178 @@ def test_transform_table_leaves_complex_columns_when_flattening_disabled():
 
     assert pa.types.is_list(result.schema.field("tags").type)
     assert result.column("tags").to_pylist() == [["a", "b"]]
+
+
+def test_transform_tables_shares_preparation(stream_map, monkeypatch):
+    keyless_stream_map = FivetranStreamMap(
+        stream_alias="animals_keyless",
+        raw_schema={"properties": {}},
+        key_properties=[],
+        flattening_options=stream_map.flattening_options,
+    )
+    table = pa.table(
+        {
+            "name": ["Otis"],
+            "tags": pa.array([["a", "b"]], type=pa.list_(pa.string())),
+        }
+    )
+    expected = [
+        transform_table(table, stream_map),
+        transform_table(table, keyless_stream_map),
+    ]
+
+    calls = []
+    encode = _arrow_json.encode
+    monkeypatch.setattr(
+        _arrow_json,
+        "encode",
+        lambda array: calls.append(array) or encode(array),
+    )
+
+    result = transform_tables(table, [stream_map, keyless_stream_map])
+
+    assert len(calls) == 1
+    assert [t.drop_columns([SystemColumns.FIVETRAN_SYNCED.value]) for t in result] == [
+        t.drop_columns([SystemColumns.FIVETRAN_SYNCED.value]) for t in expected
+    ]
+
+
+def test_transform_tables_prepares_each_flattening_config(stream_map):
+    unflattened_stream_map = FivetranStreamMap(
+        stream_alias="animals_raw",
+        raw_schema={"properties": {}},
+        key_properties=["name"],
+        flattening_options=None,
+    )
+    table = pa.table(
+        {
+            "name": ["Otis"],
+            "tags": pa.array([["a", "b"]], type=pa.list_(pa.string())),
+        }
+    )
+
+    flattened, unflattened = transform_tables(
+        table, [stream_map, unflattened_stream_map]
+    )
+
+    assert flattened.schema.field("tags").type == pa.string()
+    assert pa.types.is_list(unflattened.schema.field("tags").type)
+
+
+@pytest.mark.parametrize(
+    ("schema", "expected"),
+    [
+        pytest.param({"type": "string"}, pa.string(), id="string"),
+        pytest.param({"type": ["null", "integer"]}, pa.int64(), id="nullable integer"),
+        pytest.param({"type": "number"}, pa.float64(), id="number"),
+        pytest.param({"type": "boolean"}, pa.bool_(), id="boolean"),
+        pytest.param(
+            {"type": "string", "format": "date-time"}, pa.string(), id="date-time"
+        ),
+        pytest.param(
+            {"type": "object", "properties": {"x": {"type": "integer"}}},
+            pa.struct([("x", pa.int64())]),
+            id="object",
+        ),
+        pytest.param({"type": "object"}, pa.string(), id="opaque object"),
+        pytest.param(
+            {"type": "array", "items": {"type": "string"}},
+            pa.list_(pa.string()),
+            id="array",
+        ),
+        pytest.param({"type": "array"}, pa.string(), id="opaque array"),
+        pytest.param({"type": ["string", "integer"]}, pa.string(), id="multi-type"),
+        pytest.param({"anyOf": [{"type": "string"}]}, pa.string(), id="no type"),
+    ],
+)
+def test_json_schema_to_arrow_type(schema, expected):
+    assert json_schema_to_arrow_type(schema) == expected
+
+
+def test_json_schema_to_arrow_keeps_property_order():
+    schema = json_schema_to_arrow(
+        {
+            "properties": {
+                "name": {"type": "string"},
+                SystemColumns.FIVETRAN_DELETED: {"type": "boolean"},
+            }
+        }
+    )
+
+    assert schema.names == ["name", SystemColumns.FIVETRAN_DELETED.value]
+
+
+def test_records_to_batch():
+    schema = pa.schema(
+        [
+            ("name", pa.string()),
+            ("weight", pa.float64()),
+            ("meta", pa.string()),
+        ]
+    )
+
+    batch = records_to_batch(
+        [
+            {"name": "Otis", "weight": Decimal("1.5"), "meta": {"a": Decimal("1.0")}},
+            {"name": "Bob", "undeclared": True},
+        ],
+        schema,
+    )
+
+    assert batch.schema == schema
+    assert batch.to_pylist() == [
+        {"name": "Otis", "weight": 1.5, "meta": '{"a":1.0}'},
+        {"name": "Bob", "weight": None, "meta": None},
+    ]
+
+
+@pytest.mark.parametrize("max_level", [None, 0, 1, 2, 10])
+def test_table_plan_matches_unplanned_transforms(max_level):
+    owner = pa.struct(
+        [
+            ("firstName", pa.string()),
+            ("address", pa.struct([("postCode", pa.string())])),
+            ("tags", pa.list_(pa.string())),
+        ]
+    )
+    column = pa.array(
+        [
+            {"firstName": "Bob", "address": {"postCode": "AB1"}, "tags": ["a"]},
+            None,
+            {"firstName": None, "address": None, "tags": None},
+        ],
+        type=owner,
+    )
+    table = pa.table(
+        {
+            "name": ["Otis", "Milo", "Rex"],
+            "theOwner": pa.chunked_array([column.slice(0, 1), column.slice(1)]),
+        }
+    )
+
+    expected = table
+    if max_level is not None:
+        expected = stringify_complex_columns(flatten_table(expected, max_level))
+    expected = rename_columns(expected)
+
+    result = table_plan(table.schema, max_level).prepare(table)
+
+    assert result.schema == expected.schema
+    assert result.to_pylist() == expected.to_pylist()
+
+
+def test_table_plan_cached_per_schema():
+    schema = pa.schema([("name", pa.string())])
+
+    assert table_plan(schema, 1) is table_plan(pa.schema([("name", pa.string())]), 1)
+    assert table_plan(schema, 1) is not table_plan(schema, None)
+
+
+@pytest.mark.parametrize("encoding", ["plain", "run_end", "dictionary"])
+@pytest.mark.parametrize("length", [0, 3])
+def test_constant_column(encoding: str, length: int):
+    result = constant_column(pa.scalar("x"), length, encoding=encoding)
+
+    assert len(result) == length
+    assert result.to_pylist() == ["x"] * length
+    assert pa.types.is_string(result.type) == (encoding == "plain")
@@ -0,0 +1,257 @@
+"""Equivalence tests for Arrow-native JSON encoding against msgspec."""
+
+from __future__ import annotations
+
+import random
+import string
+
+import msgspec
+import pyarrow as pa
+import pytest
+
+from mapper_fivetran import _arrow_json
+from mapper_fivetran.arrow import stringify_complex_columns
+
+_ENCODER = msgspec.json.Encoder()
+
+
+def _reference(array: pa.Array | pa.ChunkedArray) -> list[str | None]:
+    # the row-wise encoding `stringify_complex_columns` has always produced
+    return [
+        None if value is None else _ENCODER.encode(value).decode()
+        for value in array.to_pylist()
+    ]
+
+
+POINT = pa.struct([("x", pa.float64()), ("y", pa.float64())])
+
+CORPUS = [
+    pytest.param(
+        pa.array(
+            [{"a": 1, "b": "x"}, None, {"a": None, "b": None}],
+            pa.struct([("a", pa.int64()), ("b", pa.string())]),
+        ),
+        id="struct with nulls",
+    ),
+    pytest.param(
+        pa.array(
+            [{"inner": {"value": None}}, {"inner": None}, None],
+            pa.struct([("inner", pa.struct([("value", pa.int32())]))]),
+        ),
+        id="nested struct nulls",
+    ),
+    pytest.param(
+        pa.array([[1, None, 3], None, [], [None]], pa.list_(pa.int64())),
+        id="list with nulls",
+    ),
+    pytest.param(
+        pa.array([[[1], None, []], None, [[]]], pa.list_(pa.list_(pa.int16()))),
+        id="nested lists",
+    ),
+    pytest.param(
+        pa.array([["a", None], None], pa.large_list(pa.large_string())),
+        id="large list of large strings",
+    ),
+    pytest.param(
+        pa.array([[1, 2], None, [3, None]], pa.list_(pa.uint8(), 2)),
+        id="fixed size list",
+    ),
+    pytest.param(
+        pa.array(
+            [[("a", 1), ("b", None)], None, []],
+            pa.map_(pa.string(), pa.int64()),
+        ),
+        id="map",
+    ),
+    pytest.param(
+        pa.array(
+            [[(1, [{"x": 1.5, "y": None}])], None],
+            pa.map_(pa.int32(), pa.list_(POINT)),
+        ),
+        id="map of list of struct",
+    ),
+    pytest.param(
+        pa.array(
+            [['quote " backslash \\ slash /', "\x00\x01\x08\t\n\x0b\x0c\r\x1f\x7f"]],
+            pa.list_(pa.string()),
+        ),
+        id="escapes",
+    ),
+    pytest.param(
+        pa.array([["café", "\u2028\u2029", "\U0001f600", ""]], pa.list_(pa.string())),
+        id="non-ascii",
+    ),
+    pytest.param(
+        pa.array(
+            [
+                [
+                    0.0,
+                    -0.0,
+                    1.0,
+                    -1.5,
+                    0.1,
+                    1e-7,
+                    1e-6,
+                    5e-6,
+                    1e-5,
+                    1e10,
+                    1.7e12,
+                    9999999999999998.0,
+                    1e16,
+                    1e300,
+                    5e-324,
+                    float("nan"),
+                    float("inf"),
+                    float("-inf"),
+                    None,
+                ]
+            ],
+            pa.list_(pa.float64()),
+        ),
+        id="floats",
+    ),
+    pytest.param(
+        pa.array([[0.1, 1.5, None]], pa.list_(pa.float32())),
+        id="float32",
+    ),
+    pytest.param(
+        pa.array([[True, False, None]], pa.list_(pa.bool_())),
+        id="booleans",
+    ),
+    pytest.param(
+        pa.array([[-(2**63), 2**63 - 1]], pa.list_(pa.int64())),
+        id="int64 bounds",
+    ),
+    pytest.param(
+        pa.array([[2**64 - 1]], pa.list_(pa.uint64())),
+        id="uint64",
+    ),
+    pytest.param(
+        pa.array([[None, None], None], pa.list_(pa.null())),
+        id="null type",
+    ),
+    pytest.param(pa.array([{}, None], pa.struct([])), id="empty struct"),
+    pytest.param(
+        pa.array(
+            [{'we"ird\nkey': 1, "café": 2}],
+            pa.struct([('we"ird\nkey', pa.int8()), ("café", pa.int8())]),
+        ),
+        id="escaped field names",
+    ),
+]
+
+
+@pytest.mark.parametrize("array", CORPUS)
+def test_encode_matches_msgspec(array: pa.Array):
+    assert _arrow_json.is_supported(array.type)
+    assert _arrow_json.encode(array).to_pylist() == _reference(array)
+
+
+@pytest.mark.parametrize("array", CORPUS)
+def test_encode_matches_msgspec_sliced(array: pa.Array):
+    sliced = array.slice(1)
+    assert _arrow_json.encode(sliced).to_pylist() == _reference(sliced)
+
+
+@pytest.mark.parametrize(
+    "data_type",
+    [
+        pytest.param(pa.list_(pa.binary()), id="binary"),
+        pytest.param(pa.list_(pa.timestamp("us")), id="timestamp"),
+        pytest.param(pa.list_(pa.decimal128(10, 2)), id="decimal"),
+        pytest.param(
+            pa.struct([("a", pa.int8()), ("a", pa.int8())]),
+            id="duplicate field names",
+        ),
+        pytest.param(pa.list_(pa.dictionary(pa.int8(), pa.string())), id="dictionary"),
+    ],
+)
+def test_unsupported_types(data_type: pa.DataType):
+    assert not _arrow_json.is_supported(data_type)
+
+
+def test_stringify_complex_columns_matches_msgspec_for_unsupported_types():
+    column = pa.array(
+        [{"blob": b"\x00\xff", "tags": ["a"]}, None, {"blob": None, "tags": None}],
+        pa.struct([("blob", pa.binary()), ("tags", pa.list_(pa.string()))]),
+    )
+
+    result = stringify_complex_columns(pa.table({"column": column}))
+
+    assert result.column("column").to_pylist() == _reference(column)
+
+
+def test_stringify_complex_columns_encodes_chunks():
+    column = pa.chunked_array(
+        [
+            pa.array([[1, 2], None], pa.list_(pa.int64())),
+            pa.array([[3]], pa.list_(pa.int64())),
+        ]
+    )
+
+    result = stringify_complex_columns(pa.table({"column": column}))
+
+    assert result.column("column").num_chunks == 2  # noqa: PLR2004
+    assert result.column("column").to_pylist() == _reference(column)
+
+
+def _random_type(rng: random.Random, depth: int = 0) -> pa.DataType:
+    scalars = [pa.int64(), pa.int8(), pa.float64(), pa.bool_(), pa.string()]
+    if depth >= 3 or rng.random() < 0.3:  # noqa: PLR2004
+        return rng.choice(scalars)
+
+    kind = rng.choice(["struct", "list", "map", "fixed"])
+    if kind == "struct":
+        return pa.struct(
+            [(f"f{i}", _random_type(rng, depth + 1)) for i in range(rng.randint(1, 3))]
+        )
+    if kind == "map":
+        return pa.map_(pa.string(), _random_type(rng, depth + 1))
+    if kind == "fixed":
+        return pa.list_(_random_type(rng, depth + 1), 2)
+    return pa.list_(_random_type(rng, depth + 1))
+
+
+def _random_value(rng: random.Random, data_type: pa.DataType):  # noqa: PLR0911
+    if rng.random() < 0.15:  # noqa: PLR2004
+        return None
+    if pa.types.is_struct(data_type):
+        return {field.name: _random_value(rng, field.type) for field in data_type}
+    if pa.types.is_map(data_type):
+        return [
+            (rng.choice(string.ascii_letters), _random_value(rng, data_type.item_type))
+            for _ in range(rng.randint(0, 3))
+        ]
+    if pa.types.is_fixed_size_list(data_type):
+        return [_random_value(rng, data_type.value_type) for _ in range(2)]
+    if pa.types.is_list(data_type):
+        return [
+            _random_value(rng, data_type.value_type) for _ in range(rng.randint(0, 3))
+        ]
+    if pa.types.is_floating(data_type):
+        return rng.choice(
+            [
+                rng.uniform(-1e6, 1e6),
+                10 ** rng.uniform(-10, 20),
+                float(rng.randint(0, 9)),
+            ]
+        )
+    if pa.types.is_int8(data_type):
+        return rng.randint(-128, 127)
+    if pa.types.is_integer(data_type):
+        return rng.randint(-(2**63), 2**63 - 1)
+    if pa.types.is_boolean(data_type):
+        return rng.random() < 0.5  # noqa: PLR2004
+    return "".join(
+        rng.choice(string.printable + "\x00\x1fé\u2028")
+        for _ in range(rng.randint(0, 8))
+    )
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_encode_matches_msgspec_random(seed: int):
+    rng = random.Random(seed)  # noqa: S311
+    data_type = _random_type(rng)
+    array = pa.array([_random_value(rng, data_type) for _ in range(50)], data_type)
+
+    assert _arrow_json.encode(array).to_pylist() == _reference(array)
@@ -2,16 +2,22 @@
 
 from __future__ import annotations
 
+import copy
+import typing as t
+from datetime import datetime, timezone
 from pathlib import Path
 
 import pyarrow as pa
 import pytest
 from pyarrow import ipc
+from singer_sdk.helpers._typing import to_json_compatible
 
 from mapper_fivetran import SystemColumns
-from mapper_fivetran.arrow import BatchFivetranIdError
 from mapper_fivetran.mapper import FivetranMapper
 
+if t.TYPE_CHECKING:
+    from singer_sdk.mapper import StreamMap
+
 
 def _write_arrow_file(path: str, table: pa.Table) -> str:
     with ipc.new_file(path, table.schema) as writer:
@@ -86,27 +92,120 @@ def test_map_batch_message_transforms_columns(mapper: FivetranMapper, tmp_path):
     assert result.column(SystemColumns.FIVETRAN_DELETED.value).to_pylist() == [False]
 
 
-def test_map_batch_message_raises_without_key_properties(
+KEYLESS_SCHEMA = {
+    "type": "SCHEMA",
+    "stream": "animals",
+    "schema": {
+        "properties": {
+            "name": {"type": "string"},
+            "weight": {"type": ["number", "null"]},
+            "born": {"type": ["string", "null"], "format": "date-time"},
+            "owner": {
+                "type": ["object", "null"],
+                "properties": {
+                    "firstName": {"type": ["string", "null"]},
+                    "score": {"type": ["number", "null"]},
+                },
+            },
+        }
+    },
+    "key_properties": [],
+}
+KEYLESS_ARROW_SCHEMA = pa.schema(
+    {
+        "name": pa.string(),
+        "weight": pa.float64(),
+        "born": pa.timestamp("us", tz="UTC"),
+        "owner": pa.struct({"firstName": pa.string(), "score": pa.float64()}),
+    }
+)
+
+
+def _keyless_ids(mapper: FivetranMapper, tmp_path, rows: list[dict]) -> list[str]:
+    src = _write_arrow_file(
+        str(tmp_path / "src.arrow"),
+        pa.Table.from_pylist(rows, schema=KEYLESS_ARROW_SCHEMA),
+    )
+    (out_message,) = list(
+        mapper.map_batch_message(
+            {
+                "type": "BATCH",
+                "stream": "animals",
+                "encoding": {"format": "arrow"},
+                "manifest": [src],
+            }
+        )
+    )
+    result = _read_arrow_file(out_message.to_dict()["manifest"][0])
+    return result.column(SystemColumns.FIVETRAN_ID.value).to_pylist()
+
+
+def _record_fivetran_id(stream_map: StreamMap, record: dict) -> str:
+    transformed = stream_map.transform(record)
+    assert transformed is not None
+    return transformed[SystemColumns.FIVETRAN_ID]
+
+
+def test_map_batch_message_fivetran_id_matches_records(
     mapper: FivetranMapper, tmp_path
 ):
-    _register_schema(mapper, key_properties=[])
+    list(mapper.map_schema_message(copy.deepcopy(KEYLESS_SCHEMA)))
+    (stream_map,) = mapper.mapper.stream_maps["animals"]
+    born = datetime(2024, 1, 1, 12, 30, tzinfo=timezone.utc)
+    rows: list[dict] = [
+        # nested, flattened into `owner_first_name` and `owner_score`
+        {
+            "name": "Otis",
+            "weight": 1.5,
+            "born": None,
+            "owner": {"firstName": "R", "score": 2.5},
+        },
+        # floats in exponent notation
+        {
+            "name": "Milo",
+            "weight": 1e-7,
+            "born": None,
+            "owner": {"firstName": None, "score": 1.5e20},
+        },
+        # timestamps, as the SDK writes them to RECORD messages
+        {
+            "name": "Rex",
+            "weight": None,
+            "born": born,
+            "owner": {"firstName": None, "score": None},
+        },
+    ]
+    records = [
+        {**row, "born": row["born"] and to_json_compatible(row["born"])} for row in rows
+    ]
 
-    src = _write_arrow_file(str(tmp_path / "src.arrow"), pa.table({"name": ["Otis"]}))
+    assert _keyless_ids(mapper, tmp_path, rows) == [
+        _record_fivetran_id(stream_map, record) for record in records
+    ]
 
-    with pytest.raises(BatchFivetranIdError):
-        list(
-            mapper.map_batch_message(
-                {
-                    "type": "BATCH",
-                    "stream": "animals",
-                    "encoding": {"format": "arrow"},
-                    "manifest": [src],
-                }
-            )
-        )
+
+def test_map_batch_message_fivetran_id_of_missing_properties(
+    mapper: FivetranMapper, tmp_path
+):
+    list(mapper.map_schema_message(copy.deepcopy(KEYLESS_SCHEMA)))
+    (stream_map,) = mapper.mapper.stream_maps["animals"]
+
+    (fivetran_id,) = _keyless_ids(mapper, tmp_path, [{"name": "Otis"}])
+
+    # a table has every column, so missing properties hash as null
+    assert fivetran_id == _record_fivetran_id(
+        stream_map,
+        {
+            "name": "Otis",
+            "weight": None,
+            "born": None,
+            "owner": {"firstName": None, "score": None},
+        },
+    )
+    assert fivetran_id != _record_fivetran_id(stream_map, {"name": "Otis"})
 
 
-def test_map_batch_message_rejects_non_arrow_encoding(mapper: FivetranMapper):
+def test_map_batch_message_rejects_unsupported_encoding(mapper: FivetranMapper):
     _register_schema(mapper, key_properties=["name"])
 
     with pytest.raises(ValueError, match="arrow"):
@@ -115,7 +214,7 @@ def test_map_batch_message_rejects_non_arrow_encoding(mapper: FivetranMapper):
                 {
                     "type": "BATCH",
                     "stream": "animals",
-                    "encoding": {"format": "jsonl"},
+                    "encoding": {"format": "csv"},
                     "manifest": [],
                 }
             )
@@ -204,3 +303,412 @@ def test_map_batch_message_leaves_output_files_for_downstream(
     out_path = out_message.to_dict()["manifest"][0].removeprefix("file://")
 
     assert Path(out_path).exists()
+
+
+def test_map_batch_message_streams_record_batches(mapper: FivetranMapper, tmp_path):
+    _register_schema(mapper, key_properties=["name"])
+
+    table = pa.Table.from_batches(
+        [
+            pa.record_batch({"name": ["Otis", "Milo"]}),
+            pa.record_batch({"name": ["Rex"]}),
+        ]
+    )
+    src = _write_arrow_file(str(tmp_path / "src.arrow"), table)
+
+    (out_message,) = list(
+        mapper.map_batch_message(
+            {
+                "type": "BATCH",
+                "stream": "animals",
+                "encoding": {"format": "arrow"},
+                "manifest": [src],
+            }
+        )
+    )
+
+    with ipc.open_file(
+        out_message.to_dict()["manifest"][0].removeprefix("file://")
+    ) as reader:
+        assert reader.num_record_batches == 2  # noqa: PLR2004
+        assert reader.read_all().column("name").to_pylist() == ["Otis", "Milo", "Rex"]
+
+
+def test_map_batch_message_handles_empty_files(mapper: FivetranMapper, tmp_path):
+    _register_schema(mapper, key_properties=[])
+
+    src = _write_arrow_file(
+        str(tmp_path / "src.arrow"), pa.table({"name": pa.array([], pa.string())})
+    )
+
+    (out_message,) = list(
+        mapper.map_batch_message(
+            {
+                "type": "BATCH",
+                "stream": "animals",
+                "encoding": {"format": "arrow"},
+                "manifest": [src],
+            }
+        )
+    )
+
+    result = _read_arrow_file(out_message.to_dict()["manifest"][0])
+    assert result.num_rows == 0
+    assert result.schema.names == [
+        "name",
+        SystemColumns.FIVETRAN_ID.value,
+        SystemColumns.FIVETRAN_SYNCED.value,
+        SystemColumns.FIVETRAN_DELETED.value,
+    ]
+
+
+def test_map_batch_message_keeps_manifest_order(mapper: FivetranMapper, tmp_path):
+    _register_schema(mapper, key_properties=["name"])
+
+    srcs = [
+        _write_arrow_file(str(tmp_path / f"src_{i}.arrow"), pa.table({"name": [name]}))
+        for i, name in enumerate(["Otis", "Milo", "Rex"])
+    ]
+
+    (out_message,) = list(
+        mapper.map_batch_message(
+            {
+                "type": "BATCH",
+                "stream": "animals",
+                "encoding": {"format": "arrow"},
+                "manifest": srcs,
+            }
+        )
+    )
+
+    assert [
+        _read_arrow_file(uri).column("name").to_pylist()
+        for uri in out_message.to_dict()["manifest"]
+    ] == [["Otis"], ["Milo"], ["Rex"]]
+    assert not any((tmp_path / f"src_{i}.arrow").exists() for i in range(3))
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_map_batch_message_transforms_files_concurrently(tmp_path, max_workers: int):
+    out_dir = tmp_path / "out"
+    mapper = FivetranMapper(
+        config={
+            "batch_config": {
+                "storage": {"root": str(out_dir)},
+                "max_workers": max_workers,
+            }
+        },
+        validate_config=False,
+    )
+    _register_schema(mapper, key_properties=[])
+
+    names = [f"animal-{i}" for i in range(16)]
+    srcs = [
+        _write_arrow_file(str(tmp_path / f"src_{i}.arrow"), pa.table({"name": [name]}))
+        for i, name in enumerate(names)
+    ]
+
+    (out_message,) = list(
+        mapper.map_batch_message(
+            {
+                "type": "BATCH",
+                "stream": "animals",
+                "encoding": {"format": "arrow"},
+                "manifest": srcs,
+            }
+        )
+    )
+
+    assert [
+        _read_arrow_file(uri).column("name").to_pylist()[0]
+        for uri in out_message.to_dict()["manifest"]
+    ] == names
+
+
+def test_map_batch_message_raises_first_file_error(tmp_path):
+    out_dir = tmp_path / "out"
+    mapper = FivetranMapper(
+        config={"batch_config": {"storage": {"root": str(out_dir)}, "max_workers": 2}},
+        validate_config=False,
+    )
+    _register_schema(mapper, key_properties=["name"])
+
+    bad_path = tmp_path / "bad.arrow"
+    bad_path.write_bytes(b"not an arrow file")
+    srcs = [
+        f"file://{bad_path}",
+        _write_arrow_file(str(tmp_path / "src.arrow"), pa.table({"name": ["Otis"]})),
+    ]
+
+    with pytest.raises(pa.ArrowInvalid):
+        list(
+            mapper.map_batch_message(
+                {
+                    "type": "BATCH",
+                    "stream": "animals",
+                    "encoding": {"format": "arrow"},
+                    "manifest": srcs,
+                }
+            )
+        )
+
+    # the failed file is left in place, with no partial output
+    assert bad_path.exists()
+    assert not any(out_dir.glob("animals_*_0.arrow"))
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_map_batch_message_keeps_manifest_on_error(tmp_path, max_workers: int):
+    out_dir = tmp_path / "out"
+    mapper = FivetranMapper(
+        config={
+            "batch_config": {
+                "storage": {"root": str(out_dir)},
+                "max_workers": max_workers,
+            }
+        },
+        validate_config=False,
+    )
+    _register_schema(mapper, key_properties=["name"])
+
+    good_paths = [tmp_path / f"src_{i}.arrow" for i in range(2)]
+    for i, good_path in enumerate(good_paths):
+        _write_arrow_file(str(good_path), pa.table({"name": [f"Otis {i}"]}))
+    bad_path = tmp_path / "bad.arrow"
+    bad_path.write_bytes(b"not an arrow file")
+
+    with pytest.raises(pa.ArrowInvalid):
+        list(
+            mapper.map_batch_message(
+                {
+                    "type": "BATCH",
+                    "stream": "animals",
+                    "encoding": {"format": "arrow"},
+                    "manifest": [f"file://{path}" for path in (*good_paths, bad_path)],
+                }
+            )
+        )
+
+    # sources of files that did succeed are kept, as their output is discarded
+    assert all(path.exists() for path in (*good_paths, bad_path))
+    assert not any(out_dir.glob("animals_*"))
+
+
+def test_map_batch_message_memory_maps_source_files(tmp_path):
+    out_dir = tmp_path / "out"
+    mapper = FivetranMapper(
+        config={
+            "batch_config": {"storage": {"root": str(out_dir)}, "memory_map": True}
+        },
+        validate_config=False,
+    )
+    _register_schema(mapper, key_properties=["name"])
+
+    src_path = tmp_path / "src.arrow"
+    src = _write_arrow_file(
+        str(src_path),
+        pa.table({"name": ["Otis", "Milo"], "_sdc_deleted_at": [None, "2024-01-01"]}),
+    )
+
+    (out_message,) = list(
+        mapper.map_batch_message(
+            {
+                "type": "BATCH",
+                "stream": "animals",
+                "encoding": {"format": "arrow"},
+                "manifest": [src],
+            }
+        )
+    )
+
+    result = _read_arrow_file(out_message.to_dict()["manifest"][0])
+    assert result.column("name").to_pylist() == ["Otis", "Milo"]
+    assert result.column(SystemColumns.FIVETRAN_DELETED.value).to_pylist() == [
+        False,
+        True,
+    ]
+    assert not src_path.exists()
+
+
+@pytest.mark.parametrize("compression", ["lz4", "zstd"])
+def test_map_batch_message_compresses_output(tmp_path, compression: str):
+    out_dir = tmp_path / "out"
+    mapper = FivetranMapper(
+        config={
+            "batch_config": {
+                "storage": {"root": str(out_dir)},
+                "encoding": {"compression": compression, "compression_level": 1},
+            }
+        },
+        validate_config=False,
+    )
+    _register_schema(mapper, key_properties=["name"])
+
+    names = ["Otis"] * 10_000
+    src = _write_arrow_file(str(tmp_path / "src.arrow"), pa.table({"name": names}))
+
+    (out_message,) = list(
+        mapper.map_batch_message(
+            {
+                "type": "BATCH",
+                "stream": "animals",
+                "encoding": {"format": "arrow"},
+                "manifest": [src],
+            }
+        )
+    )
+    out = out_message.to_dict()
+
+    assert out["encoding"] == {
+        "format": "arrow",
+        "compression": compression,
+        "compression_level": 1,
+    }
+    (out_uri,) = out["manifest"]
+    result = _read_arrow_file(out_uri)
+    assert result.column("name").to_pylist() == names
+    assert Path(out_uri.removeprefix("file://")).stat().st_size < result.nbytes / 2
+
+
+@pytest.mark.parametrize(
+    ("constant_columns", "type_check"),
+    [
+        ("plain", pa.types.is_boolean),
+        ("run_end", pa.types.is_run_end_encoded),
+        ("dictionary", pa.types.is_dictionary),
+    ],
+)
+@pytest.mark.parametrize("roll_batch_files", [False, True], ids=["files", "rolled"])
+def test_map_batch_message_encodes_constant_columns(
+    tmp_path,
+    constant_columns: str,
+    type_check,
+    roll_batch_files: bool,  # noqa: FBT001
+):
+    mapper = FivetranMapper(
+        config={
+            "batch_config": {
+                "storage": {"root": str(tmp_path / "out")},
+                "encoding": {"constant_columns": constant_columns},
+                "fivetran_synced_type": "timestamp",
+                "roll_batch_files": roll_batch_files,
+            },
+            # a new reading for every record batch
+            "clock_resolution": 0,
+        },
+        validate_config=False,
+    )
+    _register_schema(mapper, key_properties=["name"])
+    # several record batches per file, and several files per rolled output file
+    manifest = [
+        _write_arrow_file(
+            str(tmp_path / f"src_{i}.arrow"),
+            pa.Table.from_batches([pa.record_batch({"name": ["Otis", "Milo"]})] * 3),
+        )
+        for i in range(2)
+    ]
+
+    (out_message,) = list(
+        mapper.map_batch_message(
+            {
+                "type": "BATCH",
+                "stream": "animals",
+                "encoding": {"format": "arrow"},
+                "manifest": manifest,
+            }
+        )
+    )
+
+    for out_uri in out_message.to_dict()["manifest"]:
+        result = _read_arrow_file(out_uri)
+        deleted = result.column(SystemColumns.FIVETRAN_DELETED.value)
+        synced = result.column(SystemColumns.FIVETRAN_SYNCED.value)
+        assert type_check(deleted.type)
+        assert deleted.to_pylist() == [False] * result.num_rows
+        assert len(set(synced.to_pylist())) == 1
+        assert synced.to_pylist()[0].tzinfo is not None
+
+
+def _make_rolling_mapper(tmp_path, batch_size: int) -> FivetranMapper:
+    mapper = FivetranMapper(
+        config={
+            "batch_config": {
+                "storage": {"root": str(tmp_path / "out")},
+                "roll_batch_files": True,
+                "batch_size": batch_size,
+            }
+        },
+        validate_config=False,
+    )
+    _register_schema(mapper, key_properties=["name"])
+    return mapper
+
+
+@pytest.mark.parametrize(
+    ("file_rows", "expected_rows"),
+    [
+        pytest.param([2, 1, 2, 3], [4, 4], id="merges small files"),
+        pytest.param([10], [4, 4, 2], id="splits large files"),
+        pytest.param([3, 6], [4, 4, 1], id="merges and splits"),
+    ],
+)
+def test_map_batch_message_rolls_output_files(
+    tmp_path,
+    file_rows: list[int],
+    expected_rows: list[int],
+):
+    mapper = _make_rolling_mapper(tmp_path, batch_size=4)
+    names = iter(range(sum(file_rows)))
+    src_paths = [tmp_path / f"src_{i}.arrow" for i in range(len(file_rows))]
+    manifest = [
+        _write_arrow_file(
+            str(src_path),
+            pa.table({"name": [f"animal-{next(names)}" for _ in range(rows)]}),
+        )
+        for src_path, rows in zip(src_paths, file_rows)
+    ]
+
+    (out_message,) = list(
+        mapper.map_batch_message(
+            {
+                "type": "BATCH",
+                "stream": "animals",
+                "encoding": {"format": "arrow"},
+                "manifest": manifest,
+            }
+        )
+    )
+
+    results = [_read_arrow_file(uri) for uri in out_message.to_dict()["manifest"]]
+    assert [result.num_rows for result in results] == expected_rows
+    assert [
+        name for result in results for name in result.column("name").to_pylist()
+    ] == [f"animal-{i}" for i in range(sum(file_rows))]
+    assert not any(src_path.exists() for src_path in src_paths)
+
+
+def test_map_batch_message_rolling_removes_output_on_error(tmp_path):
+    mapper = _make_rolling_mapper(tmp_path, batch_size=1)
+    good_path = tmp_path / "good.arrow"
+    bad_path = tmp_path / "bad.arrow"
+    manifest = [
+        _write_arrow_file(str(good_path), pa.table({"name": ["Otis", "Milo"]})),
+        f"file://{bad_path}",
+    ]
+    bad_path.write_bytes(b"not an arrow file")
+
+    with pytest.raises(pa.ArrowInvalid):
+        list(
+            mapper.map_batch_message(
+                {
+                    "type": "BATCH",
+                    "stream": "animals",
+                    "encoding": {"format": "arrow"},
+                    "manifest": manifest,
+                }
+            )
+        )
+
+    assert good_path.exists()
+    assert bad_path.exists()
+    assert not any((tmp_path / "out").glob("animals_*"))
@@ -0,0 +1,162 @@
+"""Tests for converting RECORD messages to BATCH messages in `FivetranMapper`."""
+
+from __future__ import annotations
+
+import pytest
+
+from mapper_fivetran import SystemColumns
+
+
+@pytest.fixture
+def properties() -> dict:
+    return {"name": {"type": "string"}, "weight": {"type": "number"}}
+
+
+def test_records_written_as_batch_before_state(
+    make_mapper,
+    process,
+    read_messages,
+    schema,
+    state,
+    make_batch_config,
+    read_rows,
+    make_record,
+):
+    mapper = make_mapper(make_batch_config(batch_records=True))
+
+    process(
+        mapper,
+        schema,
+        make_record("Otis", weight=1.5),
+        make_record("Bob", weight=1.5),
+    )
+    assert [m["type"] for m in read_messages()] == ["SCHEMA"]
+
+    process(mapper, state)
+    batch_message, state_message = read_messages()
+
+    assert batch_message["type"] == "BATCH"
+    assert batch_message["stream"] == "animals"
+    assert batch_message["encoding"] == {"format": "arrow"}
+    assert state_message["type"] == "STATE"
+
+    (uri,) = batch_message["manifest"]
+    rows = read_rows(uri)
+    assert [row["name"] for row in rows] == ["Otis", "Bob"]
+    assert [row["weight"] for row in rows] == [1.5, 1.5]
+    assert [row[SystemColumns.FIVETRAN_DELETED] for row in rows] == [False, False]
+    assert list(rows[0]) == [
+        "name",
+        "weight",
+        SystemColumns.FIVETRAN_SYNCED,
+        SystemColumns.FIVETRAN_DELETED,
+    ]
+
+
+def test_records_roll_over_by_batch_size(
+    make_mapper,
+    process,
+    read_messages,
+    schema,
+    state,
+    make_record,
+    make_batch_config,
+    read_rows,
+):
+    mapper = make_mapper(make_batch_config(batch_records=True, batch_size=2))
+
+    process(mapper, schema, *(make_record(str(i)) for i in range(3)), state)
+    messages = read_messages()
+
+    assert [m["type"] for m in messages] == ["SCHEMA", "BATCH", "STATE"]
+    assert [
+        [row["name"] for row in read_rows(uri)] for uri in messages[1]["manifest"]
+    ] == [["0", "1"], ["2"]]
+
+
+def test_no_batch_message_without_records(
+    make_mapper, process, read_messages, schema, state, make_batch_config
+):
+    mapper = make_mapper(make_batch_config(batch_records=True))
+
+    process(mapper, schema, state)
+
+    assert [m["type"] for m in read_messages()] == ["SCHEMA", "STATE"]
+
+
+def test_batch_encoding_records_compression(
+    make_mapper,
+    process,
+    read_messages,
+    schema,
+    state,
+    make_record,
+    make_batch_config,
+    read_rows,
+):
+    mapper = make_mapper(
+        make_batch_config(batch_records=True, encoding={"compression": "zstd"})
+    )
+
+    process(mapper, schema, make_record("Otis"), state)
+    _, batch_message, _ = read_messages()
+
+    assert batch_message["encoding"] == {"format": "arrow", "compression": "zstd"}
+    assert [row["name"] for row in read_rows(batch_message["manifest"][0])] == ["Otis"]
+
+
+def test_undeclared_properties_dropped_with_warning(
+    caplog,
+    make_mapper,
+    process,
+    read_messages,
+    schema,
+    state,
+    make_batch_config,
+    read_rows,
+    make_record,
+):
+    mapper = make_mapper(make_batch_config(batch_records=True))
+    process(mapper, schema, make_record("Otis", colour="brown"), state)
+
+    batch_message = read_messages()[1]
+    (row,) = read_rows(batch_message["manifest"][0])
+    assert "colour" not in row
+    assert "colour" in caplog.text
+
+
+def test_records_not_fitting_schema_written_as_records(
+    caplog,
+    make_mapper,
+    process,
+    read_messages,
+    schema,
+    state,
+    make_batch_config,
+    read_rows,
+    make_record,
+):
+    mapper = make_mapper(make_batch_config(batch_records=True))
+    process(
+        mapper,
+        schema,
+        make_record("Otis"),
+        make_record("Milo", weight="heavy"),
+        make_record("Rex"),
+        state,
+    )
+
+    messages = read_messages()
+    assert [m["type"] for m in messages] == [
+        "SCHEMA",
+        "BATCH",
+        "RECORD",
+        "BATCH",
+        "STATE",
+    ]
+    assert [row["name"] for row in read_rows(messages[1]["manifest"][0])] == ["Otis"]
+    assert messages[2]["record"]["name"] == "Milo"
+    assert messages[2]["record"]["weight"] == "heavy"
+    assert [row["name"] for row in read_rows(messages[3]["manifest"][0])] == ["Rex"]
+    assert "'animals'" in caplog.text
+    assert "'weight'" in caplog.text
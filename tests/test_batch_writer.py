@@ -0,0 +1,101 @@
+"""Tests for Arrow IPC BATCH file output."""
+
+from __future__ import annotations
+
+import pyarrow as pa
+import pytest
+from pyarrow import ipc
+
+from mapper_fivetran.batch import RecordBatchSink, RollingBatchWriter
+
+SCHEMA = pa.schema([("id", pa.int64())])
+
+
+def _read_ids(uris: list[str]) -> list[list[int]]:
+    ids = []
+    for uri in uris:
+        with ipc.open_file(uri.removeprefix("file://")) as reader:
+            ids.append(reader.read_all().column("id").to_pylist())
+    return ids
+
+
+def _batch(*ids: int) -> pa.RecordBatch:
+    return pa.RecordBatch.from_pydict({"id": list(ids)}, schema=SCHEMA)
+
+
+def test_rolling_batch_writer_rolls_by_rows(tmp_path):
+    writer = RollingBatchWriter(tmp_path, "animals", SCHEMA, max_rows=2)
+
+    completed = writer.write(_batch(1, 2, 3))
+    completed += writer.write(_batch(4, 5))
+    completed += writer.close()
+
+    assert _read_ids(completed) == [[1, 2], [3, 4], [5]]
+
+
+def test_rolling_batch_writer_rolls_by_bytes(tmp_path):
+    # int64 rows are 8 bytes each
+    writer = RollingBatchWriter(tmp_path, "animals", SCHEMA, max_bytes=16)
+
+    completed = writer.write(_batch(1, 2, 3, 4, 5)) + writer.close()
+
+    assert _read_ids(completed) == [[1, 2], [3, 4], [5]]
+
+
+def test_rolling_batch_writer_unbounded(tmp_path):
+    writer = RollingBatchWriter(tmp_path, "animals", SCHEMA)
+
+    assert writer.write(_batch(1, 2)) == []
+    assert writer.write(_batch(3)) == []
+    assert _read_ids(writer.close()) == [[1, 2, 3]]
+
+
+def test_rolling_batch_writer_close_without_writes(tmp_path):
+    writer = RollingBatchWriter(tmp_path, "animals", SCHEMA)
+
+    assert writer.close() == []
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_rolling_batch_writer_rolls_on_schema_change(tmp_path):
+    writer = RollingBatchWriter(tmp_path, "animals", SCHEMA)
+    wider = pa.RecordBatch.from_pydict({"id": [3], "name": ["Otis"]})
+
+    completed = writer.write(_batch(1, 2)) + writer.write(wider) + writer.close()
+
+    assert _read_ids(completed) == [[1, 2], [3]]
+    with ipc.open_file(completed[1].removeprefix("file://")) as reader:
+        assert reader.schema.names == ["id", "name"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 10])
+def test_record_batch_sink(tmp_path, chunk_size):
+    sink = RecordBatchSink(
+        RollingBatchWriter(tmp_path, "animals", SCHEMA, max_rows=2),
+        chunk_size=chunk_size,
+    )
+
+    completed = []
+    for i in range(3):
+        completed += sink.append({"id": i})
+    completed += sink.flush()
+
+    assert _read_ids(completed) == [[0, 1], [2]]
+
+
+def test_record_batch_sink_warns_of_dropped_properties(tmp_path, caplog):
+    sink = RecordBatchSink(
+        RollingBatchWriter(tmp_path, "animals", SCHEMA),
+        chunk_size=1,
+    )
+
+    completed = sink.append({"id": 1, "colour": "brown"})
+    completed += sink.append({"id": 2, "colour": "black", "size": "small"})
+    completed += sink.append({"id": 3, "colour": "white"})
+    completed += sink.flush()
+
+    assert _read_ids(completed) == [[1, 2, 3]]
+    assert [record.getMessage() for record in caplog.records] == [
+        "Dropping properties of stream 'animals' not in its schema: colour",
+        "Dropping properties of stream 'animals' not in its schema: size",
+    ]
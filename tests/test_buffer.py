@@ -0,0 +1,62 @@
+"""Tests for `RecordBuffer`."""
+
+from __future__ import annotations
+
+from mapper_fivetran import buffer as buffer_module
+from mapper_fivetran.buffer import RecordBuffer
+
+
+def _make_buffer(**kwargs) -> RecordBuffer:
+    return RecordBuffer(
+        **{"max_rows": 10, "max_bytes": 100, "max_latency": 60.0, **kwargs}
+    )
+
+
+def test_append_full_by_rows():
+    buffer = _make_buffer(max_rows=2)
+
+    assert buffer.append("a", 1) is False
+    assert buffer.append("b", 1) is True
+
+
+def test_append_full_by_bytes():
+    buffer = _make_buffer(max_bytes=10)
+
+    assert buffer.append("a", 5) is False
+    assert buffer.append("b", 5) is True
+
+
+def test_append_full_by_latency(monkeypatch):
+    now = 0.0
+    monkeypatch.setattr(buffer_module.time, "monotonic", lambda: now)
+    buffer = _make_buffer(max_latency=1.0)
+
+    assert buffer.append("a", 1) is False
+    now = 1.0
+    assert buffer.append("b", 1) is True
+
+
+def test_expired(monkeypatch):
+    now = 0.0
+    monkeypatch.setattr(buffer_module.time, "monotonic", lambda: now)
+    buffer = _make_buffer(max_latency=1.0)
+
+    now = 5.0
+    assert buffer.expired() is False
+    buffer.append("a", 1)
+    assert buffer.expired() is False
+    now = 6.0
+    assert buffer.expired() is True
+    buffer.drain()
+    assert buffer.expired() is False
+
+
+def test_drain_returns_items_in_order_and_resets():
+    buffer = _make_buffer(max_rows=2)
+    buffer.append("a", 1)
+    buffer.append("b", 1)
+
+    assert buffer.drain() == ["a", "b"]
+    assert len(buffer) == 0
+    assert buffer.nbytes == 0
+    assert buffer.append("c", 1) is False
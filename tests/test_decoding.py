@@ -0,0 +1,250 @@
+"""Tests for typed decoding of RECORD messages."""
+
+from __future__ import annotations
+
+import decimal
+import io
+import json
+
+import msgspec
+import pytest
+from singer_sdk.contrib.msgspec import MsgSpecReader
+
+from mapper_fivetran.decoding import TypedMsgSpecReader, record_to_dict
+from mapper_fivetran.mapper import FivetranMapper, FivetranStreamMap
+
+SCHEMA = {
+    "type": "SCHEMA",
+    "stream": "animals",
+    "schema": {
+        "properties": {
+            "id": {"type": "integer"},
+            "name": {"type": ["string", "null"]},
+            "isGoodBoy": {"type": "boolean"},
+            "weight": {"type": "number"},
+            "tags": {"type": "array", "items": {"type": "string"}},
+            "owner": {
+                "type": ["object", "null"],
+                "properties": {
+                    "firstName": {"type": "string"},
+                    "address": {
+                        "type": "object",
+                        "properties": {"postCode": {"type": "string"}},
+                    },
+                },
+            },
+            "1st-vet visit": {"type": "string", "format": "date-time"},
+            "_sdc_deleted_at": {"type": ["string", "null"]},
+        }
+    },
+    "key_properties": ["id"],
+}
+
+RECORDS = [
+    pytest.param(
+        {
+            "id": 1,
+            "name": "Otis",
+            "isGoodBoy": True,
+            "weight": 12.50,
+            "tags": ["small", "loud"],
+            "owner": {"firstName": "Reuben", "address": {"postCode": "AB1"}},
+            "1st-vet visit": "2024-01-01T00:00:00+00:00",
+            "_sdc_deleted_at": None,
+        },
+        id="complete",
+    ),
+    pytest.param({"name": None, "id": 2, "weight": 3}, id="missing keys"),
+    pytest.param({"id": 3, "owner": None}, id="null object"),
+    pytest.param({"id": "4"}, id="wrong type"),
+    pytest.param({"id": 5, "isGoodBoy": 1}, id="integer for boolean"),
+    pytest.param({"id": 6.0}, id="number for integer"),
+    pytest.param({"id": 7, "colour": "brown"}, id="undeclared key"),
+    pytest.param({"id": 8, "owner": {"lastName": "Sparks"}}, id="undeclared nested"),
+    pytest.param({"id": 9, "_sdc_deleted_at": "2024-01-01"}, id="deleted"),
+]
+
+
+def _record(record: dict, **message) -> str:
+    return json.dumps(
+        {"type": "RECORD", "stream": "animals", "record": record, **message}
+    )
+
+
+def _make_reader(*schemas: dict) -> TypedMsgSpecReader:
+    reader = TypedMsgSpecReader()
+    for schema in schemas:
+        reader.register_schema(schema["stream"], schema["schema"])
+    return reader
+
+
+@pytest.mark.parametrize("record", RECORDS)
+def test_reader_matches_generic(record: dict):
+    line = _record(record, version=1, time_extracted="2024-01-01T00:00:00+00:00")
+    message = _make_reader(SCHEMA).deserialize_json(line)
+
+    if isinstance(message["record"], msgspec.Struct):
+        message["record"] = record_to_dict(message["record"])
+    assert message == MsgSpecReader().deserialize_json(line)
+
+
+def test_reader_decodes_conforming_records_typed():
+    message = _make_reader(SCHEMA).deserialize_json(_record({"id": 1, "weight": 1.5}))
+
+    assert message == {
+        "type": "RECORD",
+        "stream": "animals",
+        "record": message["record"],
+    }
+    assert isinstance(message["record"], msgspec.Struct)
+    assert record_to_dict(message["record"]) == {
+        "id": 1,
+        "weight": decimal.Decimal("1.5"),
+    }
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        pytest.param(json.dumps(SCHEMA), id="schema"),
+        pytest.param(json.dumps({"type": "STATE", "value": {}}), id="state"),
+        pytest.param(
+            json.dumps({"type": "RECORD", "stream": "owners", "record": {"id": 1}}),
+            id="unregistered stream",
+        ),
+        pytest.param(
+            json.dumps({"type": "RECORD", "record": {"id": 1}}), id="no stream"
+        ),
+        pytest.param(json.dumps({"stream": ""}), id="only empty stream"),
+        pytest.param(_record({"id": 1}, sequence=1), id="undeclared message key"),
+    ],
+)
+def test_reader_decodes_other_lines_generically(line: str):
+    message = _make_reader(SCHEMA).deserialize_json(line)
+
+    assert message == json.loads(line)
+    assert isinstance(message.get("record", {}), dict)
+
+
+def test_reader_multiple_streams():
+    owners = {
+        "type": "SCHEMA",
+        "stream": "owners",
+        "schema": {"properties": {"firstName": {"type": "string"}}},
+    }
+    reader = _make_reader(SCHEMA, owners)
+
+    animal = reader.deserialize_json(_record({"id": 1}))
+    owner = reader.deserialize_json(
+        json.dumps(
+            {"type": "RECORD", "stream": "owners", "record": {"firstName": "Reuben"}}
+        )
+    )
+
+    assert animal["stream"] == "animals"
+    assert record_to_dict(animal["record"]) == {"id": 1}
+    assert owner["stream"] == "owners"
+    assert record_to_dict(owner["record"]) == {"firstName": "Reuben"}
+
+
+def test_reader_schema_change():
+    reader = _make_reader(SCHEMA)
+
+    reader.register_schema("animals", {"properties": {"id": {"type": "string"}}})
+    assert isinstance(
+        reader.deserialize_json(_record({"id": "1"}))["record"], msgspec.Struct
+    )
+    assert reader.deserialize_json(_record({"id": 1}))["record"] == {"id": 1}
+
+    # nothing could conform to a schema without properties
+    reader.register_schema("animals", {})
+    assert reader.deserialize_json(_record({"id": "1"}))["record"] == {"id": "1"}
+
+
+def _mapped_records(capsysbinary, config: dict, *lines: str) -> list[dict]:
+    mapper = FivetranMapper(config=config, validate_config=False)
+    mapper.process_lines(io.StringIO("".join(f"{line}\n" for line in lines)))
+
+    records = []
+    for line in capsysbinary.readouterr().out.splitlines():
+        message = json.loads(line)
+        if message["type"] == "RECORD":
+            message["record"].pop("_fivetran_synced", None)
+            records.append(message["record"])
+    return records
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        pytest.param({}, id="default"),
+        pytest.param({"flattening_max_depth": 0}, id="not flattened"),
+        pytest.param({"flattening_max_depth": 3}, id="deeply flattened"),
+        pytest.param(
+            {"stream_maps": {"animals": {"tags": "__NULL__"}}},
+            id="stream map",
+        ),
+    ],
+)
+@pytest.mark.parametrize("key_properties", [["id"], []], ids=["keys", "no keys"])
+def test_typed_decoding_maps_records_the_same(
+    config: dict,
+    key_properties: list[str],
+    capsysbinary,
+):
+    schema = {**SCHEMA, "key_properties": key_properties}
+    records: list[dict] = [record.values[0] for record in RECORDS]  # type: ignore[misc]
+    # keys out of schema order, which `_fivetran_id` depends on
+    records.append({"name": "Otis", "id": 10})
+    lines = [json.dumps(schema)] + [_record(record) for record in records]
+
+    typed = _mapped_records(capsysbinary, {**config, "typed_decoding": True}, *lines)
+    generic = _mapped_records(capsysbinary, config, *lines)
+
+    assert typed == generic
+    assert [record.get("_fivetran_id") for record in typed] == [
+        record.get("_fivetran_id") for record in generic
+    ]
+
+
+def test_typed_decoding_keeps_fivetran_id_of_keyless_streams(capsysbinary):
+    schema = {**SCHEMA, "key_properties": []}
+    # keys out of schema order, which `_fivetran_id` depends on
+    lines = [json.dumps(schema), _record({"name": "Otis", "id": 1})]
+
+    typed = _mapped_records(capsysbinary, {"typed_decoding": True}, *lines)
+    generic = _mapped_records(capsysbinary, {}, *lines)
+
+    assert typed[0]["_fivetran_id"] == generic[0]["_fivetran_id"]
+    assert list(typed[0]) == list(generic[0])
+
+
+def test_typed_decoding_skips_keyless_streams():
+    mapper = FivetranMapper(config={"typed_decoding": True}, validate_config=False)
+    for _ in mapper.map_schema_message({**SCHEMA, "key_properties": []}):
+        pass
+
+    message = mapper.message_reader.deserialize_json(_record({"id": 1}))
+
+    assert message["record"] == {"id": 1}
+
+
+def test_typed_decoding_prepares_records_without_dicts(monkeypatch, capsysbinary):
+    prepare_record = FivetranStreamMap.prepare_record
+    prepared = []
+
+    def record_prepared(self, record):
+        prepared.append(record)
+        return prepare_record(self, record)
+
+    monkeypatch.setattr(FivetranStreamMap, "prepare_record", record_prepared)
+    records = _mapped_records(
+        capsysbinary,
+        {"typed_decoding": True},
+        json.dumps(SCHEMA),
+        _record({"id": 1, "owner": {"firstName": "Reuben"}}),
+    )
+
+    assert len(prepared) == 1
+    assert isinstance(prepared[0], msgspec.Struct)
+    assert records[0]["owner_first_name"] == "Reuben"
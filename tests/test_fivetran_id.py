@@ -0,0 +1,176 @@
+"""Compatibility tests for `_fivetran_id` hashing.
+
+`_fivetran_id` must not change across releases, so every record here must hash
+exactly as `hashlib.md5(json.dumps(record, default=str).encode())` always has.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import random
+import struct
+import uuid
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from enum import Enum
+
+import pytest
+
+from mapper_fivetran import SystemColumns
+from mapper_fivetran._util import canonical_json, fivetran_id
+from mapper_fivetran.mapper import FivetranMapper, FivetranStreamMap
+
+
+class _Colour(Enum):
+    RED = 1
+
+
+class _Name(str, Enum):
+    OTIS = "Otis"
+
+
+CORPUS: dict[str, dict] = {
+    "empty": {},
+    "scalars": {"id": 1, "name": "Otis", "active": True, "deleted": None},
+    "separators in strings": {"text": 'a, b: c {"d": [e]}'},
+    "escapes": {"text": 'quote " backslash \\ slash / tab \t newline \n'},
+    "control characters": {"text": "".join(chr(c) for c in range(0x20))},
+    "delete character": {"text": "\x7f"},
+    "latin-1": {"text": "café"},
+    "line separator": {"text": "\u2028\u2029"},
+    "astral plane": {"text": "\U0001f600"},
+    "non-ascii key": {"naïve": 1},
+    "lone surrogate": {"text": "\ud800"},
+    "float fixed notation": {"a": 0.0001, "b": 9999999999999998.0, "c": 0.1 + 0.2},
+    "float exponent notation": {"a": 1e-05, "b": 1e16, "c": 5e-324, "d": 1.8e308},
+    "float zero": {"a": 0.0, "b": -0.0},
+    "float non-finite": {"a": math.nan, "b": math.inf, "c": -math.inf},
+    "big ints": {"a": 2**64, "b": -(2**63) - 1, "c": 10**30},
+    "bool not int": {"a": True, "b": 1, "c": False, "d": 0},
+    "decimals": {
+        "a": Decimal("1.50"),
+        "b": Decimal("-0"),
+        "c": Decimal("1E+2"),
+        "d": Decimal("1E-10"),
+        "e": Decimal("NaN"),
+        "f": Decimal("-Infinity"),
+        "g": Decimal("12345678901234567890.12345678901234567890"),
+    },
+    "datetimes": {
+        "aware": datetime(2024, 1, 1, 12, 30, tzinfo=timezone.utc),
+        "naive": datetime(2024, 1, 1, 12, 30, 15, 123456),  # noqa: DTZ001
+        "date": date(2024, 1, 1),
+        "time": time(12, 30),
+    },
+    "uuid": {"id": uuid.UUID("12345678-1234-5678-1234-567812345678")},
+    "bytes": {"data": b"\x00\xff"},
+    "tuple": {"pair": (1, "a")},
+    "set": {"tags": {"a"}},
+    "enum": {"colour": _Colour.RED},
+    "str enum value": {"name": _Name.OTIS},
+    "str enum key": {_Name.OTIS: 1},
+    "int key": {"outer": {1: "a"}},
+    "none key": {"outer": {None: "a"}},
+    "nested": {"obj": {"x": [1, {"y": None}], "z": {}}, "list": [[], [[]]]},
+    "nested non-canonical": {"obj": {"x": [Decimal("1.1"), date(2024, 1, 1)]}},
+    "wide": {f"column_{i}": f"value {i}" for i in range(500)},
+}
+
+
+def _legacy_fivetran_id(record: dict) -> str:
+    return hashlib.md5(
+        json.dumps(record, default=str).encode(),
+        usedforsecurity=False,
+    ).hexdigest()
+
+
+@pytest.mark.parametrize("record", CORPUS.values(), ids=CORPUS.keys())
+def test_canonical_json_is_byte_identical(record):
+    assert canonical_json(record) == json.dumps(record, default=str).encode()
+
+
+@pytest.mark.parametrize("record", CORPUS.values(), ids=CORPUS.keys())
+def test_fivetran_id_is_unchanged(record):
+    assert fivetran_id(record) == _legacy_fivetran_id(record)
+
+
+def test_canonical_json_random_floats():
+    rng = random.Random(0)  # noqa: S311
+
+    for _ in range(10_000):
+        (value,) = struct.unpack("<d", rng.getrandbits(64).to_bytes(8, "little"))
+        scaled = rng.uniform(-1e17, 1e17) * 10 ** rng.randint(-25, 0)
+        record = {"bits": value, "scaled": scaled}
+
+        assert canonical_json(record) == json.dumps(record, default=str).encode()
+
+
+# keys must be strings for the record path to rename them
+RECORD_CORPUS = {
+    name: record
+    for name, record in CORPUS.items()
+    if all(isinstance(key, str) for key in record)
+}
+
+
+@pytest.mark.parametrize("declared", [True, False], ids=["plan", "fallback"])
+@pytest.mark.parametrize("record", RECORD_CORPUS.values(), ids=RECORD_CORPUS.keys())
+def test_stream_map_fivetran_id_is_unchanged(record, declared: bool):  # noqa: FBT001
+    # with every property declared, records take the compiled transform plan;
+    # otherwise, the generic fallback
+    properties: dict[str, dict] = {key: {} for key in record} if declared else {}
+    stream_map = FivetranStreamMap(
+        stream_alias="animals",
+        raw_schema={"properties": properties},
+        key_properties=[],
+        flattening_options=None,
+    )
+    expected = _legacy_fivetran_id(
+        {FivetranStreamMap._transform_name(k): v for k, v in record.items()}
+    )
+
+    if declared:
+        _, plan = stream_map.prepare_record(dict(record))
+        assert plan is not None
+    transformed = stream_map.transform(record)
+    assert transformed is not None
+    assert transformed[SystemColumns.FIVETRAN_ID] == expected
+
+
+@pytest.mark.parametrize(
+    ("algorithm", "expected"),
+    [
+        ("md5", hashlib.md5(b'{"id": 1}', usedforsecurity=False).hexdigest()),
+        ("sha1", hashlib.sha1(b'{"id": 1}', usedforsecurity=False).hexdigest()),
+        ("blake2b", hashlib.blake2b(b'{"id": 1}', digest_size=16).hexdigest()),
+    ],
+)
+def test_fivetran_id_algorithm(algorithm, expected):
+    assert fivetran_id({"id": 1}, algorithm) == expected
+
+
+def test_mapper_fivetran_id_algorithm_setting():
+    mapper = FivetranMapper(
+        config={"fivetran_id_algorithm": "blake2b"},
+        validate_config=False,
+    )
+    list(
+        mapper.map_schema_message(
+            {
+                "type": "SCHEMA",
+                "stream": "animals",
+                "schema": {"properties": {"id": {"type": "integer"}}},
+                "key_properties": [],
+            }
+        )
+    )
+
+    (record_message,) = mapper.map_record_message(
+        {"type": "RECORD", "stream": "animals", "record": {"id": 1}}
+    )
+
+    assert record_message.record[SystemColumns.FIVETRAN_ID] == fivetran_id(
+        {"id": 1}, "blake2b"
+    )
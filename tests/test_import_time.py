@@ -0,0 +1,98 @@
+"""Tests for `mapper-fivetran` startup cost, via `python -X importtime`."""
+
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+# total self time of the mapper's own modules, in microseconds: generous, to
+# allow for slow CI runners, but well short of what importing pyarrow and the
+# Arrow BATCH path at startup costs
+_IMPORT_TIME_BUDGET_US = 100_000
+
+# only needed once a BATCH message (or batched RECORD message) is processed, or
+# with `parallel` enabled
+_LAZY_MODULES = (
+    "pyarrow",
+    "mapper_fivetran.arrow",
+    "mapper_fivetran.batch",
+    "mapper_fivetran.storage",
+    "mapper_fivetran._arrow_json",
+    "mapper_fivetran.parallel",
+)
+
+_CLI = "from mapper_fivetran.mapper import FivetranMapper; FivetranMapper.cli()"
+
+_MESSAGES = [
+    {
+        "type": "SCHEMA",
+        "stream": "animals",
+        "schema": {"properties": {"name": {"type": "string"}}},
+        "key_properties": ["name"],
+    },
+    {"type": "RECORD", "stream": "animals", "record": {"name": "Otis"}},
+]
+
+
+def _import_times(*args: str, stdin: str = "") -> dict[str, int]:
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", *args],
+        input=stdin,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # e.g. `import time:       572 |        572 |   mapper_fivetran`
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, _, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(self_us)
+    return times
+
+
+def _lazy_modules(times: dict[str, int]) -> list[str]:
+    return [
+        name
+        for name in times
+        if any(name == lazy or name.startswith(f"{lazy}.") for lazy in _LAZY_MODULES)
+    ]
+
+
+def test_import_skips_arrow():
+    times = _import_times("-c", "import mapper_fivetran.mapper")
+
+    assert "mapper_fivetran.mapper" in times
+    assert not _lazy_modules(times)
+
+
+def test_import_time_budget():
+    times = _import_times("-c", "import mapper_fivetran.mapper")
+
+    own_us = sum(
+        self_us
+        for name, self_us in times.items()
+        if name == "mapper_fivetran" or name.startswith("mapper_fivetran.")
+    )
+    assert own_us < _IMPORT_TIME_BUDGET_US, times
+
+
+@pytest.mark.parametrize("config", [{}, {"micro_batching": {"enabled": True}}])
+def test_record_stream_skips_arrow(config: dict, tmp_path):
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps(config))
+
+    times = _import_times(
+        "-c",
+        _CLI,
+        "--config",
+        str(config_path),
+        stdin="".join(f"{json.dumps(message)}\n" for message in _MESSAGES),
+    )
+
+    assert not _lazy_modules(times)
@@ -0,0 +1,110 @@
+"""Tests for JSONL BATCH input and output."""
+
+from __future__ import annotations
+
+import gzip
+import json
+
+import pytest
+from pyarrow import ipc
+
+from mapper_fivetran import SystemColumns, batch
+
+RECORDS: list[dict] = [
+    {"name": "Otis", "weight": 1.5, "owner": {"firstName": "Bob"}},
+    {"name": "Milo", "weight": 2, "owner": None},
+    {"name": "Rex", "weight": None, "owner": {"firstName": "Alice"}},
+]
+
+
+@pytest.fixture
+def properties() -> dict:
+    return {
+        "name": {"type": "string"},
+        "weight": {"type": ["number", "null"]},
+        "owner": {
+            "type": ["object", "null"],
+            "properties": {"firstName": {"type": "string"}},
+        },
+    }
+
+
+def _write_jsonl(path, records: list[dict], *, compress: bool) -> str:
+    lines = "".join(f"{json.dumps(record)}\n" for record in records).encode()
+    path.write_bytes(gzip.compress(lines) if compress else lines)
+    return f"file://{path}"
+
+
+@pytest.mark.parametrize("compression", ["gzip", "none"])
+def test_jsonl_input(
+    tmp_path,
+    compression: str,
+    make_mapper,
+    schema,
+    make_batch_config,
+    map_batch,
+    read_rows,
+):
+    src_path = tmp_path / "src.jsonl"
+    src = _write_jsonl(src_path, RECORDS, compress=compression == "gzip")
+    out = map_batch(
+        make_mapper(make_batch_config(), schema),
+        {"format": "jsonl", "compression": compression},
+        src,
+    )
+
+    rows = read_rows(out["manifest"][0])
+
+    assert [
+        {k: v for k, v in row.items() if k != SystemColumns.FIVETRAN_SYNCED}
+        for row in rows
+    ] == [
+        {
+            "name": "Otis",
+            "weight": 1.5,
+            "owner_first_name": "Bob",
+            SystemColumns.FIVETRAN_DELETED: False,
+        },
+        {
+            "name": "Milo",
+            "weight": 2.0,
+            "owner_first_name": None,
+            SystemColumns.FIVETRAN_DELETED: False,
+        },
+        {
+            "name": "Rex",
+            "weight": None,
+            "owner_first_name": "Alice",
+            SystemColumns.FIVETRAN_DELETED: False,
+        },
+    ]
+    assert not src_path.exists()
+
+
+def test_jsonl_input_read_in_blocks(
+    tmp_path, monkeypatch, make_mapper, schema, make_batch_config, map_batch
+):
+    monkeypatch.setattr(batch, "_JSONL_BLOCK_SIZE", 2)
+    src = _write_jsonl(tmp_path / "src.jsonl", RECORDS, compress=False)
+
+    out = map_batch(make_mapper(make_batch_config(), schema), {"format": "jsonl"}, src)
+
+    with ipc.open_file(out["manifest"][0].removeprefix("file://")) as reader:
+        assert reader.num_record_batches == 2  # noqa: PLR2004
+
+
+def test_jsonl_output(tmp_path, make_mapper, schema, make_batch_config, map_batch):
+    src = _write_jsonl(tmp_path / "src.jsonl.gz", RECORDS, compress=True)
+    mapper = make_mapper(
+        make_batch_config(encoding={"format": "jsonl", "compression": "gzip"}), schema
+    )
+
+    out = map_batch(mapper, {"format": "jsonl", "compression": "gzip"}, src)
+
+    assert out["encoding"] == {"format": "jsonl", "compression": "gzip"}
+    (uri,) = out["manifest"]
+    assert uri.endswith(".jsonl.gz")
+    with gzip.open(uri.removeprefix("file://"), "rt") as file:
+        rows = [json.loads(line) for line in file]
+    assert [row["owner_first_name"] for row in rows] == ["Bob", None, "Alice"]
+    assert [row[SystemColumns.FIVETRAN_DELETED] for row in rows] == [False] * 3
@@ -0,0 +1,140 @@
+"""Tests for per-stream METRIC logging in `FivetranMapper`."""
+
+from __future__ import annotations
+
+import logging
+
+import pyarrow as pa
+import pytest
+from pyarrow import ipc
+from singer_sdk.metrics import METRICS_LOGGER_NAME
+
+OWNER = {"firstName": "Reuben"}
+
+
+@pytest.fixture
+def properties() -> dict:
+    return {
+        "name": {"type": "string"},
+        "owner": {"type": "object", "properties": {"firstName": {"type": "string"}}},
+    }
+
+
+def _batch(tmp_path, rows: int) -> dict:
+    table = pa.table(
+        {
+            "name": [f"animal-{i}" for i in range(rows)],
+            "owner": [OWNER] * rows,
+        }
+    )
+    path = tmp_path / "src.arrow"
+    with ipc.new_file(str(path), table.schema) as writer:
+        writer.write_table(table)
+    return {
+        "type": "BATCH",
+        "stream": "animals",
+        "encoding": {"format": "arrow"},
+        "manifest": [path.as_uri()],
+    }
+
+
+def _points(records: list[logging.LogRecord]) -> list[dict]:
+    return [
+        record.point  # type: ignore[attr-defined]
+        for record in records
+        if record.name == METRICS_LOGGER_NAME and "point" in record.__dict__
+    ]
+
+
+def _record_counts(points: list[dict]) -> dict[str, int]:
+    counts = {"in": 0, "out": 0}
+    for point in points:
+        if point["metric"] == "record_count":
+            counts[point["tags"]["direction"]] += point["value"]
+    return counts
+
+
+def _stages(points: list[dict]) -> set[str]:
+    return {
+        point["tags"]["stage"]
+        for point in points
+        if point["metric"] == "batch_processing_time"
+    }
+
+
+def test_metrics_logged_at_end_of_pipe(
+    tmp_path,
+    caplog,
+    capsysbinary,
+    make_mapper,
+    process,
+    schema,
+    make_record,
+    make_batch_config,
+):
+    caplog.set_level(logging.INFO, logger=METRICS_LOGGER_NAME)
+    mapper = make_mapper({"metrics": {"enabled": True}, **make_batch_config()})
+
+    process(
+        mapper,
+        schema,
+        make_record("Otis", owner=OWNER),
+        make_record("Milo", owner=OWNER),
+        _batch(tmp_path, 3),
+    )
+    assert not _points(caplog.records)
+
+    mapper.process_endofpipe()
+    points = _points(caplog.records)
+    assert _record_counts(points) == {"in": 5, "out": 5}
+    assert {"read", "flatten", "rename", "system_columns", "transform", "write"} <= (
+        _stages(points)
+    )
+    assert all(point["tags"]["stream"] == "animals" for point in points)
+    capsysbinary.readouterr()
+
+
+def test_metrics_logged_every_log_interval(
+    caplog, capsysbinary, make_mapper, process, schema, make_record, make_batch_config
+):
+    caplog.set_level(logging.INFO, logger=METRICS_LOGGER_NAME)
+    mapper = make_mapper(
+        {"metrics": {"enabled": True, "log_interval": 0}, **make_batch_config()}
+    )
+
+    process(
+        mapper,
+        schema,
+        make_record("Otis", owner=OWNER),
+        make_record("Milo", owner=OWNER),
+    )
+
+    # one point per direction for each record
+    counts = [
+        point["value"]
+        for point in _points(caplog.records)
+        if point["metric"] == "record_count"
+    ]
+    assert counts == [1, 1, 1, 1]
+    capsysbinary.readouterr()
+
+
+def test_metrics_disabled(
+    tmp_path,
+    caplog,
+    capsysbinary,
+    make_mapper,
+    process,
+    schema,
+    make_record,
+    make_batch_config,
+):
+    caplog.set_level(logging.INFO, logger=METRICS_LOGGER_NAME)
+    mapper = make_mapper(make_batch_config())
+
+    process(mapper, schema, make_record("Otis", owner=OWNER), _batch(tmp_path, 3))
+    mapper.process_endofpipe()
+
+    assert not mapper._stream_metrics
+    assert not _points(caplog.records)
+    capsysbinary.readouterr()
@@ -0,0 +1,92 @@
+"""Tests for micro-batching RECORD messages in `FivetranMapper`."""
+
+from __future__ import annotations
+
+from mapper_fivetran import buffer as buffer_module
+
+
+def test_records_buffered_until_state(
+    make_mapper, process, read_messages, schema, state, make_record
+):
+    mapper = make_mapper({"micro_batching": {"enabled": True}})
+
+    process(mapper, schema, make_record("Otis"), make_record("Bob"))
+    assert [m["type"] for m in read_messages()] == ["SCHEMA"]
+
+    process(mapper, state)
+    messages = read_messages()
+    assert [m["type"] for m in messages] == ["RECORD", "RECORD", "STATE"]
+    assert [m["record"]["name"] for m in messages[:2]] == ["Otis", "Bob"]
+
+
+def test_records_written_when_max_rows_reached(
+    make_mapper, process, read_messages, schema, make_record
+):
+    mapper = make_mapper({"micro_batching": {"enabled": True, "max_rows": 2}})
+
+    process(
+        mapper, schema, make_record("Otis"), make_record("Bob"), make_record("Milo")
+    )
+
+    messages = read_messages()
+    assert [m["type"] for m in messages] == ["SCHEMA", "RECORD", "RECORD"]
+
+
+def test_records_written_when_max_bytes_reached(
+    make_mapper, process, read_messages, schema, make_record
+):
+    mapper = make_mapper({"micro_batching": {"enabled": True, "max_bytes": 1}})
+
+    process(mapper, schema, make_record("Otis"))
+
+    assert [m["type"] for m in read_messages()] == ["SCHEMA", "RECORD"]
+
+
+def test_records_written_when_max_latency_reached_on_other_stream(
+    monkeypatch, make_mapper, process, read_messages, schema, make_record
+):
+    now = 0.0
+    monkeypatch.setattr(buffer_module.time, "monotonic", lambda: now)
+    mapper = make_mapper({"micro_batching": {"enabled": True, "max_latency": 1.0}})
+
+    process(mapper, schema, {**schema, "stream": "owners"}, make_record("Otis"))
+    assert [m["type"] for m in read_messages()] == ["SCHEMA", "SCHEMA"]
+
+    now = 1.0
+    process(mapper, make_record("Bob", stream="owners"))
+    messages = read_messages()
+    assert [(m["stream"], m["record"]["name"]) for m in messages] == [
+        ("animals", "Otis")
+    ]
+
+
+def test_records_written_before_schema_change(
+    make_mapper, process, read_messages, schema, make_record
+):
+    mapper = make_mapper({"micro_batching": {"enabled": True}})
+
+    process(mapper, schema, make_record("Otis"), {**schema, "key_properties": []})
+
+    messages = read_messages()
+    assert [m["type"] for m in messages] == ["SCHEMA", "RECORD", "SCHEMA"]
+
+
+def test_records_written_at_end_of_pipe(
+    make_mapper, process, read_messages, schema, make_record
+):
+    mapper = make_mapper({"micro_batching": {"enabled": True}})
+
+    process(mapper, schema, make_record("Otis"))
+    mapper.process_endofpipe()
+
+    assert [m["type"] for m in read_messages()] == ["SCHEMA", "RECORD"]
+
+
+def test_records_not_buffered_when_disabled(
+    make_mapper, process, read_messages, schema, make_record
+):
+    mapper = make_mapper()
+
+    process(mapper, schema, make_record("Otis"))
+
+    assert [m["type"] for m in read_messages()] == ["SCHEMA", "RECORD"]
@@ -0,0 +1,243 @@
+"""Tests for transforming RECORD messages in worker processes."""
+
+from __future__ import annotations
+
+import io
+import json
+
+import msgspec
+import pytest
+
+from mapper_fivetran.mapper import FivetranMapper
+from mapper_fivetran.parallel import RecordShards, ShardingReader
+
+ANIMALS = {
+    "type": "SCHEMA",
+    "stream": "animals",
+    "schema": {
+        "properties": {
+            "id": {"type": "integer"},
+            "name": {"type": "string"},
+            "owner": {
+                "type": "object",
+                "properties": {"firstName": {"type": "string"}},
+            },
+        }
+    },
+    "key_properties": ["id"],
+}
+OWNERS = {
+    "type": "SCHEMA",
+    "stream": "owners",
+    "schema": {"properties": {"firstName": {"type": "string"}}},
+    "key_properties": [],
+}
+
+
+def _state(position: int) -> dict:
+    return {"type": "STATE", "value": {"position": position}}
+
+
+def _messages() -> list[dict]:
+    messages: list[dict] = [ANIMALS, OWNERS]
+    for i in range(50):
+        messages.append(
+            {
+                "type": "RECORD",
+                "stream": "animals",
+                "record": {"id": i, "name": f"Otis {i}", "owner": {"firstName": "R"}},
+            }
+        )
+        if i % 3 == 0:
+            messages.append(
+                {"type": "RECORD", "stream": "owners", "record": {"firstName": str(i)}}
+            )
+        if i % 20 == 0:
+            messages.append(_state(i))
+    # a schema change mid-stream
+    messages.append({**ANIMALS, "key_properties": []})
+    messages.extend(
+        {"type": "RECORD", "stream": "animals", "record": {"id": i}}
+        for i in range(50, 60)
+    )
+    messages.append(_state(60))
+    return messages
+
+
+def _map(capsysbinary, config: dict, messages: list[dict]) -> list[dict]:
+    mapper = FivetranMapper(config=config, validate_config=False)
+    mapper.process_lines(io.StringIO("".join(f"{json.dumps(m)}\n" for m in messages)))
+    mapper.process_endofpipe()
+
+    output = []
+    for line in capsysbinary.readouterr().out.splitlines():
+        message = json.loads(line)
+        if message["type"] == "RECORD":
+            message["record"].pop("_fivetran_synced")
+            message.pop("time_extracted")
+        output.append(message)
+    return output
+
+
+@pytest.mark.parametrize(
+    "parallel",
+    [
+        pytest.param({"chunk_size": 4}, id="by stream"),
+        pytest.param({"chunk_size": 4, "shard_by_key": True}, id="by key"),
+        pytest.param({"chunk_size": 1000}, id="partial chunks"),
+    ],
+)
+def test_parallel_maps_messages_the_same(capsysbinary, parallel: dict):
+    messages = _messages()
+    expected = _map(capsysbinary, {}, messages)
+
+    assert expected == _map(
+        capsysbinary,
+        {"parallel": {"enabled": True, "workers": 2, **parallel}},
+        messages,
+    )
+
+
+def test_parallel_typed_decoding(capsysbinary):
+    messages = _messages()
+    expected = _map(capsysbinary, {"typed_decoding": True}, messages)
+
+    assert expected == _map(
+        capsysbinary,
+        {"typed_decoding": True, "parallel": {"enabled": True, "workers": 2}},
+        messages,
+    )
+
+
+@pytest.mark.parametrize("shard_by_key", [False, True])
+def test_parallel_micro_batching(capsysbinary, shard_by_key: bool):  # noqa: FBT001
+    messages = _messages()
+    # buffers fill after the same records either way, so are written alike
+    micro_batching = {"enabled": True, "max_rows": 4, "max_latency": 60}
+    expected = _map(capsysbinary, {"micro_batching": micro_batching}, messages)
+
+    assert expected == _map(
+        capsysbinary,
+        {
+            "micro_batching": micro_batching,
+            "parallel": {
+                "enabled": True,
+                "workers": 2,
+                "chunk_size": 3,
+                "shard_by_key": shard_by_key,
+            },
+        },
+        messages,
+    )
+    # records are micro-batched, so not in input order across streams
+    assert expected != _map(capsysbinary, {}, messages)
+
+
+def test_parallel_ignored_when_batching_records():
+    mapper = FivetranMapper(
+        config={
+            "parallel": {"enabled": True},
+            "batch_config": {"batch_records": True},
+        },
+        validate_config=False,
+    )
+
+    assert not isinstance(mapper.message_reader, ShardingReader)
+
+
+def test_record_shards_output_in_input_order():
+    shards = RecordShards({}, workers=3, chunk_size=2, shard_by_key=True)
+    try:
+        shards.register_schema(ANIMALS)
+        shards.register_schema(OWNERS)
+
+        outputs = []
+        for i in range(20):
+            stream, record = (
+                ("owners", {"firstName": str(i)})
+                if i % 4 == 0
+                else ("animals", {"id": i})
+            )
+            line = json.dumps({"type": "RECORD", "stream": stream, "record": record})
+            outputs += shards.submit(stream, msgspec.json.encode(record), line)
+        outputs += shards.drain()
+    finally:
+        shards.close()
+
+    records = [json.loads(output)["record"] for _, output in outputs]
+    assert [record.get("id") or int(record["first_name"]) for record in records] == (
+        list(range(20))
+    )
+    assert [stream for stream, _ in outputs] == [
+        "owners" if i % 4 == 0 else "animals" for i in range(20)
+    ]
+
+
+def test_record_shards_schema_change():
+    shards = RecordShards({}, workers=1, chunk_size=1)
+    record = {"type": "RECORD", "stream": "owners", "record": {"firstName": "R"}}
+    try:
+        shards.register_schema(OWNERS)
+        outputs = shards.submit("owners", msgspec.Raw(b"{}"), json.dumps(record))
+        shards.register_schema({**OWNERS, "key_properties": ["firstName"]})
+        outputs += shards.submit("owners", msgspec.Raw(b"{}"), json.dumps(record))
+        outputs += shards.drain()
+    finally:
+        shards.close()
+
+    records = [json.loads(output)["record"] for _, output in outputs]
+    assert "_fivetran_id" in records[0]
+    assert "_fivetran_id" not in records[1]
+
+
+def test_record_shards_record_before_schema():
+    shards = RecordShards({}, workers=1, chunk_size=1)
+    try:
+        with pytest.raises(KeyError, match="animals"):
+            shards.submit("animals", msgspec.Raw(b"{}"), "")
+    finally:
+        shards.close()
+
+
+def test_parallel_worker_error_raised(capsysbinary):
+    config = {
+        "stream_maps": {"animals": {"name": "undefined_name"}},
+        "parallel": {"enabled": True, "workers": 1},
+    }
+
+    with pytest.raises(Exception, match="undefined_name"):
+        _map(
+            capsysbinary,
+            config,
+            [ANIMALS, {"type": "RECORD", "stream": "animals", "record": {"id": 1}}],
+        )
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        pytest.param(ANIMALS, id="schema"),
+        pytest.param(_state(1), id="state"),
+        pytest.param({"type": "RECORD", "stream": "animals"}, id="no record"),
+    ],
+)
+def test_sharding_reader_decodes_other_lines_generically(message: dict):
+    line = json.dumps(message)
+
+    assert ShardingReader().deserialize_json(line) == message
+
+
+def test_sharding_reader_skips_records():
+    reader = ShardingReader()
+    line = json.dumps(
+        {"type": "RECORD", "stream": "animals", "record": {"id": 1}, "version": 2}
+    )
+
+    message = reader.deserialize_json(line)
+
+    assert message == {
+        "type": "RECORD",
+        "stream": "animals",
+        "record": msgspec.Raw(b'{"id": 1}'),
+    }
+    assert reader.current_line == line
@@ -0,0 +1,150 @@
+"""Tests for Parquet BATCH input and output."""
+
+from __future__ import annotations
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from pyarrow import ipc
+
+from mapper_fivetran import SystemColumns
+from mapper_fivetran.batch import BatchEncoding
+
+
+@pytest.fixture
+def properties() -> dict:
+    return {"name": {"type": "string"}, "kind": {"type": "string"}}
+
+
+TABLE = pa.table(
+    {
+        "name": [f"animal-{i}" for i in range(10)],
+        "kind": ["dog", "cat"] * 5,
+    }
+)
+
+
+def test_parquet_input_read_by_row_group(
+    tmp_path, make_mapper, schema, make_batch_config, map_batch
+):
+    src_path = tmp_path / "src.parquet"
+    pq.write_table(TABLE, src_path, row_group_size=3)
+
+    out = map_batch(
+        make_mapper(make_batch_config(), schema),
+        {"format": "parquet"},
+        f"file://{src_path}",
+    )
+
+    assert out["encoding"] == {"format": "arrow"}
+    (uri,) = out["manifest"]
+    with ipc.open_file(uri.removeprefix("file://")) as reader:
+        assert reader.num_record_batches == 4  # noqa: PLR2004
+        result = reader.read_all()
+    assert result.column("name").to_pylist() == TABLE.column("name").to_pylist()
+    assert not src_path.exists()
+
+
+def test_parquet_output(tmp_path, make_mapper, schema, make_batch_config, map_batch):
+    src_path = tmp_path / "src.arrow"
+    with ipc.new_file(str(src_path), TABLE.schema) as writer:
+        for batch in TABLE.to_batches(max_chunksize=3):
+            writer.write_batch(batch)
+
+    mapper = make_mapper(
+        make_batch_config(
+            encoding={
+                "format": "parquet",
+                "compression": "zstd",
+                "row_group_size": 4,
+                "use_dictionary": ["kind"],
+            }
+        ),
+        schema,
+    )
+    out = map_batch(mapper, {"format": "arrow"}, f"file://{src_path}")
+
+    assert out["encoding"] == {"format": "parquet", "compression": "zstd"}
+    (uri,) = out["manifest"]
+    assert uri.endswith(".parquet")
+
+    parquet_file = pq.ParquetFile(uri.removeprefix("file://"))
+    assert [
+        parquet_file.metadata.row_group(i).num_rows
+        for i in range(parquet_file.num_row_groups)
+    ] == [4, 4, 2]
+
+    columns = parquet_file.metadata.row_group(0)
+    encodings = {
+        columns.column(i).path_in_schema: columns.column(i).encodings
+        for i in range(columns.num_columns)
+    }
+    assert "RLE_DICTIONARY" in encodings["kind"]
+    assert "RLE_DICTIONARY" not in encodings["name"]
+    assert columns.column(0).compression == "ZSTD"
+
+    result = parquet_file.read()
+    assert result.column("kind").to_pylist() == TABLE.column("kind").to_pylist()
+    assert result.column(SystemColumns.FIVETRAN_DELETED.value).to_pylist() == [
+        False
+    ] * len(TABLE)
+
+
+def test_parquet_round_trip(
+    tmp_path, make_mapper, schema, make_batch_config, map_batch
+):
+    src_path = tmp_path / "src.parquet"
+    pq.write_table(TABLE, src_path)
+
+    mapper = make_mapper(make_batch_config(encoding={"format": "parquet"}), schema)
+    out = map_batch(mapper, {"format": "parquet"}, f"file://{src_path}")
+
+    assert out["encoding"] == {"format": "parquet", "compression": "snappy"}
+    path = out["manifest"][0].removeprefix("file://")
+    assert pq.ParquetFile(path).metadata.row_group(0).column(0).compression == "SNAPPY"
+    result = pq.read_table(path)
+    assert result.column("name").to_pylist() == TABLE.column("name").to_pylist()
+
+
+def test_records_batched_as_parquet(
+    make_mapper, process, read_messages, schema, state, make_record, make_batch_config
+):
+    mapper = make_mapper(
+        make_batch_config(batch_records=True, encoding={"format": "parquet"}), schema
+    )
+
+    process(mapper, make_record("Otis"), state)
+
+    batch_message, _ = read_messages()
+    assert batch_message["encoding"] == {"format": "parquet", "compression": "snappy"}
+    (uri,) = batch_message["manifest"]
+    assert uri.endswith(".parquet")
+    assert pq.read_table(uri.removeprefix("file://")).column("name").to_pylist() == [
+        "Otis"
+    ]
+
+
+@pytest.mark.parametrize(
+    ("encoding", "match"),
+    [
+        pytest.param({"format": "csv"}, "format", id="format"),
+        pytest.param(
+            {"format": "arrow", "compression": "snappy"},
+            "compression",
+            id="ipc codec",
+        ),
+        pytest.param(
+            {"format": "parquet", "compression": "lzo"},
+            "compression",
+            id="parquet codec",
+        ),
+        pytest.param(
+            {"format": "parquet", "constant_columns": "run_end"},
+            "constant column",
+            id="parquet run-end encoding",
+        ),
+    ],
+)
+def test_batch_encoding_rejects_unsupported(encoding: dict, match: str):
+    with pytest.raises(ValueError, match=match):
+        BatchEncoding.from_config(encoding)
@@ -0,0 +1,145 @@
+"""Tests for pipelined reading, transforming and writing of BATCH files."""
+
+from __future__ import annotations
+
+import threading
+
+import pyarrow as pa
+import pytest
+from pyarrow import ipc
+from singer_sdk.helpers._flattening import FlatteningOptions
+
+from mapper_fivetran import batch
+from mapper_fivetran.batch import BatchEncoding, transform_file
+from mapper_fivetran.mapper import FivetranStreamMap
+from mapper_fivetran.metrics import StageMetrics
+
+TABLE = pa.table({"name": [f"animal-{i}" for i in range(10)]})
+
+
+@pytest.fixture
+def stream_map():
+    return FivetranStreamMap(
+        stream_alias="animals",
+        raw_schema={"properties": {"name": {"type": "string"}}},
+        key_properties=["name"],
+        flattening_options=FlatteningOptions(max_level=1, flattening_enabled=True),
+    )
+
+
+@pytest.fixture
+def src_path(tmp_path):
+    path = tmp_path / "src.arrow"
+    with ipc.new_file(str(path), TABLE.schema) as writer:
+        for record_batch in TABLE.to_batches(max_chunksize=2):
+            writer.write_batch(record_batch)
+    return path
+
+
+def _pipeline_threads() -> list[threading.Thread]:
+    return [
+        thread
+        for thread in threading.enumerate()
+        if thread.name in {"batch-reader", "batch-writer"}
+    ]
+
+
+@pytest.mark.parametrize(
+    ("read_queue_size", "write_queue_size"),
+    [(0, 0), (1, 0), (0, 1), (2, 3)],
+)
+def test_transform_file_pipelined(
+    stream_map,
+    src_path,
+    tmp_path,
+    read_queue_size: int,
+    write_queue_size: int,
+):
+    out_path = tmp_path / "out.arrow"
+    metrics = StageMetrics()
+
+    transform_file(
+        src_path,
+        [stream_map],
+        [out_path],
+        read_queue_size=read_queue_size,
+        write_queue_size=write_queue_size,
+        metrics=metrics,
+    )
+
+    with ipc.open_file(str(out_path)) as reader:
+        assert reader.num_record_batches == 5  # noqa: PLR2004
+        result = reader.read_all()
+    assert result.column("name").to_pylist() == TABLE.column("name").to_pylist()
+    assert metrics.read > 0
+    assert metrics.transform > 0
+    assert metrics.write > 0
+    assert metrics.flatten + metrics.rename + metrics.system_columns > 0
+    assert metrics.rows_in == metrics.rows_out == TABLE.num_rows
+    assert not _pipeline_threads()
+
+
+def test_transform_file_pipelined_transform_error(
+    stream_map,
+    src_path,
+    tmp_path,
+    monkeypatch,
+):
+    transform_tables = batch.transform_tables
+    calls = []
+
+    def failing_transform_tables(table, *args, **kwargs):
+        calls.append(table)
+        if len(calls) == 3:  # noqa: PLR2004
+            msg = "transform failed"
+            raise RuntimeError(msg)
+        return transform_tables(table, *args, **kwargs)
+
+    monkeypatch.setattr(batch, "transform_tables", failing_transform_tables)
+
+    with pytest.raises(RuntimeError, match="transform failed"):
+        transform_file(
+            src_path,
+            [stream_map],
+            [tmp_path / "out.arrow"],
+            read_queue_size=1,
+            write_queue_size=1,
+        )
+
+    assert not _pipeline_threads()
+
+
+def test_transform_file_pipelined_write_error(
+    stream_map,
+    src_path,
+    tmp_path,
+    monkeypatch,
+):
+    class FailingWriter:
+        def write_table(self, _table: pa.Table) -> None:
+            msg = "write failed"
+            raise OSError(msg)
+
+        def close(self) -> None:
+            pass
+
+    monkeypatch.setattr(BatchEncoding, "open_writer", lambda *_: FailingWriter())
+
+    with pytest.raises(OSError, match="write failed"):
+        transform_file(
+            src_path,
+            [stream_map],
+            [tmp_path / "out.arrow"],
+            read_queue_size=1,
+            write_queue_size=1,
+        )
+
+    assert not _pipeline_threads()
+
+
+def test_stage_metrics_add():
+    metrics = StageMetrics(read=1, transform=2, write=3, rows_in=4)
+
+    metrics += StageMetrics(read=0.5, transform=0.5, write=0.5, rows_in=1)
+
+    assert metrics == StageMetrics(read=1.5, transform=2.5, write=3.5, rows_in=5)
@@ -0,0 +1,181 @@
+"""Tests for remote BATCH file locations."""
+
+from __future__ import annotations
+
+import json
+import os
+import typing as t
+import uuid
+from pathlib import Path
+
+import fsspec
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from pyarrow import ipc
+
+from mapper_fivetran import SystemColumns, storage
+
+TABLE = pa.table({"name": ["Otis", "Milo", "Rex"]})
+
+# e.g. `s3://bucket/prefix?endpoint_override=localhost:9000&scheme=http` for a
+# local S3 stand-in such as MinIO, with credentials in the usual AWS variables
+S3_URI = os.environ.get("MAPPER_FIVETRAN_TEST_S3_URI")
+
+
+@pytest.mark.parametrize(
+    ("uri", "location"),
+    [
+        ("file:///tmp/batch.arrow", Path("/tmp/batch.arrow")),  # noqa: S108
+        ("/tmp/batch.arrow", Path("/tmp/batch.arrow")),  # noqa: S108
+        ("s3://bucket/batch.arrow", "s3://bucket/batch.arrow"),
+    ],
+)
+def test_from_uri(uri: str, location: storage.Location):
+    assert storage.from_uri(uri) == location
+    assert storage.from_uri(storage.to_uri(location)) == location
+
+
+@pytest.mark.parametrize(
+    ("directory", "location"),
+    [
+        (Path("/tmp"), Path("/tmp/batch.arrow")),  # noqa: S108
+        ("s3://bucket", "s3://bucket/batch.arrow"),
+        ("s3://bucket/prefix/", "s3://bucket/prefix/batch.arrow"),
+        (
+            "s3://bucket/prefix?region=eu-west-2",
+            "s3://bucket/prefix/batch.arrow?region=eu-west-2",
+        ),
+    ],
+)
+def test_join(directory: storage.Location, location: storage.Location):
+    assert storage.join(directory, "batch.arrow") == location
+
+
+def test_resolve_caches_filesystem_per_bucket():
+    filesystem, path = storage.resolve("s3://bucket/a.arrow?region=eu-west-2")
+    other_filesystem, other_path = storage.resolve(
+        "s3://bucket/b/c.arrow?region=eu-west-2"
+    )
+
+    assert filesystem is other_filesystem
+    assert (path, other_path) == ("bucket/a.arrow", "bucket/b/c.arrow")
+
+
+@pytest.fixture
+def root():
+    # `memory://` is served by fsspec, through the same `pyarrow.fs` interface
+    # as native filesystems such as S3
+    root = f"memory://mapper-fivetran-{uuid.uuid4().hex}"
+    yield root
+    fsspec.filesystem("memory").rm(root.removeprefix("memory://"), recursive=True)
+
+
+@pytest.fixture
+def batch_root(root: str) -> str:
+    return f"{root}/out"
+
+
+def _write(uri: str, data: bytes) -> str:
+    with storage.open_output_stream(uri) as sink:
+        sink.write(data)
+    return uri
+
+
+def _arrow_bytes(table: pa.Table) -> bytes:
+    sink = pa.BufferOutputStream()
+    with ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _parquet_bytes(table: pa.Table) -> bytes:
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink)
+    return sink.getvalue().to_pybytes()
+
+
+def _jsonl_bytes(table: pa.Table) -> bytes:
+    return "".join(f"{json.dumps(row)}\n" for row in table.to_pylist()).encode()
+
+
+def _exists(uri: str) -> bool:
+    filesystem, path = storage.resolve(uri)
+    return filesystem.get_file_info(path).type != pa.fs.FileType.NotFound
+
+
+@pytest.mark.parametrize(
+    ("src_format", "to_bytes"),
+    [
+        ("arrow", _arrow_bytes),
+        ("parquet", _parquet_bytes),
+        ("jsonl", _jsonl_bytes),
+    ],
+)
+@pytest.mark.parametrize("out_format", ["arrow", "parquet", "jsonl"])
+def test_map_batch_message_remote(
+    root: str,
+    src_format,
+    to_bytes,
+    out_format,
+    make_mapper,
+    schema,
+    make_batch_config,
+    map_batch,
+):
+    mapper = make_mapper(make_batch_config(encoding={"format": out_format}), schema)
+    src = _write(f"{root}/src.{src_format}", to_bytes(TABLE))
+
+    (uri,) = map_batch(mapper, {"format": src_format}, src)["manifest"]
+    assert uri.startswith(f"{root}/out/animals_")
+    with storage.open_input_file(uri) as file:
+        if out_format == "arrow":
+            result = ipc.open_file(file).read_all().to_pylist()
+        elif out_format == "parquet":
+            result = pq.read_table(file).to_pylist()
+        else:
+            result = [json.loads(line) for line in file.read().splitlines()]
+    assert [row["name"] for row in result] == ["Otis", "Milo", "Rex"]
+    assert all(not row[SystemColumns.FIVETRAN_DELETED] for row in result)
+    assert not _exists(src)
+
+
+def test_map_batch_message_remote_rolled(
+    root: str, make_mapper, schema, make_batch_config, map_batch
+):
+    mapper = make_mapper(make_batch_config(roll_batch_files=True, batch_size=2), schema)
+    manifest = [
+        _write(f"{root}/src_{i}.arrow", _arrow_bytes(TABLE.slice(i, 1)))
+        for i in range(TABLE.num_rows)
+    ]
+
+    rows = []
+    for uri in map_batch(mapper, {"format": "arrow"}, *manifest)["manifest"]:
+        with storage.open_input_file(uri) as file:
+            rows.append(ipc.open_file(file).read_all().column("name").to_pylist())
+    assert rows == [["Otis", "Milo"], ["Rex"]]
+    assert not any(_exists(src) for src in manifest)
+
+
+@pytest.mark.skipif(S3_URI is None, reason="MAPPER_FIVETRAN_TEST_S3_URI not set")
+def test_map_batch_message_s3(make_mapper, schema, map_batch):
+    root = storage.join(t.cast("str", S3_URI), uuid.uuid4().hex)
+    mapper = make_mapper(
+        {
+            "batch_config": {
+                "storage": {"root": f"{root}/out"},
+                "encoding": {"format": "parquet"},
+            }
+        },
+        schema,
+    )
+    src = _write(
+        t.cast("str", storage.join(root, "src.arrow")),
+        _arrow_bytes(TABLE),
+    )
+
+    (uri,) = map_batch(mapper, {"format": "arrow"}, src)["manifest"]
+    with storage.open_input_file(uri) as file:
+        assert pq.read_table(file).column("name").to_pylist() == ["Otis", "Milo", "Rex"]
+    storage.delete(uri)
+    assert not _exists(src)
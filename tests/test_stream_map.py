@@ -2,12 +2,14 @@
 
 from __future__ import annotations
 
+import copy
 from datetime import datetime, timezone
 
 import pytest
 from singer_sdk.helpers._flattening import FlatteningOptions
 
 from mapper_fivetran import SystemColumns
+from mapper_fivetran._util import CoarseClock
 from mapper_fivetran.mapper import FivetranStreamMap
 
 
@@ -147,6 +149,16 @@ def test_transform_no__sdc_extracted_at(stream_map: FivetranStreamMap):
     assert datetime.fromisoformat(transformed_record[SystemColumns.FIVETRAN_SYNCED])
 
 
+def test_transform_no__sdc_extracted_at_reads_clock(stream_map: FivetranStreamMap):
+    stream_map.clock = CoarseClock(60.0)
+
+    first = stream_map.transform({})
+    second = stream_map.transform({})
+
+    assert first[SystemColumns.FIVETRAN_SYNCED] == stream_map.clock.isoformat()
+    assert second[SystemColumns.FIVETRAN_SYNCED] == stream_map.clock.isoformat()
+
+
 @pytest.mark.parametrize(
     "column_name",
     ["_sdc_extracted_at", "_SDC_EXTRACTED_AT"],
@@ -281,3 +293,191 @@ def test_transform__sdc_deleted_at_null(stream_map: FivetranStreamMap, column_na
 def test_transform_name(name, expected_transformed_name):
     actual_transformed_name = FivetranStreamMap._transform_name(name)
     assert expected_transformed_name == actual_transformed_name
+
+
+def test_transform_plan_renames(make_stream_map):
+    stream_map: FivetranStreamMap = make_stream_map(
+        {"userId": {"type": "integer"}, "_SDC_EXTRACTED_AT": {"type": "string"}}
+    )
+
+    assert stream_map.transform_plan is not None
+    assert stream_map.transform_plan.names == {
+        "userId": "user_id",
+        "_SDC_EXTRACTED_AT": "_sdc_extracted_at",
+    }
+    assert stream_map.transform_plan.extracted_at is True
+    assert stream_map.transform_plan.deleted_at is False
+
+
+def test_transform_plan_none_on_name_collision(make_stream_map):
+    stream_map: FivetranStreamMap = make_stream_map(
+        {"userId": {"type": "integer"}, "user_id": {"type": "integer"}}
+    )
+
+    assert stream_map.transform_plan is None
+    assert stream_map.transform({"userId": 1, "user_id": 2})["user_id"] == 1
+
+
+def test_transform_undeclared_keys_fall_back(make_stream_map):
+    stream_map: FivetranStreamMap = make_stream_map({"userId": {"type": "integer"}})
+
+    transformed_record = stream_map.transform(
+        {"userId": 1, "firstName": "Otis", "_sdc_deleted_at": "2024-01-01"}
+    )
+
+    assert list(transformed_record) == [
+        "user_id",
+        "first_name",
+        "_sdc_deleted_at",
+        SystemColumns.FIVETRAN_ID,
+        SystemColumns.FIVETRAN_SYNCED,
+        SystemColumns.FIVETRAN_DELETED,
+    ]
+    assert transformed_record[SystemColumns.FIVETRAN_DELETED] is True
+
+
+def test_transform_does_not_mutate_record(make_stream_map):
+    stream_map: FivetranStreamMap = make_stream_map({"userId": {"type": "integer"}})
+    record = {"userId": 1}
+
+    stream_map.transform(record)
+
+    assert record == {"userId": 1}
+
+
+def test_prepare_record_shared_between_stream_maps(make_stream_map):
+    properties = {
+        "userInfo": {"type": "object", "properties": {"id": {"type": "integer"}}},
+        "_sdc_extracted_at": {"type": "string"},
+    }
+    stream_map = make_stream_map(properties)
+    other = make_stream_map(properties)
+    record = {"userInfo": {"id": 1}, "_sdc_extracted_at": "2024-01-01T00:00:00+00:00"}
+
+    assert stream_map.preparation_key == other.preparation_key
+
+    renamed, plan = stream_map.prepare_record(record)
+    assert renamed == {
+        "user_info_id": 1,
+        "_sdc_extracted_at": "2024-01-01T00:00:00+00:00",
+    }
+    assert other.transform_prepared(renamed.copy(), plan) == other.transform(record)
+
+
+def _make_flattening_stream_map(properties: dict, max_level: int) -> FivetranStreamMap:
+    return FivetranStreamMap(
+        stream_alias="animals",
+        # schema transformations rename properties in place when records aren't
+        # flattened
+        raw_schema={"properties": copy.deepcopy(properties)},
+        key_properties=[],
+        flattening_options=FlatteningOptions(
+            max_level=max_level,
+            flattening_enabled=True,
+        ),
+    )
+
+
+def _sdk_prepare_record(stream_map: FivetranStreamMap, record: dict) -> dict:
+    # the SDK's generic flatten, then the generic rename
+    return FivetranStreamMap._rename_record(stream_map.flatten_record(record))
+
+
+NESTED_PROPERTIES = {
+    "userId": {"type": "integer"},
+    "tags": {"type": ["array", "null"], "items": {"type": "string"}},
+    "metadata": {"type": ["object", "null"]},
+    "ownerInfo": {
+        "type": ["object", "null"],
+        "properties": {
+            "firstName": {"type": "string"},
+            "homeAddress": {
+                "type": ["object", "null"],
+                "properties": {
+                    "postCode": {"type": "string"},
+                    "geoPoint": {
+                        "type": "object",
+                        "properties": {"lat": {"type": "number"}},
+                    },
+                },
+            },
+        },
+    },
+}
+
+
+@pytest.mark.parametrize("max_level", [0, 1, 2, 3])
+@pytest.mark.parametrize(
+    "record",
+    [
+        pytest.param(
+            {
+                "userId": 1,
+                "tags": ["a", "b"],
+                "metadata": {"x": [1, {"y": None}]},
+                "ownerInfo": {
+                    "firstName": "Reuben",
+                    "homeAddress": {"postCode": "AB1", "geoPoint": {"lat": 1.5}},
+                },
+            },
+            id="complete",
+        ),
+        pytest.param({"userId": 1}, id="missing keys"),
+        pytest.param(
+            {"ownerInfo": {"homeAddress": {}}, "userId": None, "tags": None},
+            id="empty object and nulls",
+        ),
+        pytest.param({"ownerInfo": None}, id="null object"),
+        pytest.param({"ownerInfo": "Reuben"}, id="scalar for object"),
+        pytest.param({"ownerInfo": {"lastName": "Frankel"}}, id="undeclared nested"),
+        pytest.param({"petName": "Otis"}, id="undeclared"),
+        pytest.param({"userId": {"nested": True}}, id="object for scalar"),
+        pytest.param({"ownerInfo_firstName": "Reuben"}, id="pre-flattened key"),
+    ],
+)
+def test_prepare_record_matches_sdk_flatten(record: dict, max_level: int):
+    stream_map = _make_flattening_stream_map(NESTED_PROPERTIES, max_level)
+
+    assert stream_map.transform_plan is not None
+    # flattening is disabled at `max_level=0`
+    assert (stream_map.transform_plan.flatten is None) is (max_level == 0)
+
+    renamed, _ = stream_map.prepare_record(record)
+    expected = _sdk_prepare_record(stream_map, record)
+    assert renamed == expected
+    assert list(renamed) == list(expected)
+
+
+def test_prepare_record_flattens_in_one_pass(monkeypatch):
+    stream_map = _make_flattening_stream_map(NESTED_PROPERTIES, max_level=3)
+    monkeypatch.setattr(
+        FivetranStreamMap,
+        "flatten_record",
+        lambda *_: pytest.fail("flatten_record called"),
+    )
+
+    renamed, plan = stream_map.prepare_record(
+        {"userId": 1, "ownerInfo": {"homeAddress": {"geoPoint": {"lat": 1.5}}}}
+    )
+
+    assert plan is stream_map.transform_plan
+    assert renamed == {"user_id": 1, "owner_info_home_address_geo_point_lat": 1.5}
+
+
+def test_prepare_record_long_keys():
+    long_name = "someVeryLongPropertyName" * 8
+    stream_map = _make_flattening_stream_map(
+        {
+            long_name: {
+                "type": "object",
+                "properties": {long_name: {"type": "string"}},
+            },
+        },
+        max_level=1,
+    )
+    record = {long_name: {long_name: "value"}}
+
+    renamed, plan = stream_map.prepare_record(record)
+
+    assert plan is not None
+    assert renamed == _sdk_prepare_record(stream_map, record)
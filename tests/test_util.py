@@ -2,10 +2,16 @@
 
 from __future__ import annotations
 
+import json
 import sys
 import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
 
-from mapper_fivetran._util import new_uuid
+import pytest
+
+from mapper_fivetran import _util
+from mapper_fivetran._util import CoarseClock, canonical_json, new_uuid
 
 
 def test_new_uuid_is_unique():
@@ -19,3 +25,42 @@ def test_new_uuid_version():
 
 def test_new_uuid_returns_uuid_instance():
     assert isinstance(new_uuid(), uuid.UUID)
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        pytest.param({"id": 1, "name": "Otis", "deleted": None}, id="scalars"),
+        pytest.param({"price": Decimal("1.50"), "ratio": 0.25}, id="numbers"),
+        pytest.param({"tags": ["a", "b"], "meta": {"x": [1, {}]}}, id="nested"),
+        pytest.param({"name": "caf\u00e9"}, id="non-ascii"),
+        pytest.param({"tiny": 1e-7, "huge": 1e16}, id="float exponents"),
+    ],
+)
+def test_canonical_json_matches_json_dumps(obj):
+    assert canonical_json(obj) == json.dumps(obj, default=str).encode()
+
+
+def test_coarse_clock_reuses_reading(monkeypatch):
+    ticks = iter([0.0, 0.5, 1.0, 1.5])
+    monkeypatch.setattr(_util.time, "monotonic", lambda: next(ticks))
+    clock = CoarseClock(1.0)
+
+    first = clock.now()
+    assert clock.now() is first
+    assert clock.now() is not first
+
+
+def test_coarse_clock_isoformat():
+    clock = CoarseClock(60.0)
+
+    formatted = clock.isoformat()
+    assert formatted == clock.now().isoformat()
+    assert clock.isoformat() is formatted
+    assert datetime.fromisoformat(formatted).tzinfo == timezone.utc
+
+
+def test_coarse_clock_zero_resolution():
+    clock = CoarseClock(0)
+
+    assert clock.now() is not clock.now()